@@ -0,0 +1,159 @@
+"""
+Measure the throughput of the cleanup rule matchers.
+
+The shipped junk rules, with their roots moved under a fake system drive,
+are compiled and matched against PATHS synthetic file paths DEPTH
+directories deep, FILES_PER_DIR per directory as the scanner yields them:
+- fnmatch: every glob of every rule applying to the path, the excludes
+  against the file and each of its parent directories.
+- parent walk: the compiled suffix lookup and regex, then the excludes of
+  the matched rule against each parent directory, the former matcher.
+- RootRules.match: the excludes against the file only, the directories
+  the scan doesn't prune checked once per directory.
+
+The last rows time reading the rules of a cleanup, parsing the rules file
+on each call, then through `cleanup_rules`, which reads it once.
+"""
+import fnmatch
+import json
+import os
+import tempfile
+import time
+from typing import Callable
+
+import _set_source_path  # noqa
+
+from system_cleaner.rules import (  # noqa: E402
+    cleanup_rules, CleanupRule, compile_rules, JUNK, load_rules, RootRules, set_rules_file
+)
+from system_cleaner.scanner import suffix  # noqa: E402
+
+PATHS = 200_000
+DEPTH = 8
+FILES_PER_DIR = 50
+NAMES = ["setup.log", "data.tmp", "report.txt", "lib.dll", "old.bak", "kernel.chk", "a.old"]
+LOADS = 200
+
+# %VAR% of the shipped rules, rooted in a fake system drive.
+DRIVE = os.path.join(os.sep, "C")
+VARIABLES = {
+    "%SYSTEMDRIVE%\\": DRIVE,
+    "%WINDIR%": os.path.join(DRIVE, "Windows"),
+    "%TEMP%": os.path.join(DRIVE, "Users", "user", "AppData", "Local", "Temp"),
+    "%PROGRAMDATA%": os.path.join(DRIVE, "ProgramData"),
+}
+
+
+def localize(value: str) -> str:
+    for variable, path in VARIABLES.items():
+        value = value.replace(variable, path)
+    return value.replace("\\", os.sep)
+
+
+def junk_rules() -> list[CleanupRule]:
+    """Return the shipped junk rules with local roots and excludes."""
+    rules = load_rules(os.path.join(os.path.dirname(os.getcwd()), "cleanup_rules.json"))[JUNK]
+    return [
+        CleanupRule(rule.category, tuple(localize(root) for root in rule.roots), rule.include,
+                    tuple(localize(pattern) for pattern in rule.exclude),
+                    rule.min_age, rule.max_size)
+        for rule in rules
+    ]
+
+
+def synthetic_paths() -> list[tuple[str, str]]:
+    """Return the names and paths of the files, grouped by directory."""
+    paths: list[tuple[str, str]] = []
+    parents = [DRIVE, os.path.join(DRIVE, "Windows"), os.path.join(DRIVE, "Users"),
+               os.path.join(DRIVE, "Windows", "Prefetch")]
+    directory_index = 0
+    while len(paths) < PATHS:
+        parts = [f"dir{(directory_index >> level) % 4}" for level in range(DEPTH - 1)]
+        directory = os.path.join(parents[directory_index % len(parents)], *parts)
+        for number in range(FILES_PER_DIR):
+            name = f"{number}{NAMES[number % len(NAMES)]}"
+            paths.append((name, os.path.join(directory, name)))
+        directory_index += 1
+    return paths[:PATHS]
+
+
+def fnmatch_rule(rules: list[CleanupRule], name: str, path: str) -> CleanupRule | None:
+    for rule in rules:
+        if not any(path.startswith(root + os.sep) for root in rule.roots):
+            continue
+        if rule.include and not any(fnmatch.fnmatch(name, glob) for glob in rule.include):
+            continue
+        parent = path
+        excluded = False
+        while not excluded and len(parent) > len(DRIVE):
+            excluded = any(fnmatch.fnmatch(parent, pattern)
+                           or fnmatch.fnmatch(os.path.basename(parent), pattern)
+                           for pattern in rule.exclude)
+            parent = os.path.dirname(parent)
+        if not excluded:
+            return rule
+    return None
+
+
+def parent_walk(rules: RootRules, name: str, path: str) -> CleanupRule | None:
+    indexes = rules.suffixes.get(suffix(name))
+    index = None if indexes is None else indexes[0]
+    if index is None and rules.pattern is not None:
+        match = rules.pattern.match(name.lower())
+        if match is not None and match.lastgroup is not None:
+            index = int(match.lastgroup[1:])
+    if index is None:
+        return None
+    prune = rules.excludes[index]
+    while len(path) > len(rules.root):
+        if prune.prunes_path(os.path.basename(path), path):
+            return None
+        path = os.path.dirname(path)
+    return rules.rules[index]
+
+
+def measure(label: str, paths: list[tuple[str, str]],
+            match: Callable[[str, str], CleanupRule | None]) -> list[str | None]:
+    start_time = time.perf_counter()
+    matched = [match(name, path) for name, path in paths]
+    elapsed = time.perf_counter() - start_time
+    print(f"{label:<20} {len(paths) / elapsed / 1000:>9.0f}k paths/s")
+    return [None if rule is None else rule.category for rule in matched]
+
+
+def main() -> None:
+    rules = junk_rules()
+    compiled = compile_rules(rules)
+    print(f"{len(compiled)} scans: "
+          + ", ".join(f"{root_rules.root} ({len(root_rules.rules)} rules)"
+                      for root_rules in compiled))
+    drive = next(root_rules for root_rules in compiled if root_rules.root == DRIVE)
+    paths = synthetic_paths()
+
+    expected = measure("fnmatch", paths, lambda name, path: fnmatch_rule(drive.rules, name, path))
+    measure("parent walk", paths, lambda name, path: parent_walk(drive, name, path))
+    categories = measure("RootRules.match", paths, drive.match)
+    assert categories == expected, "RootRules.match differs from fnmatch"
+
+    fd, filepath = tempfile.mkstemp(prefix="cleanup_rules", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        with open(os.path.join(os.path.dirname(os.getcwd()), "cleanup_rules.json")) as shipped:
+            json.dump(json.load(shipped), file)
+    try:
+        for label, read in (
+            ("parse each call", lambda: compile_rules(load_rules(filepath)[JUNK])),
+            ("cleanup_rules", lambda: compile_rules(cleanup_rules(JUNK))),
+        ):
+            set_rules_file(filepath)
+            start_time = time.perf_counter()
+            for _ in range(LOADS):
+                read()
+            elapsed = time.perf_counter() - start_time
+            print(f"{label:<20} {elapsed / LOADS * 1e6:>9.1f} us/read")
+    finally:
+        set_rules_file(None)
+        os.remove(filepath)
+
+
+if __name__ == '__main__':
+    main()
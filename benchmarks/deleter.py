@@ -0,0 +1,185 @@
+"""
+Delete a junk tree with TreeDeleter and with the serial deletion it replaced.
+
+A tree of FILES files (the first argument) in directories of
+FILES_PER_DIR files is created under ROOTS top directories, one file out of
+READ_ONLY_RATIO being read-only. The files of the `locked` top directory
+can't be deleted: os.remove raises the PermissionError windows raises for a
+file opened by a running program, as a file can't be locked on every
+platform. The tree is created again before each deletion:
+- serial: the former deletion, os.remove of each file then os.rmdir of the
+  directories, deepest first.
+- shutil.rmtree: each top directory removed with shutil.rmtree, errors
+  ignored.
+- TreeDeleter: the files deleted in batches in the worker pool, then the
+  emptied directories.
+
+After TreeDeleter the read-only files are checked to be deleted, the
+errors to be a single (type, prefix) group of the locked directory, and
+the directories still holding locked files to be skipped without errors.
+"""
+import errno
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+
+import _set_source_path  # noqa
+
+from system_cleaner.deleter import TreeDeleter  # noqa: E402
+
+FILES = 50_000
+FILES_PER_DIR = 100
+ROOTS = 10  # top directories, the last one locked.
+DEPTH = 3  # directories nested under each top directory.
+READ_ONLY_RATIO = 10
+FILE_SIZE = 512
+ERROR_SHARING_VIOLATION = 32
+LOCKED = "locked"
+
+
+class LockedFiles:
+    """Make os.remove fail on the files under the locked directory."""
+
+    def __init__(self, locked_dir: str) -> None:
+        self.locked_dir = locked_dir + os.sep
+        self._remove = os.remove
+
+    def __call__(self, path: str, *, dir_fd: int | None = None) -> None:
+        full_path = path
+        if dir_fd is not None:  # shutil.rmtree on linux removes relative to the directory.
+            full_path = os.path.join(os.readlink(f"/proc/self/fd/{dir_fd}"), path)
+        if full_path.startswith(self.locked_dir):
+            raise PermissionError(
+                errno.EACCES, "The process cannot access the file because it is being "
+                + "used by another process", full_path, ERROR_SHARING_VIOLATION
+            )
+        self._remove(path, dir_fd=dir_fd)
+
+    def __enter__(self) -> 'LockedFiles':
+        os.remove = os.unlink = self
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        os.remove = os.unlink = self._remove
+
+
+def create_tree(root: str, files: int) -> tuple[list[tuple[str, int]], list[str]]:
+    """Create the tree, return its (path, size) files and its directories."""
+    paths: list[tuple[str, int]] = []
+    dirs: list[str] = []
+    data = b"\0" * FILE_SIZE
+    for index in range(max(1, files // FILES_PER_DIR)):
+        top = LOCKED if index % ROOTS == ROOTS - 1 else f"top{index % ROOTS}"
+        parts = [top] + [f"d{index // ROOTS % 4 ** (level + 1) // 4 ** level}" for level in range(DEPTH)]
+        directory = os.path.join(root, *parts)
+        for depth in range(1, len(parts) + 1):
+            parent = os.path.join(root, *parts[:depth])
+            if not os.path.isdir(parent):
+                os.mkdir(parent)
+                dirs.append(parent)
+        for number in range(FILES_PER_DIR):
+            path = os.path.join(directory, f"file{index}_{number}.tmp")
+            with open(path, "wb") as file:
+                file.write(data)
+            if number % READ_ONLY_RATIO == 0:
+                os.chmod(path, stat.S_IREAD)
+            paths.append((path, FILE_SIZE))
+    return paths, dirs
+
+
+def serial(root: str, files: list[tuple[str, int]], dirs: list[str]) -> None:
+    """The former deletion."""
+    for path, _size in files:
+        try:
+            os.remove(path)
+        except PermissionError:
+            try:
+                os.chmod(path, stat.S_IWRITE)
+                os.remove(path)
+            except OSError:
+                pass
+        except OSError:
+            pass
+    for path in sorted(dirs, key=lambda path: path.count(os.sep), reverse=True):
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+
+def rmtree(root: str, files: list[tuple[str, int]], dirs: list[str]) -> None:
+    def clear_read_only(function: Callable[..., Any], path: str, error: BaseException) -> None:
+        try:
+            os.chmod(path, stat.S_IWRITE)
+            function(path)
+        except OSError:
+            pass
+
+    for name in os.listdir(root):
+        shutil.rmtree(os.path.join(root, name), onexc=clear_read_only)
+
+
+def tree_deleter(root: str, files: list[tuple[str, int]], dirs: list[str]) -> TreeDeleter:
+    deleter = TreeDeleter([root])
+    lines = [progress.line for progress in deleter.delete(files, dirs) if progress.errors]
+    assert lines == [f"PermissionError: {deleter.stats.error_count} paths under "
+                     + os.path.join(root, LOCKED)], lines
+    return deleter
+
+
+def remaining(root: str) -> list[str]:
+    return [os.path.join(dirpath, name)
+            for dirpath, _dirnames, filenames in os.walk(root) for name in filenames]
+
+
+def measure(label: str, root: str, files: int,
+            delete: Callable[[str, list[tuple[str, int]], list[str]], Any]) -> None:
+    shutil.rmtree(root, ignore_errors=True)
+    os.mkdir(root)
+    paths, dirs = create_tree(root, files)
+    locked_dir = os.path.join(root, LOCKED)
+    locked = [path for path, _size in paths if path.startswith(locked_dir + os.sep)]
+
+    with LockedFiles(locked_dir):
+        start_time = time.perf_counter()
+        result = delete(root, paths, dirs)
+        elapsed = time.perf_counter() - start_time
+
+    # only the locked files and their directories are left.
+    assert sorted(remaining(root)) == sorted(locked), label
+    read_only = paths[::READ_ONLY_RATIO]
+    assert not any(os.path.exists(path) for path, _size in read_only
+                   if not path.startswith(locked_dir + os.sep)), label
+    assert os.listdir(root) == [LOCKED], label
+    if isinstance(result, TreeDeleter):
+        stats = result.stats
+        assert stats.files == len(paths) - len(locked), stats.files
+        assert stats.size == stats.files * FILE_SIZE, stats.size
+        assert stats.errors == {("PermissionError", locked_dir): len(locked)}, stats.errors
+        locked_dirs = [path for path in dirs if path.startswith(locked_dir)]
+        assert stats.dirs == len(dirs) - len(locked_dirs), stats.dirs
+    print(f"{label:<14} {elapsed:>7.2f} s {len(paths) / elapsed / 1000:>7.1f}k files/s "
+          + f"{len(locked)} locked")
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else FILES
+    temp_dir = tempfile.mkdtemp(prefix="deleter")
+    root = os.path.join(temp_dir, "tree")
+    try:
+        measure("serial", root, files, serial)
+        measure("shutil.rmtree", root, files, rmtree)
+        measure("TreeDeleter", root, files, tree_deleter)
+    finally:
+        for dirpath, _dirnames, filenames in os.walk(temp_dir):
+            for name in filenames:
+                os.chmod(os.path.join(dirpath, name), stat.S_IWRITE)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Replay a recorded event log cleanup with a fake wevtutil.
+
+A replay file of the commands WevtutilBackend runs is written for
+CHANNELS channels: `wevtutil enum-logs`, the powershell pre-pass listing
+the record counts and sizes, and one `wevtutil clear-log` per channel
+taking CLEAR_LATENCY. EMPTY_RATIO of the channels have no records and
+one is denied. The cleanup is then replayed with ReplayBackend:
+- sequential, every channel: the former cleanup, clearing each channel
+  in turn, the empty ones included.
+- sequential, skip empty: the pre-pass without the parallel clears.
+- parallel: the channels cleared MAX_CLEARS at once.
+"""
+import os
+import tempfile
+import time
+from typing import override
+
+import _set_source_path  # noqa
+
+from system_cleaner.event_logs import (  # noqa: E402
+    EventLogCleaner, LIST_LOGS_COMMAND, LogInfo, MAX_CLEARS, WevtutilBackend
+)
+from utils.command_backend import CommandRecord, ReplayBackend  # noqa: E402
+from utils.threads import set_command_backend  # noqa: E402
+
+CHANNELS = 200
+EMPTY_RATIO = 3  # one empty channel out of every EMPTY_RATIO.
+CLEAR_LATENCY = 0.02  # seconds per clear-log.
+SPAWN_LATENCY = 0.05  # seconds of enum-logs and of the pre-pass.
+ERROR_ACCESS_DENIED = 5
+
+
+class NoPrepassBackend(WevtutilBackend):
+    """wevtutil without the pre-pass, every channel is cleared."""
+
+    @override
+    def log_infos(self, channels: list[str]) -> dict[str, LogInfo]:
+        return {}
+
+
+def write_records(path: str) -> None:
+    channels = [f"Microsoft-Windows-Channel{index}/Operational" for index in range(CHANNELS)]
+    records = [
+        CommandRecord(("wevtutil", "enum-logs"), "\n".join(channels), "", 0, SPAWN_LATENCY),
+        CommandRecord(
+            tuple(LIST_LOGS_COMMAND),
+            "\n".join(
+                f"{channel}|{0 if index % EMPTY_RATIO == 0 else index * 10}|{index * 65536}"
+                for index, channel in enumerate(channels)
+            ),
+            "", 0, SPAWN_LATENCY,
+        ),
+    ]
+    for index, channel in enumerate(channels):
+        if index == 1:
+            records.append(CommandRecord(
+                ("wevtutil", "clear-log", channel), "",
+                "Failed to clear log. Access is denied.", ERROR_ACCESS_DENIED, CLEAR_LATENCY,
+            ))
+        else:
+            records.append(CommandRecord(
+                ("wevtutil", "clear-log", channel), "", "", 0, CLEAR_LATENCY))
+    with open(path, "w", encoding="utf-8") as file:
+        file.writelines(record.to_json() + "\n" for record in records)
+
+
+def measure(label: str, path: str, cleaner: EventLogCleaner) -> float:
+    set_command_backend(ReplayBackend(path))
+    start_time = time.perf_counter()
+    errors = sum(progress.errors for progress in cleaner.clear())
+    elapsed = time.perf_counter() - start_time
+    cleared = sum(result.success and not result.skipped for result in cleaner.results)
+    print(f"{label:<28} {elapsed:>7.2f} s {cleared:>4} cleared {errors:>2} errors")
+    return elapsed
+
+
+def main() -> None:
+    fd, path = tempfile.mkstemp(prefix="event_logs", suffix=".jsonl")
+    os.close(fd)
+    try:
+        write_records(path)
+        before = measure("sequential, every channel", path,
+                         EventLogCleaner(NoPrepassBackend(), max_clears=1))
+        measure("sequential, skip empty", path,
+                EventLogCleaner(WevtutilBackend(), max_clears=1))
+        after = measure(f"parallel, {MAX_CLEARS} clears", path,
+                        EventLogCleaner(WevtutilBackend()))
+        print(f"speedup {before / after:.1f}x")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
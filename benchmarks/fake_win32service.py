@@ -0,0 +1,172 @@
+"""
+Fake of the win32service module, simulating the service control manager.
+
+`install` registers it as `win32service` before the utils are imported,
+so the service helpers run against `services`, counting the handles
+opened and closed and the calls made with a closed handle.
+"""
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+SC_MANAGER_CONNECT = 0x0001
+SC_MANAGER_ENUMERATE_SERVICE = 0x0004
+SERVICE_QUERY_CONFIG = 0x0001
+SERVICE_QUERY_STATUS = 0x0004
+SERVICE_START = 0x0010
+SERVICE_STOP = 0x0020
+SERVICE_WIN32 = 0x30
+SERVICE_ACTIVE = 1
+SERVICE_STATE_ALL = 3
+SC_ENUM_PROCESS_INFO = 0
+SERVICE_CONFIG_DELAYED_AUTO_START_INFO = 3
+SERVICE_CONTROL_STOP = 1
+
+SERVICE_STOPPED = 1
+SERVICE_START_PENDING = 2
+SERVICE_STOP_PENDING = 3
+SERVICE_RUNNING = 4
+SERVICE_CONTINUE_PENDING = 5
+SERVICE_PAUSE_PENDING = 6
+
+ERROR_SERVICE_DOES_NOT_EXIST = 1060
+
+
+class error(Exception):
+    def __init__(self, winerror: int, funcname: str, strerror: str) -> None:
+        super().__init__(winerror, funcname, strerror)
+        self.winerror = winerror
+        self.funcname = funcname
+        self.strerror = strerror
+
+
+@dataclass
+class FakeService:
+    name: str
+    state: int = SERVICE_STOPPED
+    start_type: int = 3
+    delayed_auto: bool = False
+    dependencies: tuple[str, ...] = ()
+
+
+@dataclass
+class Counters:
+    scm_opens: int = 0
+    service_opens: int = 0
+    closes: int = 0
+    calls: int = 0
+    closed_handle_calls: int = 0  # calls made with a handle already closed.
+
+
+@dataclass
+class Handle:
+    name: str | None  # None for the SCM.
+    closed: bool = False
+
+
+@dataclass
+class State:
+    services: dict[str, FakeService] = field(default_factory=dict[str, FakeService])
+    counters: Counters = field(default_factory=Counters)
+    latency: float = 0.0  # seconds slept by each call.
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+state = State()
+
+
+def reset(services: list[FakeService], latency: float = 0.0) -> None:
+    state.services = {svc.name.lower(): svc for svc in services}
+    state.counters = Counters()
+    state.latency = latency
+
+
+def _call(handle: Handle) -> None:
+    with state.lock:
+        state.counters.calls += 1
+    if state.latency:
+        time.sleep(state.latency)
+    if handle.closed:  # closed before or during the call.
+        with state.lock:
+            state.counters.closed_handle_calls += 1
+
+
+def _service(handle: Handle) -> FakeService:
+    _call(handle)
+    assert handle.name is not None
+    return state.services[handle.name]
+
+
+def OpenSCManager(_machine: str | None, _database: str | None, _access: int) -> Handle:
+    with state.lock:
+        state.counters.scm_opens += 1
+    return Handle(None)
+
+
+def OpenService(scm: Handle, name: str, _access: int) -> Handle:
+    _call(scm)
+    if name.lower() not in state.services:
+        raise error(ERROR_SERVICE_DOES_NOT_EXIST, "OpenService",
+                    "The specified service does not exist as an installed service.")
+    with state.lock:
+        state.counters.service_opens += 1
+    return Handle(name.lower())
+
+
+def CloseServiceHandle(handle: Handle) -> None:
+    with state.lock:
+        state.counters.closes += 1
+        handle.closed = True
+
+
+def QueryServiceStatus(handle: Handle) -> tuple[int, ...]:
+    svc = _service(handle)
+    return (SERVICE_WIN32, svc.state, 0, 0, 0, 0, 0)
+
+
+def StartService(handle: Handle, _args: object) -> None:
+    _service(handle).state = SERVICE_RUNNING
+
+
+def ControlService(handle: Handle, _control: int) -> tuple[int, ...]:
+    svc = _service(handle)
+    svc.state = SERVICE_STOPPED
+    return (SERVICE_WIN32, svc.state, 0, 0, 0, 0, 0)
+
+
+def QueryServiceConfig(handle: Handle) -> tuple[object, ...]:
+    svc = _service(handle)
+    return (SERVICE_WIN32, svc.start_type, 1, "", "", 0, list(svc.dependencies), "", svc.name)
+
+
+def QueryServiceConfig2(handle: Handle, _level: int) -> bool:
+    return _service(handle).delayed_auto
+
+
+def EnumServicesStatus(scm: Handle, _type: int, _state: int) -> tuple[object, ...]:
+    _call(scm)
+    return tuple((svc.name, svc.name, (SERVICE_WIN32, svc.state, 0, 0, 0, 0, 0))
+                 for svc in state.services.values())
+
+
+def EnumServicesStatusEx(scm: Handle, _type: int, _state: int, _level: int) -> tuple[object, ...]:
+    _call(scm)
+    return tuple({"ServiceName": svc.name, "DisplayName": svc.name,
+                  "CurrentState": svc.state, "ProcessId": 0}
+                 for svc in state.services.values())
+
+
+def GetServiceKeyName(scm: Handle, display_name: str) -> str:
+    _call(scm)
+    return display_name
+
+
+def GetServiceDisplayName(scm: Handle, service_name: str) -> str:
+    _call(scm)
+    return service_name
+
+
+def install() -> None:
+    """Register the fake as the win32service module."""
+    sys.modules["win32service"] = sys.modules[__name__]
@@ -0,0 +1,102 @@
+"""
+Compare the junk file scanner with the os.walk walker it replaced.
+
+A synthetic tree of FILES files (the first argument, a million by
+default) is created in a temporary directory, spread over directories of
+FILES_PER_DIR files, JUNK_RATIO of them having a junk extension. Each
+walker then lists the junk files of the whole tree:
+- os.walk, the former `scan_dir`: a single thread walking the tree and
+  splitting the extension of every file name.
+- JunkScanner, listing directories with scandir in the worker pool and
+  matching suffixes against a set.
+- build_index, the scanner plus the stat and rule checks of the cleanup
+  index, without a scan cache.
+
+Every walker runs ROUNDS times and the best time is kept, so the tree is
+in the OS cache for all of them.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Generator
+
+import _set_source_path  # noqa
+
+from system_cleaner.junk_index import build_index  # noqa: E402
+from system_cleaner.rules import CleanupRule  # noqa: E402
+from system_cleaner.scanner import JunkScanner  # noqa: E402
+
+FILES = 1_000_000
+FILES_PER_DIR = 100
+FANOUT = 32  # sub-directories per directory.
+JUNK_RATIO = 20  # one junk file out of every JUNK_RATIO.
+ROUNDS = 3
+EXTENSIONS = ['.tmp', '.chk', '.gid', '.log', '._mp', '.old']
+OTHER_EXTENSIONS = ['.dll', '.exe', '.txt', '.ini', '.dat', '']
+
+
+def create_tree(root: str, files: int) -> int:
+    """Create the synthetic tree, return the number of junk files."""
+    directories = max(1, files // FILES_PER_DIR)
+    junk = 0
+    for index in range(directories):
+        # directory i is a child of directory i // FANOUT.
+        parts: list[str] = []
+        parent = index
+        while parent:
+            parts.append(f"d{parent % FANOUT}")
+            parent //= FANOUT
+        directory = os.path.join(root, *reversed(parts))
+        os.makedirs(directory, exist_ok=True)
+        for number in range(FILES_PER_DIR):
+            if number % JUNK_RATIO == 0:
+                ext = EXTENSIONS[number % len(EXTENSIONS)]
+                junk += 1
+            else:
+                ext = OTHER_EXTENSIONS[number % len(OTHER_EXTENSIONS)]
+            open(os.path.join(directory, f"file{number}{ext}"), "wb").close()
+    return junk
+
+
+def walk(directory: str, extensions: list[str]) -> Generator[str, None, None]:
+    """The former `scan_dir`."""
+    for dirpath, _dirnames, filenames in os.walk(directory):
+        for filename in filenames:
+            _root, ext = os.path.splitext(filename)
+            if ext not in extensions:
+                continue  # skip file
+            yield os.path.join(dirpath, filename)
+
+
+def measure(label: str, walker: Callable[[], int], files: int, junk: int) -> None:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start_time = time.perf_counter()
+        found = walker()
+        best = min(best, time.perf_counter() - start_time)
+        assert found == junk, f"{label}: found {found} junk files, expected {junk}"
+    print(f"{label:<16} {best:>8.2f} s {files / best / 1000:>9.0f}k files/s")
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else FILES
+    root = tempfile.mkdtemp(prefix="junk_scanner")
+    try:
+        start_time = time.perf_counter()
+        junk = create_tree(root, files)
+        print(f"created {files} files, {junk} junk, "
+              + f"in {time.perf_counter() - start_time:.1f} s")
+
+        rule = CleanupRule("Junk files", (root,), tuple(f"*{ext}" for ext in EXTENSIONS))
+        measure("os.walk", lambda: sum(1 for _ in walk(root, EXTENSIONS)), files, junk)
+        measure("JunkScanner", lambda: sum(1 for _ in JunkScanner(EXTENSIONS).scan(root)),
+                files, junk)
+        measure("build_index", lambda: len(build_index([rule])), files, junk)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
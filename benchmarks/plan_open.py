@@ -0,0 +1,111 @@
+"""
+Replay the powercfg commands of opening the power plans.
+
+benchmarks/data/powercfg_plan_open.jsonl holds the commands PowercfgBackend
+runs, with their latency: `powercfg -getactivescheme` and `-list` to list
+the plans, then `powercfg /query <scheme>` for each of the default plans,
+and a failing query of a deleted plan. The plans are listed as on the power
+options page, then each plan is opened ROUNDS times, reading its display
+and sleep timeouts:
+- uncached: the command cache cleared before each plan, a single command
+  runs per plan, a command not in the records fails the replay.
+- cached: the cache kept, no command runs once the plans were opened.
+
+The commands are replayed with their recorded latency, times LATENCY_SCALE.
+"""
+import os
+import time
+from typing import Any, Callable, override
+
+import _set_source_path  # noqa
+
+from utils import power  # noqa: E402
+from utils.command_backend import ReplayBackend  # noqa: E402
+from utils.power_backend import POWERCFG_CACHE, PowercfgBackend, set_power_backend  # noqa: E402
+from utils.threads import Result, set_command_backend  # noqa: E402
+
+RECORDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "powercfg_plan_open.jsonl")
+LATENCY_SCALE = 1.0
+ROUNDS = 5
+ACTIVE = ("Balanced", "381b4222-f694-41f0-9685-ff5bb260df2e")
+DELETED_GUID = "bad0c0de-0000-4000-8000-000000000000"
+
+# scheme GUID -> (AC, DC) display and sleep timeouts in minutes.
+TIMEOUTS = {
+    "381b4222-f694-41f0-9685-ff5bb260df2e": ((10, 5), (30, 15)),
+    "8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c": ((15, 10), (0, 60)),
+    "a1841308-3541-4fab-bc81-f71556f20b4a": ((5, 2), (15, 10)),
+}
+
+
+class CountingReplay(ReplayBackend):
+    """Replay the records, counting the commands and the unrecorded ones."""
+
+    def __init__(self, path: str, latency_scale: float = 1.0) -> None:
+        super().__init__(path, latency_scale)
+        self.commands = 0
+        self.unrecorded: list[list[str]] = []
+
+    @override
+    def run(self, command: list[str], timeout: float | None = None,
+            on_output: Callable[[str], Any] | None = None) -> Result[str]:
+        self.commands += 1
+        result = super().run(command, timeout, on_output)
+        if result.stats is None:
+            self.unrecorded.append(command)
+        return result
+
+
+def list_plans() -> list[str]:
+    active = power.active()
+    schemes = power.schemes()
+    assert active.value == ACTIVE, active
+    assert schemes.value is not None, schemes.error
+    assert [guid for _name, guid in schemes.value] == list(TIMEOUTS), schemes.value
+    return [guid for _name, guid in schemes.value]
+
+
+def open_plan(replay: CountingReplay, guid: str) -> None:
+    display = power.get_display_timeout(guid)
+    sleep = power.get_sleep_timeout(guid)
+    assert not replay.unrecorded, f"unrecorded commands {replay.unrecorded}"
+    assert (display.value, sleep.value) == TIMEOUTS[guid], (guid, display, sleep)
+
+
+def measure(label: str, before_plan: Callable[[], None]) -> float:
+    replay = CountingReplay(RECORDS, LATENCY_SCALE)
+    set_command_backend(replay)
+    POWERCFG_CACHE.invalidate()
+    guids = list_plans()
+    for guid in guids:  # the first opening fills the cache.
+        open_plan(replay, guid)
+
+    replay.commands = 0
+    elapsed = 0.0
+    for _ in range(ROUNDS):
+        for guid in guids:
+            before_plan()
+            start_time = time.perf_counter()
+            open_plan(replay, guid)
+            elapsed += time.perf_counter() - start_time
+    plans = ROUNDS * len(guids)
+    print(f"{label:<10} {elapsed / plans * 1000:>8.2f} ms/plan "
+          + f"{replay.commands / plans:>5.2f} commands/plan")
+    return replay.commands / plans
+
+
+def main() -> None:
+    set_power_backend(PowercfgBackend())
+
+    commands = measure("uncached", POWERCFG_CACHE.invalidate)
+    assert commands == 1, f"{commands:.2f} commands per plan"
+    commands = measure("cached", lambda: None)
+    assert commands == 0, f"{commands:.2f} commands per plan"
+
+    result = power.get_display_timeout(DELETED_GUID)
+    assert result.value is None and result.error.winerr == 1, result
+    print(f"deleted plan: {result.error.stderr}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Compare the per-call latency of the power backends.
+
+Opening a plan reads its display and sleep timeouts. This times those
+reads with each backend:
+- PowercfgBackend reads both timeouts from the tree of the one cached
+  `powercfg /query <scheme>`, parsed once per output. It runs against a fake command backend that renders
+  the output of a synthetic scheme and sleeps SPAWN_LATENCY per command,
+  roughly the cost of starting powercfg.
+- MemoryPowerBackend stands in for the native PowrProf backend, which
+  only exists on windows. It reads a value directly, without a process
+  or any text parsing.
+
+The powercfg rows are timed with the command cache cleared before each
+plan, checking a single command runs per plan, then with the cache kept.
+"""
+import time
+from typing import Any, Callable, override
+
+import _set_source_path  # noqa
+
+from utils import power  # noqa: E402
+from utils.power_backend import (  # noqa: E402
+    MemoryPowerBackend, POWERCFG_CACHE, PowercfgBackend, set_power_backend
+)
+from utils.power_scheme import (  # noqa: E402
+    parse, STANDBYIDLE, SUB_SLEEP, SUB_VIDEO, VIDEOIDLE
+)
+from utils.threads import CommandBackend, Result, set_command_backend  # noqa: E402
+
+SCHEME_GUID = "381b4222-f694-41f0-9685-ff5bb260df2e"
+SUBGROUPS = 20
+SETTINGS = 6  # per subgroup.
+SPAWN_LATENCY = 0.02
+CALLS = 50
+
+
+def guid(group: int, index: int) -> str:
+    return f"{group:08x}-0000-4000-8000-{index:012x}"
+
+
+def render_setting(lines: list[str], setting_guid: str, name: str, ac: int, dc: int) -> None:
+    lines += [
+        f"    Power Setting GUID: {setting_guid}  ({name})",
+        "      Minimum Possible Setting: 0x00000000",
+        "      Maximum Possible Setting: 0xffffffff",
+        "      Possible Settings increment: 0x00000001",
+        "      Possible Settings units: Seconds",
+        f"    Current AC Power Setting Index: 0x{ac:08x}",
+        f"    Current DC Power Setting Index: 0x{dc:08x}",
+        "",
+    ]
+
+
+def render() -> str:
+    """Return the powercfg /query output of the scheme."""
+    lines = [f"Power Scheme GUID: {SCHEME_GUID}  (Balanced)"]
+    subgroups = [(SUB_VIDEO, VIDEOIDLE), (SUB_SLEEP, STANDBYIDLE)]
+    subgroups += [(guid(i, 0), "") for i in range(1, SUBGROUPS - 1)]
+    for sub_guid, known_guid in subgroups:
+        lines.append(f"  Subgroup GUID: {sub_guid}  (Subgroup)")
+        settings = [guid(int(sub_guid[:8], 16), j) for j in range(1, SETTINGS)]
+        if known_guid:
+            settings.append(known_guid)
+        for index, guid_value in enumerate(settings):
+            render_setting(lines, guid_value, "Setting", 600 + index, 300 + index)
+    return "\n".join(lines) + "\n"
+
+
+class FakePowercfg(CommandBackend):
+    def __init__(self) -> None:
+        self.commands = 0
+        self._scheme = render()
+
+    @override
+    def run(self, command: list[str], timeout: float | None = None,
+            on_output: Callable[[str], Any] | None = None) -> Result[str]:
+        assert command == ["powercfg", "/query", SCHEME_GUID], command
+        self.commands += 1
+        time.sleep(SPAWN_LATENCY)
+        return Result(self._scheme)
+
+
+def open_plan() -> None:
+    display = power.get_display_timeout(SCHEME_GUID)
+    sleep = power.get_sleep_timeout(SCHEME_GUID)
+    assert display.value is not None and sleep.value is not None
+
+
+def measure(label: str, before_call: Callable[[], None] = lambda: None,
+            commands: Callable[[], int] = lambda: 0) -> float:
+    elapsed = 0.0
+    for _ in range(CALLS):
+        before_call()
+        start_time = time.perf_counter()
+        open_plan()
+        elapsed += time.perf_counter() - start_time
+    print(f"{label:<32} {elapsed / CALLS * 1000:>9.3f} ms/plan "
+          + f"{commands() / CALLS:>5.2f} commands/plan")
+    return commands() / CALLS
+
+
+def main() -> None:
+    fake = FakePowercfg()
+    set_command_backend(fake)
+    set_power_backend(PowercfgBackend())
+    commands = measure("powercfg, uncached", POWERCFG_CACHE.invalidate, lambda: fake.commands)
+    assert commands == 1, f"{commands} commands per plan, expected 1"
+    fake.commands = 0
+    measure("powercfg, cached", commands=lambda: fake.commands)
+
+    # the cost left without spawning: parsing the scheme for each value.
+    output = render()
+    start_time = time.perf_counter()
+    for _ in range(CALLS):
+        parse(output).setting(VIDEOIDLE)
+    print(f"{'parse whole scheme, no spawn':<32} "
+          + f"{(time.perf_counter() - start_time) / CALLS * 1000:>9.3f} ms/value")
+
+    set_power_backend(MemoryPowerBackend([parse(output)]))
+    measure("memory backend (native stand-in)")
+
+
+if __name__ == '__main__':
+    main()
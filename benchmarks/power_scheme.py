@@ -0,0 +1,94 @@
+"""
+Parse the `powercfg /query <scheme>` outputs of benchmarks/data.
+
+The outputs of the Balanced, High performance and Power saver schemes,
+and of Balanced on a german Windows with CRLF line endings, are parsed
+ROUNDS times each. The tree is checked against the outputs: the scheme,
+the subgroup and setting counts, the AC/DC indices of a few settings, the
+range of the timeouts and percentages, and the possible values of the lid
+action. The best parse time of each scheme is printed.
+"""
+import os
+import time
+
+import _set_source_path  # noqa
+
+from utils.power_scheme import (  # noqa: E402
+    parse, PowerScheme, STANDBYIDLE, SUB_SLEEP, SUB_VIDEO, VIDEOIDLE
+)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+ROUNDS = 200
+SUBGROUPS = 13
+SETTINGS = 29
+SECONDS_RANGE = (0, 0xffffffff, 1)
+PERCENT_RANGE = (0, 100, 1)
+
+# file, scheme GUID, alias, name, units of seconds,
+# (ac, dc) of VIDEOIDLE, STANDBYIDLE, PROCTHROTTLEMAX, lid action names.
+SCHEMES = [
+    ("powercfg_query_balanced.txt", "381b4222-f694-41f0-9685-ff5bb260df2e",
+     "SCHEME_BALANCED", "Balanced", "Seconds", (600, 300), (1800, 900), (100, 100),
+     ["Do nothing", "Sleep", "Hibernate", "Shut down"]),
+    ("powercfg_query_high_performance.txt", "8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c",
+     "SCHEME_MIN", "High performance", "Seconds", (900, 600), (0, 3600), (100, 100),
+     ["Do nothing", "Sleep", "Hibernate", "Shut down"]),
+    ("powercfg_query_power_saver.txt", "a1841308-3541-4fab-bc81-f71556f20b4a",
+     "SCHEME_MAX", "Power saver", "Seconds", (300, 120), (900, 600), (100, 70),
+     ["Do nothing", "Sleep", "Hibernate", "Shut down"]),
+    ("powercfg_query_balanced_de.txt", "381b4222-f694-41f0-9685-ff5bb260df2e",
+     "SCHEME_BALANCED", "Ausbalanciert", "Sekunden", (600, 300), (1800, 900), (100, 100),
+     ["Nichts unternehmen", "Energie sparen", "Ruhezustand", "Herunterfahren"]),
+]
+
+
+def check(scheme: PowerScheme, guid: str, alias: str, name: str, units: str,
+          video: tuple[int, int], standby: tuple[int, int], processor: tuple[int, int],
+          lid_actions: list[str]) -> None:
+    assert (scheme.guid, scheme.alias, scheme.name) == (guid, alias, name), scheme.name
+    assert len(scheme.subgroups) == SUBGROUPS, len(scheme.subgroups)
+    settings = sum(len(subgroup.settings) for subgroup in scheme.subgroups.values())
+    assert settings == SETTINGS, settings
+
+    for subgroup_guid, setting_guid, indices in (
+        (SUB_VIDEO, VIDEOIDLE, video), (SUB_SLEEP, STANDBYIDLE, standby)
+    ):
+        setting = scheme.subgroups[subgroup_guid].settings[setting_guid]
+        assert (setting.ac_value, setting.dc_value) == indices, setting.name
+        assert (setting.minimum, setting.maximum, setting.increment) == SECONDS_RANGE
+        assert setting.units == units and not setting.values, setting.name
+
+    setting = scheme.setting("PROCTHROTTLEMAX")
+    assert setting is not None
+    assert (setting.ac_value, setting.dc_value) == processor, setting.name
+    assert (setting.minimum, setting.maximum, setting.increment) == PERCENT_RANGE
+    assert setting.units == "%"
+
+    subgroup = scheme.subgroup("SUB_BUTTONS")
+    setting = scheme.setting("LIDACTION")
+    assert subgroup is not None and setting is not None
+    assert len(subgroup.settings) == 3
+    assert [value.name for value in setting.values] == lid_actions, setting.values
+    assert [value.index for value in setting.values] == list(range(len(lid_actions)))
+    assert setting.minimum is None and not setting.units, setting.name
+
+    # subgroups without an alias keep their settings.
+    subgroup = scheme.subgroups["9596fb26-9850-41fd-ac3e-f7c3c00afd4b"]
+    assert subgroup.alias == "" and len(subgroup.settings) == 2
+
+
+def main() -> None:
+    for file_name, *expected in SCHEMES:
+        with open(os.path.join(DATA_DIR, file_name), encoding="utf-8", newline="") as file:
+            output = file.read()
+        check(parse(output), *expected)
+        best = float("inf")
+        for _ in range(ROUNDS):
+            start_time = time.perf_counter()
+            parse(output)
+            best = min(best, time.perf_counter() - start_time)
+        print(f"{file_name:<38} {len(output) / 1024:>5.1f} KiB {best * 1000:>7.3f} ms/scheme")
+
+
+if __name__ == '__main__':
+    main()
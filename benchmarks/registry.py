@@ -0,0 +1,219 @@
+"""
+Exercise the registry toggles and readers on the MemoryRegistry.
+
+- toggles: each power and windows update `set_*` is turned off and on
+  again, checking its `is_*` and the values left in the registry. Then
+  the `is_*` of the power options and windows update pages are read
+  ROUNDS times, each call opening its own keys, and with a single
+  RegistrySession kept across the rounds, counting the keys opened.
+- startup types: `startup_types` of services automatic, delayed or not,
+  manual and disabled, read from the registry without querying any service.
+- errors: the readers and writers of service start values on a missing
+  and on a denied key, checked to return the Result errors built from the
+  errors winreg raises: the FileNotFoundError and PermissionError of
+  `OSError(errno, strerror, None, winerror)`.
+"""
+import errno
+import time
+from typing import Any, Callable, override
+
+import _set_source_path  # noqa
+import fake_win32service as fake
+
+fake.install()
+
+from utils import power, registry, service  # noqa: E402
+from utils.registry_backend import (  # noqa: E402
+    HKEY_CURRENT_USER, HKEY_LOCAL_MACHINE, KEY_READ, KEY_WRITE, KeyHandle, MemoryRegistry,
+    set_registry_backend
+)
+from utils.threads import CommandBackend, Error, Result, set_command_backend  # noqa: E402
+from windows_update import update  # noqa: E402
+
+ROUNDS = 2000
+ERROR_FILE_NOT_FOUND = 2
+ERROR_ACCESS_DENIED = 5
+
+GAMEBAR_KEY = "SOFTWARE\\Microsoft\\GameBar"
+SESSION_POWER_KEY = "SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Power"
+POWER_KEY = "SYSTEM\\CurrentControlSet\\Control\\Power"
+AUTO_UPDATE_KEY = "SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\WindowsUpdate\\Auto Update"
+POLICIES_KEY = "SOFTWARE\\Policies\\Microsoft\\Windows"
+
+# name, is_*, set_*, the value the toggle turned off leaves.
+TOGGLES: list[tuple[str, Callable[..., bool], Callable[[bool], None], tuple[int, str, str, int]]] = [
+    ("game mode", power.is_gamemode_enabled, power.set_gamemode,
+     (HKEY_CURRENT_USER, GAMEBAR_KEY, "AutoGameModeEnabled", 0)),
+    ("fast startup", power.is_fast_startup_enabled, power.set_fast_startup,
+     (HKEY_LOCAL_MACHINE, SESSION_POWER_KEY, "HiberbootEnabled", 0)),
+    ("hibernation", power.is_hibernation_enabled, power.set_hibernation,
+     (HKEY_LOCAL_MACHINE, POWER_KEY, "HibernateEnabled", 0)),
+    ("usb power saving", power.is_usb_power_saving_enabled, power.set_usb_power_saving,
+     (HKEY_LOCAL_MACHINE, f"{service.SERVICES_KEY}\\USB", "DisableSelectiveSuspend", 1)),
+    ("power throttling", power.is_powerthrottling_enabled, power.set_power_throttling,
+     (HKEY_LOCAL_MACHINE, f"{POWER_KEY}\\PowerThrottling", "PowerThrottlingOff", 1)),
+    ("automatic updates", update.is_automatic_updates_enabled, update.set_automatic_updates,
+     (HKEY_LOCAL_MACHINE, AUTO_UPDATE_KEY, "AUOptions", 1)),
+    ("driver updates", update.is_automatic_drivers_updates_enabled,
+     update.set_automatic_drivers_updates,
+     (HKEY_LOCAL_MACHINE, f"{POLICIES_KEY}\\WindowsUpdate", "ExcludeWUDriversInQualityUpdate", 1)),
+]
+
+# service: (Start, DelayedAutostart or None if absent, expected startup type).
+STARTUP_TYPES = {
+    "auto": (2, None, "automatic"),
+    "delayed": (2, 1, "automatic-delayed"),
+    "not_delayed": (2, 0, "automatic"),
+    "manual": (3, None, "manual"),
+    "manual_delayed": (3, 1, "manual"),  # only automatic services are delayed.
+    "disabled": (4, None, "disabled"),
+}
+
+
+class CountingRegistry(MemoryRegistry):
+    """Count the keys opened."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.opened = 0
+
+    @override
+    def OpenKey(self, key: KeyHandle, sub_key: str, reserved: int = 0,
+                access: int = KEY_READ) -> KeyHandle:
+        self.opened += 1
+        return super().OpenKey(key, sub_key, reserved, access)
+
+
+class NoCommands(CommandBackend):
+    """Fail on any command, the registry must be enough."""
+
+    @override
+    def run(self, command: list[str], timeout: float | None = None,
+            on_output: Callable[[str], Any] | None = None) -> Result[str]:
+        raise AssertionError(f"{command} run")
+
+
+def windows_registry() -> CountingRegistry:
+    """Return the keys the toggles expect to exist, with their default values."""
+    backend = CountingRegistry()
+    backend.set_value(HKEY_CURRENT_USER, GAMEBAR_KEY, "AutoGameModeEnabled", 1)
+    backend.set_value(HKEY_LOCAL_MACHINE, SESSION_POWER_KEY, "HiberbootEnabled", 1)
+    backend.set_value(HKEY_LOCAL_MACHINE, POWER_KEY, "HibernateEnabled", 1)
+    backend.set_value(HKEY_LOCAL_MACHINE, AUTO_UPDATE_KEY, "AUOptions", 0)
+    for path in (service.SERVICES_KEY, POLICIES_KEY):
+        backend.CloseKey(backend.CreateKeyEx(HKEY_LOCAL_MACHINE, path, 0, KEY_WRITE))
+    return backend
+
+
+def check_toggles(backend: CountingRegistry) -> None:
+    for name, is_enabled, set_enabled, (hive, path, value_name, off_value) in TOGGLES:
+        assert is_enabled(), f"{name} disabled by default"
+        set_enabled(False)
+        assert not is_enabled(), f"{name} still enabled"
+        with registry.RegistrySession() as session:
+            assert not is_enabled(session), f"{name} enabled in a session"
+            assert session.key_value(hive, path, value_name) == off_value, name
+        set_enabled(True)
+        assert is_enabled(), f"{name} still disabled"
+    print(f"{len(TOGGLES)} toggles turned off and on")
+
+    values: list[list[bool]] = []
+    for label, session in (("no session", None), ("one session", registry.RegistrySession())):
+        backend.opened = 0
+        start_time = time.perf_counter()
+        for _ in range(ROUNDS):
+            values.append([is_enabled(session) for _name, is_enabled, *_ in TOGGLES])
+        elapsed = time.perf_counter() - start_time
+        if session is not None:
+            session.close()
+        print(f"{label:<12} {elapsed / ROUNDS * 1e6:>8.1f} us/page "
+              + f"{backend.opened / ROUNDS:>6.3f} keys opened/page")
+    assert all(page == [True] * len(TOGGLES) for page in values)
+
+
+def check_startup_types(backend: MemoryRegistry) -> None:
+    for name, (start, delayed, _startup_type) in STARTUP_TYPES.items():
+        path = f"{service.SERVICES_KEY}\\{name}"
+        backend.set_value(HKEY_LOCAL_MACHINE, path, "Start", start)
+        if delayed is not None:
+            backend.set_value(HKEY_LOCAL_MACHINE, path, "DelayedAutostart", delayed)
+
+    set_command_backend(NoCommands())
+    results = service.startup_types(STARTUP_TYPES)
+    assert {name: result.value for name, result in results.items()} == {
+        name: startup_type for name, (_start, _delayed, startup_type) in STARTUP_TYPES.items()
+    }, results
+    print(f"{len(STARTUP_TYPES)} startup types read from the registry")
+
+
+def winreg_error[E: OSError](cls: type[E], code: int, winerror: int, message: str) -> E:
+    """Return the error winreg raises, as built by PyErr_SetExcFromWindowsErr."""
+    return cls(code, message, None, winerror)
+
+
+def check_errors(backend: MemoryRegistry) -> None:
+    missing = "missing"
+    denied = "denied"
+    backend.deny(HKEY_LOCAL_MACHINE, f"{service.SERVICES_KEY}\\{denied}")
+    not_found = winreg_error(FileNotFoundError, errno.ENOENT, ERROR_FILE_NOT_FOUND,
+                             "The system cannot find the file specified")
+    access_denied = winreg_error(PermissionError, errno.EACCES, ERROR_ACCESS_DENIED,
+                                 "Access is denied")
+
+    for name, error, winerror in (
+        (missing, not_found, ERROR_FILE_NOT_FOUND), (denied, access_denied, ERROR_ACCESS_DENIED)
+    ):
+        path = f"{service.SERVICES_KEY}\\{name}"
+        try:
+            backend.OpenKey(HKEY_LOCAL_MACHINE, path)
+        except OSError as raised:
+            assert type(raised) is type(error), raised
+            assert (raised.errno, raised.strerror, str(raised)) == (
+                error.errno, error.strerror, str(error)), raised
+            assert getattr(raised, "winerror") == winerror, raised
+        else:
+            raise AssertionError(f"{path} opened")
+
+    reg_path = f"HKEY_LOCAL_MACHINE\\{service.SERVICES_KEY}"
+    expected: list[tuple[Result[int] | Result[str], Error]] = [
+        (service.startup_value(missing),
+         Error(ERROR_FILE_NOT_FOUND, f"{reg_path}\\{missing} doesn't exist.")),
+        (service.startup_value(denied),
+         Error(ERROR_ACCESS_DENIED, f"{access_denied}\nCouldn't open key: {reg_path}\\{denied}")),
+    ]
+    for result, error in expected:
+        assert result.value is None, result.value
+        assert (result.error.winerr, result.error.stderr) == (error.winerr, error.stderr), \
+            result.error
+
+    for name, status, message in (
+        (missing, ERROR_FILE_NOT_FOUND, f"{reg_path}\\{missing} doesn't exist."),
+        (denied, ERROR_ACCESS_DENIED, f"{access_denied}\nCouldn't open key: {reg_path}\\{denied}"),
+    ):
+        status_result = service.set_startup_value(name, "manual")
+        assert (status_result.status, status_result.error) == (status, message), status_result
+
+    with registry.RegistrySession() as session:
+        values = session.read_many([
+            (HKEY_LOCAL_MACHINE, f"{service.SERVICES_KEY}\\{missing}", "Start"),
+            (HKEY_LOCAL_MACHINE, f"{service.SERVICES_KEY}\\{denied}", "Start"),
+        ])
+    missing_error, denied_error = values.values()
+    assert isinstance(missing_error, registry.KeyNotExistsError), missing_error
+    assert str(missing_error) == f"{reg_path}\\{missing} doesn't exist.", missing_error
+    assert isinstance(denied_error, PermissionError), denied_error
+    assert str(denied_error) == str(access_denied), denied_error
+    assert getattr(denied_error, "__notes__") == [f"Couldn't open key: {reg_path}\\{denied}"]
+    print("missing and denied keys give the winreg errors")
+
+
+def main() -> None:
+    backend = windows_registry()
+    set_registry_backend(backend)
+    check_toggles(backend)
+    check_startup_types(backend)
+    check_errors(backend)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Count the handles opened by the service helpers per bulk operation.
+
+Runs against the fake win32service: the status of each configured
+service is queried once per call, as before the pool, then within a
+shared `service.handles()` context. The last run checks out handles from
+concurrent threads with a small pool, so handles are discarded while in
+use, and counts the calls made with a closed handle.
+
+The snapshot runs count the SCM calls of `ServiceSnapshot.take`, reading
+the start configurations from a virtual registry with one unreadable
+service key, then from the service control manager only.
+"""
+import threading
+import time
+
+import _set_source_path  # noqa
+import fake_win32service as fake
+
+fake.install()
+
+from utils import service  # noqa: E402
+from utils.registry_backend import (  # noqa: E402
+    HKEY_LOCAL_MACHINE, MemoryRegistry, REG_MULTI_SZ, set_registry_backend
+)
+
+SERVICES = 64
+THREADS = 8
+ROUNDS = 20
+
+
+def bulk_status(names: list[str]) -> None:
+    for name in names:
+        service.status(name)
+
+
+def report(label: str, elapsed: float) -> None:
+    counters = fake.state.counters
+    opens = counters.scm_opens + counters.service_opens
+    print(f"{label:<28} {opens:>6} opens {counters.closes:>6} closes "
+          + f"{counters.closed_handle_calls:>4} closed handle calls {elapsed * 1000:>8.1f} ms")
+
+
+def main() -> None:
+    names = [f"svc{i}" for i in range(SERVICES)]
+    services = [fake.FakeService(name) for name in names]
+
+    fake.reset(services)
+    start_time = time.perf_counter()
+    bulk_status(names)
+    report("handles per call", time.perf_counter() - start_time)
+
+    fake.reset(services)
+    start_time = time.perf_counter()
+    with service.handles():
+        bulk_status(names)
+    report("shared pool", time.perf_counter() - start_time)
+
+    fake.reset(services, latency=0.0005)
+    handle_pool = service.HandlePool(max_handles=THREADS // 2)
+
+    def query(offset: int) -> None:
+        for i in range(ROUNDS * SERVICES // THREADS):
+            name = names[(offset + i) % SERVICES]
+            with handle_pool.service(name, service.QUERY_ACCESS) as handle:
+                fake.QueryServiceStatus(handle)
+            if i % 7 == 0:
+                handle_pool.evict(name)
+
+    threads = [threading.Thread(target=query, args=(i * 3,)) for i in range(THREADS)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    handle_pool.close()
+    report(f"{THREADS} threads, evicting", time.perf_counter() - start_time)
+
+    registry = MemoryRegistry()
+    for i, name in enumerate(names):
+        key = f"{service.SERVICES_KEY}\\{name}"
+        registry.set_value(HKEY_LOCAL_MACHINE, key, "Start", 2 + i % 3)
+        registry.set_value(HKEY_LOCAL_MACHINE, key, "DependOnService",
+                           [names[i - 1]], REG_MULTI_SZ)
+    registry.deny(HKEY_LOCAL_MACHINE, f"{service.SERVICES_KEY}\\{names[0]}")
+
+    for label, backend in (("snapshot, registry", registry),
+                           ("snapshot, SCM only", MemoryRegistry())):
+        set_registry_backend(backend)
+        fake.reset(services)
+        start_time = time.perf_counter()
+        snapshot = service.ServiceSnapshot.take(names)
+        elapsed = time.perf_counter() - start_time
+        assert all(snapshot.startup_type(name).value for name in names)
+        report(label, elapsed)
+        print(f"{'':<28} {fake.state.counters.calls:>6} SCM calls")
+
+
+if __name__ == '__main__':
+    main()
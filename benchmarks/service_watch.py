@@ -0,0 +1,106 @@
+"""
+Drive ServiceWatcher with the simulated event source.
+
+States are pushed for a few services, repeated states included, and the
+`state_changed` emissions are checked to hold only the changed states, in
+order. Then EVENTS states are pushed at once to time the delivery and
+count the batches returned by `wait`. Last, `stop` is timed while the
+watcher is blocked, and the source is checked to be released only once
+the thread has finished.
+"""
+import threading
+import time
+from typing import override
+
+import _set_source_path  # noqa
+
+from PyQt6.QtCore import QCoreApplication, Qt  # noqa: E402
+
+from utils.service_watch import (  # noqa: E402
+    RUNNING, ServiceChanges, ServiceWatcher, SimulatedEventSource, START_PENDING, STOPPED
+)
+
+EVENTS = 100_000
+SERVICES = 50
+STOP_TIMEOUT = 0.5  # seconds.
+
+
+class CountingSource(SimulatedEventSource):
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches = 0
+        self.released_after_finish: bool | None = None
+        self.watcher: ServiceWatcher | None = None
+
+    @override
+    def wait(self) -> ServiceChanges | None:
+        changes = super().wait()
+        if changes is not None:
+            self.batches += 1
+        return changes
+
+    @override
+    def release(self) -> None:
+        assert self.watcher is not None
+        self.released_after_finish = self.watcher.isFinished()
+
+
+def main() -> None:
+    app = QCoreApplication([])
+    source = CountingSource()
+    watcher = ServiceWatcher([f"svc{i}" for i in range(SERVICES)], source)
+    source.watcher = watcher
+    emitted: list[tuple[str, int]] = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def on_changed(name: str, state: int) -> None:
+        with lock:
+            emitted.append((name, state))
+            if name == "last":
+                done.set()
+
+    watcher.state_changed.connect(on_changed, Qt.ConnectionType.DirectConnection)
+    watcher.start()
+
+    pushed = [
+        ("svc0", STOPPED), ("svc0", STOPPED), ("svc1", RUNNING), ("SVC0", STOPPED),
+        ("svc0", START_PENDING), ("svc0", RUNNING), ("svc0", RUNNING), ("svc1", RUNNING),
+        ("last", RUNNING),
+    ]
+    for name, state in pushed:
+        source.push(name, state)
+    assert done.wait(5), "changes not delivered"
+    expected = [("svc0", STOPPED), ("svc1", RUNNING), ("svc0", START_PENDING),
+                ("svc0", RUNNING), ("last", RUNNING)]
+    assert emitted == expected, emitted
+    print(f"{len(pushed)} states pushed, {len(emitted)} changes emitted")
+
+    with lock:
+        emitted.clear()
+        done.clear()
+    start_time = time.perf_counter()
+    batches = source.batches
+    for i in range(EVENTS):
+        # every other push repeats the state of the service.
+        source.push(f"svc{(i // 2) % SERVICES}", STOPPED + (i // (2 * SERVICES)) % 2 * 3)
+    source.push("last", STOPPED)
+    assert done.wait(30), "changes not delivered"
+    elapsed = time.perf_counter() - start_time
+    print(f"{EVENTS} states pushed, {len(emitted)} changes emitted, "
+          + f"{source.batches - batches} batches, {elapsed * 1000:.1f} ms")
+    assert len(emitted) == EVENTS // 2 + 1
+
+    time.sleep(0.1)  # let the watcher block on the source.
+    start_time = time.perf_counter()
+    watcher.stop()
+    elapsed = time.perf_counter() - start_time
+    assert elapsed < STOP_TIMEOUT, f"stop took {elapsed:.3f} s"
+    assert source.released_after_finish, "source released before the thread finished"
+    watcher.stop()  # stopping again does nothing.
+    print(f"stop returned in {elapsed * 1000:.2f} ms, source released after the thread")
+    del app
+
+
+if __name__ == '__main__':
+    main()
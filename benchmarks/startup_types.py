@@ -0,0 +1,121 @@
+"""
+Count the processes spawned to resolve the startup types of a confirm table.
+
+The startup types of SERVICES services, a third of them automatic and
+some of those delayed, are resolved three ways:
+- registry: `startup_types` with every service key readable.
+- fallback: `startup_types` with one key out of DENIED_EVERY denied, those
+  services fall back to psutil, and to `sc qc` if automatic.
+- per row: the former `startup_type`, psutil then `sc qc` for each
+  automatic service.
+
+The registry is a MemoryRegistry, psutil.win_service_get is faked and the
+commands run on a counting command backend answering `sc qc`.
+"""
+import time
+from typing import Any, Callable, override
+
+import _set_source_path  # noqa
+import fake_win32service as fake
+
+fake.install()
+
+import psutil  # noqa: E402
+
+from utils import service  # noqa: E402
+from utils.registry_backend import (  # noqa: E402
+    HKEY_LOCAL_MACHINE, MemoryRegistry, set_registry_backend
+)
+from utils.threads import CommandBackend, Result, set_command_backend  # noqa: E402
+
+SERVICES = 90
+DENIED_EVERY = 8
+DELAYED_EVERY = 2  # of the automatic services.
+SPAWN_LATENCY = 0.01
+
+START_NAMES = {2: "AUTO_START", 3: "DEMAND_START", 4: "DISABLED"}
+
+
+class FakeSc(CommandBackend):
+    """Answer `sc qc` from the start values, counting the processes."""
+
+    def __init__(self, starts: dict[str, tuple[int, bool]]) -> None:
+        self.starts = starts
+        self.processes = 0
+
+    @override
+    def run(self, command: list[str], timeout: float | None = None,
+            on_output: Callable[[str], Any] | None = None) -> Result[str]:
+        self.processes += 1
+        time.sleep(SPAWN_LATENCY)
+        start, delayed = self.starts[command[2]]
+        delayed_text = "  (DELAYED)" if delayed else ""
+        return Result(f"SERVICE_NAME: {command[2]}\n"
+                      + f"        START_TYPE         : {start}   {START_NAMES[start]}{delayed_text}\n")
+
+
+class FakeWinService:
+    def __init__(self, start_type: str) -> None:
+        self.start_type = start_type
+
+    def as_dict(self) -> dict[str, str]:
+        return {"start_type": self.start_type}
+
+
+def main() -> None:
+    names = [f"svc{i}" for i in range(SERVICES)]
+    starts = {name: (2 + i % 3, i % 3 == 0 and (i // 3) % DELAYED_EVERY == 0)
+              for i, name in enumerate(names)}
+    expected = {
+        name: "automatic-delayed" if delayed else service.START_TYPES[start]
+        for name, (start, delayed) in starts.items()
+    }
+
+    psutil_calls = 0
+
+    def win_service_get(name: str) -> FakeWinService:
+        nonlocal psutil_calls
+        psutil_calls += 1
+        return FakeWinService(service.START_TYPES[starts[name][0]])
+
+    setattr(psutil, "win_service_get", win_service_get)
+    fake.reset([fake.FakeService(name) for name in names])
+
+    registry = MemoryRegistry()
+    for name, (start, delayed) in starts.items():
+        key = f"{service.SERVICES_KEY}\\{name}"
+        registry.set_value(HKEY_LOCAL_MACHINE, key, "Start", start)
+        if delayed:
+            registry.set_value(HKEY_LOCAL_MACHINE, key, "DelayedAutostart", 1)
+    denied = MemoryRegistry()
+    for index, (name, (start, delayed)) in enumerate(starts.items()):
+        key = f"{service.SERVICES_KEY}\\{name}"
+        if index % DENIED_EVERY == 0:
+            denied.deny(HKEY_LOCAL_MACHINE, key)
+            continue
+        denied.set_value(HKEY_LOCAL_MACHINE, key, "Start", start)
+        if delayed:
+            denied.set_value(HKEY_LOCAL_MACHINE, key, "DelayedAutostart", 1)
+
+    def per_row(service_names: list[str]) -> dict[str, Result[str]]:
+        return {name: service._query_startup_type(name) for name in service_names}
+
+    for label, backend, resolve in (
+        ("registry", registry, service.startup_types),
+        ("fallback", denied, service.startup_types),
+        ("per row", registry, per_row),
+    ):
+        set_registry_backend(backend)
+        sc = FakeSc(starts)
+        set_command_backend(sc)
+        psutil_calls = 0
+        start_time = time.perf_counter()
+        results = resolve(names)
+        elapsed = time.perf_counter() - start_time
+        assert {name: result.value for name, result in results.items()} == expected, label
+        print(f"{label:<10} {sc.processes:>4} processes {psutil_calls:>4} psutil queries "
+              + f"per table of {SERVICES} {elapsed * 1000:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
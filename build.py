@@ -83,6 +83,7 @@ def main() -> int:
     copy_files(
         script_dir, output_dir,
         "LICENSE", "INSTALL-DRIVERS.bat", config.CONFIG_FILE,
+        config.CLEANUP_RULES_FILE,
     )
 
     # copy directories to project output build directory.
@@ -13,6 +13,9 @@ from widgets.stacked_widget import StackedWidget
 
 from .packages_view import PackagesView
 
+# Seconds after which the dism command is killed.
+DISM_TIMEOUT = 300
+
 
 class Terminal(ProcessTerminal):
     @override
@@ -47,7 +50,8 @@ class PackagesUninstall(QFrame):
 
     def setupThread(self) -> None:
         self.load_packages_thread = CommandThread(
-            ["dism", "/online", "/get-packages", "/format:table"]
+            ["dism", "/online", "/get-packages", "/format:table"],
+            timeout=DISM_TIMEOUT
         )
         self.load_packages_thread.connect(self.setMainWidget)
 
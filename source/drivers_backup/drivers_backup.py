@@ -14,6 +14,10 @@ from .border_widget import BorderWidget
 from .drivers_view import DriversView
 from .errors_view import ErrorsView
 
+# Seconds after which dism and pnputil commands are killed.
+DISM_TIMEOUT = 300
+PNPUTIL_TIMEOUT = 120
+
 
 def get_backup_dir() -> str:
     path = os.path.join(os.environ.get('USERPROFILE') or '', 'documents')
@@ -52,7 +56,8 @@ class DriversBackup(QFrame):
         self.uninstall_thread = None
 
         self.load_drivers_thread = CommandThread(
-            ["dism", "/online", "/get-drivers", "/format:table"]
+            ["dism", "/online", "/get-drivers", "/format:table"],
+            timeout=DISM_TIMEOUT
         )
         self.load_drivers_thread.connect(self.setMainWidget)
 
@@ -162,7 +167,8 @@ class DriversBackup(QFrame):
 
         published_name = self.drivers_view.publishedName(row)
         self.uninstall_thread = CommandThread(
-            ["pnputil", "/uninstall", "/delete-driver", published_name, "/force"]
+            ["pnputil", "/uninstall", "/delete-driver", published_name, "/force"],
+            timeout=PNPUTIL_TIMEOUT
         )
         self.uninstall_thread.connect(
             lambda result: self.onUninstallFinish(result, row)
@@ -187,7 +193,8 @@ class DriversBackup(QFrame):
             os.makedirs(driver_dir, exist_ok=True)
 
             result = Result.from_command(
-                ["pnputil", "/export-driver", published_name, driver_dir]
+                ["pnputil", "/export-driver", published_name, driver_dir],
+                timeout=PNPUTIL_TIMEOUT
             )
             if result.value is None:
                 self.failed_drivers.append(
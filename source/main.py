@@ -19,10 +19,10 @@ from PyQt6.QtWidgets import (
 from advance_options import AdvanceOptions
 from drivers_backup import DriversBackup
 from power_options import PowerOptions
-from system_cleaner import SystemCleaner
+from system_cleaner import rules, scan_cache, SystemCleaner
 from system_info import SystemInfo
 from system_repair import SystemRepair
-from utils import config, styles, threads
+from utils import command_backend, config, registry_snapshot, styles, threads
 from widgets.stacked_widget import StackedWidget
 from windows_services import WindowsServices
 from windows_update import WindowsUpdate
@@ -168,6 +168,12 @@ if __name__ == '__main__':
     import qdarkstyle  # type: ignore[no-stub]
     os.chdir(os.path.dirname(__file__))
 
+    command_backend.install_from_environment()
+    registry_snapshot.start_session(
+        config.abs_path(registry_snapshot.SNAPSHOT_FILE)
+    )
+    scan_cache.open_cache(config.abs_path(scan_cache.SCAN_CACHE_FILE))
+    rules.set_rules_file(config.abs_path(config.CLEANUP_RULES_FILE))
     app = QApplication(sys.argv)
     app.setStyleSheet(
         qdarkstyle.load_stylesheet(qt_api='pyqt6')  # type: ignore[attr]
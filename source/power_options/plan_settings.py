@@ -22,7 +22,8 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
-from utils import power, styles
+from utils import power, power_scheme, styles
+from utils.power_scheme import STANDBYIDLE, SUB_SLEEP, SUB_VIDEO, VIDEOIDLE
 from widgets.message_bar import MessageBar
 from widgets.stacked_widget import StackedWidget
 
@@ -141,6 +142,7 @@ class DisplaySleepTimeout(QGroupBox):
         self.setupWidgets()
         self.connectSlots()
         self.callbacks: list[tuple[Callable[[str], None], str]] = []
+        self.transaction = power.SettingsTransaction(scheme_guid)
 
     def setupWidgets(self) -> None:
         """Setup the widgets in layout."""
@@ -248,48 +250,35 @@ class DisplaySleepTimeout(QGroupBox):
         self.message_bar.displayPrompt("Do you want to save these changes?")
 
     def onSaveChanges(self) -> None:
-        """Execute callbacks on save changes."""
+        """Execute callbacks and commit their changes at once on save changes."""
         for func, value in self.callbacks:
             func(value)
         self.callbacks.clear()
 
+        result = self.transaction.commit()
+        if result.status != 0:
+            self.message_bar.displayMessage(result.error, True)
+
     def changeAcDisplayTimeout(self, value: str) -> None:
         """Change monitor timeout to given value."""
-        self.changeTimeout('monitor-timeout-ac', value)
+        self.changeTimeout(SUB_VIDEO, VIDEOIDLE, True, value)
 
     def changeAcSleepTimeout(self, value: str) -> None:
         """Change system sleep timeout to given value."""
-        self.changeTimeout('standby-timeout-ac', value)
+        self.changeTimeout(SUB_SLEEP, STANDBYIDLE, True, value)
 
     def changeDcDisplayTimeout(self, value: str) -> None:
         """Change monitor timeout to given value."""
-        self.changeTimeout('monitor-timeout-dc', value)
+        self.changeTimeout(SUB_VIDEO, VIDEOIDLE, False, value)
 
     def changeDcSleepTimeout(self, value: str) -> None:
         """Change system sleep timeout to given value."""
-        self.changeTimeout('standby-timeout-dc', value)
-
-    def changeTimeout(self, setting: str, value: str) -> None:
-        """Change the specified timeout to the given value."""
-        minute = self.parse_time(value)
-        active_result = power.active()
-        if active_result.value is None:
-            return self.message_bar.displayMessage(
-                active_result.error.stderr, True
-            )
-        active_guid = active_result.value[1]
-
-        result = power.set_active(self.scheme_guid)
-        if result.status != 0:
-            return self.message_bar.displayMessage(result.error, True)
+        self.changeTimeout(SUB_SLEEP, STANDBYIDLE, False, value)
 
-        result = power.change_setting_value(setting, minute)
-        if result.status != 0:
-            self.message_bar.displayMessage(result.error, True)
-
-        result = power.set_active(active_guid)
-        if result.status != 0:
-            self.message_bar.displayMessage(result.error, True)
+    def changeTimeout(self, subgroup_guid: str, setting_guid: str, ac: bool, value: str) -> None:
+        """Stage the specified timeout change to the given value."""
+        seconds = self.parse_time(value) * 60
+        self.transaction.set_value(subgroup_guid, setting_guid, seconds, ac)
 
     @staticmethod
     def parse_time(value: str) -> int:
@@ -379,12 +368,16 @@ class PlanSettings(QFrame):
         export_button = QPushButton("Export this Scheme")
         delete_button = QPushButton("Delete this Scheme")
         advance_settings_button = QPushButton("Open Advanced Settings")
+        export_baseline_button = QPushButton("Export Settings Baseline")
+        apply_baseline_button = QPushButton("Apply Settings Baseline")
 
         rename_button.connect(self.changeSchemeName)
         duplicate_button.connect(self.duplicateScheme)
         export_button.clicked.connect(self.exportScheme)
         delete_button.clicked.connect(self.deleteScheme)
         advance_settings_button.clicked.connect(power.launch_advanced_settings)
+        export_baseline_button.clicked.connect(self.exportBaseline)
+        apply_baseline_button.clicked.connect(self.applyBaseline)
 
         widget = QWidget()
         layout = QGridLayout()
@@ -393,6 +386,8 @@ class PlanSettings(QFrame):
         layout.addWidget(export_button, 2, 0)
         layout.addWidget(delete_button, 3, 0)
         layout.addWidget(advance_settings_button, 4, 0)
+        layout.addWidget(export_baseline_button, 5, 0)
+        layout.addWidget(apply_baseline_button, 6, 0)
         layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         widget.setLayout(layout)
 
@@ -473,6 +468,56 @@ class PlanSettings(QFrame):
                 f"Successively exported scheme: {self.scheme_name!r}"
             )
 
+    def exportBaseline(self) -> None:
+        """Export setting values of the current scheme to a JSON baseline file."""
+        filepath, _ = QFileDialog.getSaveFileName(
+            self, f"Save {self.scheme_name} Settings Baseline",
+            f"{self.scheme_name}.json", "json (*.json)"
+        )
+
+        if not filepath:
+            return  # no path selected.
+
+        result = power.query_scheme(self.scheme_guid)
+        if result.value is None:
+            return self.message_bar.displayMessage(result.error.stderr, True)
+
+        try:
+            power_scheme.save_baseline(result.value, filepath)
+        except OSError as e:
+            self.message_bar.displayMessage(str(e), True)
+        else:
+            self.message_bar.displayMessage(
+                f"Exported settings baseline of scheme: {self.scheme_name!r}"
+            )
+
+    def applyBaseline(self) -> None:
+        """Apply setting values differing from a JSON baseline file."""
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, f"Apply Settings Baseline to {self.scheme_name}",
+            "", "json (*.json)"
+        )
+
+        if not filepath:
+            return  # no path selected.
+
+        try:
+            baseline = power_scheme.load_baseline(filepath)
+        except (OSError, ValueError) as e:
+            return self.message_bar.displayMessage(str(e), True)
+
+        result = power.apply_scheme(self.scheme_guid, baseline)
+        if result.value is None:
+            self.message_bar.displayMessage(result.error.stderr, True)
+        elif not result.value:
+            self.message_bar.displayMessage(
+                f"Scheme {self.scheme_name!r} already matches the baseline."
+            )
+        else:
+            self.message_bar.displayMessage(
+                f"Applied {len(result.value)} setting changes to scheme: {self.scheme_name!r}"
+            )
+
     def deleteScheme(self) -> None:
         """Delete the current scheme."""
         answer = QMessageBox.warning(
@@ -17,7 +17,7 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
-from utils import power, styles
+from utils import power, registry, registry_snapshot, styles
 from widgets.message_bar import MessageBar
 from widgets.stacked_widget import StackedWidget
 
@@ -53,11 +53,12 @@ class ToggleSettings(QGroupBox):
 
     def setStatuses(self) -> None:
         """Set checkboxes status for corresponding power settings."""
-        self.game_mode.setChecked(power.is_gamemode_enabled())
-        self.fast_startup.setChecked(power.is_fast_startup_enabled())
-        self.hibernation.setChecked(power.is_hibernation_enabled())
-        self.usb_power_saving.setChecked(power.is_usb_power_saving_enabled())
-        self.power_throttling.setChecked(power.is_powerthrottling_enabled())
+        with registry.RegistrySession() as session:
+            self.game_mode.setChecked(power.is_gamemode_enabled(session))
+            self.fast_startup.setChecked(power.is_fast_startup_enabled(session))
+            self.hibernation.setChecked(power.is_hibernation_enabled(session))
+            self.usb_power_saving.setChecked(power.is_usb_power_saving_enabled(session))
+            self.power_throttling.setChecked(power.is_powerthrottling_enabled(session))
 
     def connectSlots(self) -> None:
         """Connect the callbacks to their corresponding events."""
@@ -76,7 +77,6 @@ class ToggleSettings(QGroupBox):
         self.power_throttling.clicked.connect(
             partial(self._executeFunc, power.set_power_throttling)
         )
-        self.message_bar.connect(power.restart)  # restart on confirm.
 
     def _executeFunc(self, func: Callable[[bool], None], value: bool) -> None:
         try:
@@ -89,6 +89,7 @@ class ToggleSettings(QGroupBox):
             self.message_bar.setConfirmText("Restart")
             msg = "These changes require restart, Restart Now?"
             self.message_bar.displayPrompt(msg)
+            self.message_bar.connect(power.restart)  # restart on confirm.
 
 
 # *================================================*
@@ -144,8 +145,15 @@ class PowerOptions(QFrame):
         import_button = QPushButton("✽ Import power scheme")
         import_button.setObjectName("ImportButton")
 
+        undo_button = QPushButton("✽ Undo registry changes")
+        undo_button.setObjectName("UndoButton")
+        undo_button.setToolTip("Undo the registry changes made since the application started.")
+
         add_ultra_scheme_button.clicked.connect(self.addUltraScheme)
         import_button.clicked.connect(self.importScheme)
+        undo_button.clicked.connect(self.promptRollback)
+
+        self.toggle_settings = ToggleSettings(self.message_bar)
 
         spacer = QSpacerItem(  # spacer item for extra spacing
             20, 10, QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Fixed
@@ -156,13 +164,15 @@ class PowerOptions(QFrame):
         layout.addWidget(self.power_schemes_group_box, 0, 0)
         layout.addWidget(add_ultra_scheme_button, 1, 0)
         layout.addWidget(import_button, 2, 0)
-        layout.addItem(spacer, 3, 0)  # extra spacing
-        layout.addWidget(PowerThrottling(self.message_bar), 4, 0)
-        layout.addItem(spacer, 5, 0)   # extra spacing
-        layout.addWidget(ToggleSettings(self.message_bar), 6, 0)
+        layout.addWidget(undo_button, 3, 0)
+        layout.addItem(spacer, 4, 0)  # extra spacing
+        layout.addWidget(PowerThrottling(self.message_bar), 5, 0)
+        layout.addItem(spacer, 6, 0)   # extra spacing
+        layout.addWidget(self.toggle_settings, 7, 0)
 
         layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         layout.setAlignment(import_button, Qt.AlignmentFlag.AlignLeading)
+        layout.setAlignment(undo_button, Qt.AlignmentFlag.AlignLeading)
         layout.setAlignment(add_ultra_scheme_button, Qt.AlignmentFlag.AlignLeading)  # noqa
 
         layout.setContentsMargins(0, 0, 0, 0)
@@ -261,6 +271,29 @@ class PowerOptions(QFrame):
         if result.status != 0:
             self.showErrorMessage(result.error)
 
+    def promptRollback(self) -> None:
+        """Prompt to undo the registry changes made in this session."""
+        changes = registry_snapshot.session_changes()
+        if not changes:
+            return self.message_bar.displayMessage("No registry changes to undo.")
+
+        self.message_bar.setConfirmText("Undo")
+        self.message_bar.displayPrompt(
+            f"Undo {changes} registry changes made since the application started?"
+        )
+        self.message_bar.connect(self.rollback)
+
+    def rollback(self) -> None:
+        """Restore the registry values changed in this session."""
+        result = registry_snapshot.rollback_session()
+        self.toggle_settings.setStatuses()
+        if not result.success:
+            return self.showErrorMessage(result.error)
+
+        self.message_bar.setConfirmText("Restart")
+        self.message_bar.displayPrompt("Registry changes undone, they require restart. Restart Now?")
+        self.message_bar.connect(power.restart)
+
     def showErrorMessage(self, error: str) -> None:
         self.message_bar.displayMessage(error, True)
 
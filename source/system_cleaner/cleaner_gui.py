@@ -23,6 +23,8 @@ class CleanerGui(QWidget):
         self.clean_button = QPushButton("Clean Junk Files")
         self.clean_button.setObjectName("CleanButton")
 
+        self.preview_button = QPushButton("Preview Cleanup")
+
         self.clean_event_logs_checkbox = QCheckBox()
         self.clean_windows_update_checkbox = QCheckBox()
         self.clean_event_logs_checkbox.setChecked(True)
@@ -47,6 +49,7 @@ class CleanerGui(QWidget):
         main_layout.addWidget(self.circle_button)
         main_layout.addSpacerItem(spacer)
         main_layout.addWidget(self.clean_button)
+        main_layout.addWidget(self.preview_button)
         main_layout.addSpacerItem(spacer)
         main_layout.addLayout(layout)
         main_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -3,6 +3,7 @@ from typing import Any, Callable, override
 from PyQt6.QtGui import QTextCursor
 from PyQt6.QtWidgets import (
     QFrame,
+    QLabel,
     QPlainTextEdit,
     QPushButton,
     QSizePolicy,
@@ -10,8 +11,12 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from utils.progress import Counters, format_size
 from widgets.message_bar import Message
 
+# Lines kept in the text widget, the oldest are removed past it.
+MAX_LINES = 10000
+
 
 class BorderWidget(Message):
     def __init__(self, parent: QWidget | None = None) -> None:
@@ -25,11 +30,14 @@ class BorderWidget(Message):
     @override
     def setupWidgets(self) -> None:
         super().setupWidgets()
+        self.counters_label = QLabel()
         self.close_button = QPushButton("✕")
         self.cancel_button = QPushButton("Cancel")
+        self.clean_button = QPushButton("Clean")
 
         self.close_button.setObjectName("CloseButton")
         self.close_button.hide()  # hide initially.
+        self.clean_button.hide()  # shown after a preview.
 
         size_policy = QSizePolicy(
             QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
@@ -37,6 +45,7 @@ class BorderWidget(Message):
 
         self.close_button.setSizePolicy(size_policy)
         self.cancel_button.setSizePolicy(size_policy)
+        self.clean_button.setSizePolicy(size_policy)
 
         self.close_button.clicked.connect(
             lambda: self.showCloseButton(False)
@@ -51,6 +60,8 @@ class BorderWidget(Message):
                 f"{self.__class__.__name__} LayoutError: layout is None.", True
             )
 
+        layout.addWidget(self.counters_label)
+        layout.addWidget(self.clean_button)
         layout.addWidget(self.close_button)
         layout.addWidget(self.cancel_button)
 
@@ -62,6 +73,11 @@ class BorderWidget(Message):
         else:
             self.cancel_button.show()
             self.close_button.hide()
+            self.clean_button.hide()
+
+    def showCleanButton(self, show: bool) -> None:
+        """Show the button cleaning the previewed files if True."""
+        self.clean_button.setVisible(show)
 
 
 class CleanupView(QFrame):
@@ -73,6 +89,7 @@ class CleanupView(QFrame):
         """Setup the widgets in layout."""
         self.text_widget = QPlainTextEdit(self)
         self.text_widget.setReadOnly(True)
+        self.text_widget.setMaximumBlockCount(MAX_LINES)
         self.border_widget = BorderWidget(self)
 
         layout = QVBoxLayout(self)
@@ -93,10 +110,22 @@ class CleanupView(QFrame):
         """Set border label text message."""
         self.border_widget.setMessage(message)
 
+    def setCounters(self, counters: Counters | None) -> None:
+        """Show the files and bytes cleaned and the errors, clear if None."""
+        if counters is None:
+            return self.border_widget.counters_label.clear()
+        self.border_widget.counters_label.setText(
+            f"{counters.files} files, {format_size(counters.size)}, {counters.errors} errors"
+        )
+
     def connectClose(self, function: Callable[[], Any]) -> None:
         """Connect the function to close button press event."""
         self.border_widget.close_button.clicked.connect(function)
 
+    def connectClean(self, function: Callable[[], Any]) -> None:
+        """Connect the function to clean button press event."""
+        self.border_widget.clean_button.clicked.connect(function)
+
     def connectCancel(self, function: Callable[[], Any]) -> None:
         """Connect the function to cancel button press event."""
         self.border_widget.cancel_button.clicked.connect(function)
@@ -0,0 +1,167 @@
+"""
+Delete files in parallel in the shared worker pool.
+
+Files are deleted in batches of consecutive paths by pool tasks, as the
+paths come from a scan which lists a subtree per task, the batches spread
+over the subdirectories. A file which can't be deleted, like one locked by
+a running program, doesn't stop the deletion: the errors are counted by
+type and path prefix, the directory just under the deleted root, so
+thousands of locked files report as a few lines.
+"""
+import errno
+import os
+import queue
+import stat
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Callable, Generator, Iterable, Sequence
+
+from utils.progress import format_size, Progress
+from utils.threads import pool, Priority
+
+# Files deleted by a task, bounds the per task overhead.
+BATCH_FILES = 256
+
+
+@dataclass(slots=True)
+class DeleteStats:
+    files: int = 0
+    dirs: int = 0
+    size: int = 0  # bytes of the deleted files.
+    # errors counted by (error type, path prefix) and the first of each.
+    errors: Counter[tuple[str, str]] = field(default_factory=Counter[tuple[str, str]])
+    examples: dict[tuple[str, str], str] = field(default_factory=dict[tuple[str, str], str])
+
+    @property
+    def error_count(self) -> int:
+        return self.errors.total()
+
+    def add_error(self, error: OSError, prefix: str) -> None:
+        group = error.__class__.__name__, prefix
+        self.errors[group] += 1
+        self.examples.setdefault(group, str(error))
+
+    def error_lines(self) -> Generator[tuple[str, int], None, None]:
+        """Yield a line and the error count per group, most frequent first."""
+        for (error_type, prefix), count in self.errors.most_common():
+            if count == 1:
+                yield f"{error_type}: {self.examples[error_type, prefix]}", count
+            else:
+                yield f"{error_type}: {count} paths under {prefix}", count
+
+    def summary(self) -> str:
+        return (f"Deleted {self.files} files and {self.dirs} dirs, "
+                + f"{format_size(self.size)}, {self.error_count} errors")
+
+
+def _remove(path: str) -> None:
+    """Remove the file, clearing its read-only attribute if needed."""
+    try:
+        os.remove(path)
+    except PermissionError:
+        if os.access(path, os.W_OK):
+            raise  # locked, not read-only.
+        os.chmod(path, stat.S_IWRITE)
+        os.remove(path)
+
+
+class TreeDeleter:
+    """Delete files then their emptied directories, collecting `stats`."""
+
+    def __init__(self, roots: Iterable[str] = (), batch_files: int = BATCH_FILES,
+                 max_tasks: int | None = None) -> None:
+        """
+        Parameters:
+            - roots: The deleted directories, errors are grouped by the
+            directory just under the root containing the path.
+            - batch_files: Files deleted by a task.
+            - max_tasks: Batches deleted at once, the pool size if None.
+        """
+        # longest first, so nested roots match before their parents.
+        self.roots = sorted(
+            (os.path.normcase(os.path.normpath(root)) for root in roots), key=len, reverse=True
+        )
+        self.batch_files = batch_files
+        self.max_tasks = max_tasks
+        self.stats = DeleteStats()
+
+    def prefix(self, path: str) -> str:
+        """Return the path prefix the errors of the path are grouped by."""
+        path = os.path.normpath(path)
+        normalized = os.path.normcase(path)
+        for root in self.roots:
+            if normalized.startswith(root + os.sep):
+                relative = path[len(root) + 1:]
+                if os.sep not in relative:
+                    return path[:len(root)]
+                return path[:len(root) + 1 + relative.index(os.sep)]
+        return os.path.dirname(path)
+
+    def delete(self, files: Sequence[tuple[str, int]], dirs: Iterable[str] = (),
+               is_cancelled: Callable[[], bool] = lambda: False
+               ) -> Generator[Progress, None, None]:
+        """Delete the (path, size) files then the directories, deepest first.
+
+        Yield the progress of each deleted file and directory, then a line
+        per error group. No more batches are deleted once `is_cancelled`
+        returns True.
+        """
+        workers = pool()
+        max_tasks = self.max_tasks or workers.max_workers
+        pending = deque(range(0, len(files), self.batch_files))
+        done_queue: queue.Queue[tuple[list[tuple[str, int]], list[tuple[str, OSError]]]] = \
+            queue.Queue()
+        running = 0
+
+        def delete_batch(start: int) -> None:
+            deleted: list[tuple[str, int]] = []
+            errors: list[tuple[str, OSError]] = []
+            try:
+                for path, size in files[start:start + self.batch_files]:
+                    try:
+                        _remove(path)
+                    except FileNotFoundError:
+                        continue  # already deleted.
+                    except OSError as error:
+                        errors.append((path, error))
+                    else:
+                        deleted.append((path, size))
+            finally:  # report back whatever happens.
+                done_queue.put((deleted, errors))
+
+        while pending or running:
+            if is_cancelled():
+                pending.clear()
+            while pending and running < max_tasks:
+                workers.submit(delete_batch, pending.popleft(), priority=Priority.LOW)
+                running += 1
+            if not running:
+                break
+
+            with workers.blocking():  # let the tasks use this worker.
+                deleted, errors = done_queue.get()
+            running -= 1
+            for path, error in errors:
+                self.stats.add_error(error, self.prefix(path))
+            for path, size in deleted:
+                self.stats.files += 1
+                self.stats.size += size
+                yield Progress(f"Deleted file: {path}", files=1, size=size)
+
+        for path in sorted(dirs, key=lambda path: path.count(os.sep), reverse=True):
+            if is_cancelled():
+                break
+            try:
+                os.rmdir(path)
+            except FileNotFoundError:
+                continue
+            except OSError as error:
+                if error.errno == errno.ENOTEMPTY:
+                    continue  # holds files which failed, already counted.
+                self.stats.add_error(error, self.prefix(path))
+            else:
+                self.stats.dirs += 1
+                yield Progress(f"Removed dir: {path}")
+
+        for line, count in self.stats.error_lines():
+            yield Progress(line, errors=count)
@@ -0,0 +1,329 @@
+"""
+Clear the windows event logs concurrently.
+
+The channels are enumerated once and the record count and file size of
+all of them are read in a single pre-pass, then the channels holding
+records are cleared by a bounded number of tasks of the shared worker
+pool, the empty ones are skipped. WevtApiBackend calls the event log API
+directly, WevtutilBackend runs wevtutil, and powershell for the pre-pass,
+through the command backend, so recorded runs can be replayed.
+
+The backend is selected on first use: wevtapi when it can be loaded,
+wevtutil otherwise. Set the EVENT_LOG_BACKEND environment variable to
+"wevtutil" or "wevtapi" to force one.
+"""
+import ctypes
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from ctypes import wintypes
+from dataclasses import dataclass
+from typing import Callable, Generator, override
+
+from utils.progress import format_size, Progress
+from utils.threads import Error, pool, Priority, Result, StatusResult
+
+# Channels cleared at once, clearing is mostly waiting on the event log
+# service so more than the pool size only queues there.
+MAX_CLEARS = 8
+
+ERROR_INSUFFICIENT_BUFFER = 122
+ERROR_NO_MORE_ITEMS = 259
+
+# EVT_LOG_PROPERTY_ID and EVT_OPEN_LOG_FLAGS values.
+EVT_LOG_FILE_SIZE = 3
+EVT_LOG_NUMBER_OF_LOG_RECORDS = 5
+EVT_OPEN_CHANNEL_PATH = 1
+EVT_VAR_TYPE_NULL = 0
+
+# Lists "name|records|size" of all the channels in one process, the
+# counts of the logs which can't be read are empty.
+LIST_LOGS_COMMAND = [
+    "powershell", "-NoProfile", "-NonInteractive", "-Command",
+    "Get-WinEvent -ListLog * -ErrorAction SilentlyContinue | ForEach-Object"
+    + " { '{0}|{1}|{2}' -f $_.LogName, $_.RecordCount, $_.FileSize }",
+]
+
+
+@dataclass(frozen=True, slots=True)
+class LogInfo:
+    records: int | None = None  # None if unknown.
+    size: int | None = None  # bytes of the log file.
+
+
+@dataclass(frozen=True, slots=True)
+class ChannelResult:
+    """Outcome of clearing a channel."""
+    channel: str
+    latency: float  # seconds.
+    error: str = ""
+    skipped: bool = False  # had no records.
+    size: int = 0  # bytes of the log file before cleared.
+
+    @property
+    def success(self) -> bool:
+        return not self.error
+
+
+class EventLogBackend(ABC):
+    """Enumerates and clears the event log channels."""
+
+    @abstractmethod
+    def channels(self) -> Result[list[str]]:
+        """Return the names of all the channels."""
+
+    def log_infos(self, channels: list[str]) -> dict[str, LogInfo]:
+        """Return the record count and file size of the channels known."""
+        return {}
+
+    @abstractmethod
+    def clear(self, channel: str) -> StatusResult:
+        """Clear the records of the channel."""
+
+
+class WevtutilBackend(EventLogBackend):
+    """Backend running wevtutil."""
+
+    @override
+    def channels(self) -> Result[list[str]]:
+        result = Result.from_command(["wevtutil", "enum-logs"])
+        if result.value is None:
+            return Result(error=result.error)
+        return Result([line.strip() for line in result.value.splitlines() if line.strip()])
+
+    @override
+    def log_infos(self, channels: list[str]) -> dict[str, LogInfo]:
+        result = Result.from_command(LIST_LOGS_COMMAND)
+        if result.value is None:
+            return {}
+
+        infos: dict[str, LogInfo] = {}
+        for line in result.value.splitlines():
+            values = line.strip().rsplit("|", 2)
+            if len(values) != 3:
+                continue
+            name, records, size = values
+            infos[name] = LogInfo(
+                int(records) if records.isdigit() else None,
+                int(size) if size.isdigit() else None,
+            )
+        return infos
+
+    @override
+    def clear(self, channel: str) -> StatusResult:
+        return Result.from_command(["wevtutil", "clear-log", channel]).status()
+
+
+class EvtVariant(ctypes.Structure):
+    _fields_ = [
+        ("value", ctypes.c_uint64),
+        ("count", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+    ]
+
+
+class WevtApiBackend(EventLogBackend):
+    """Backend calling the Windows Event Log API."""
+
+    def __init__(self) -> None:
+        self._wevtapi = ctypes.WinDLL("wevtapi", use_last_error=True)
+        api = self._wevtapi
+        dword_p = ctypes.POINTER(wintypes.DWORD)
+
+        api.EvtOpenChannelEnum.argtypes = (wintypes.HANDLE, wintypes.DWORD)
+        api.EvtOpenChannelEnum.restype = wintypes.HANDLE
+        api.EvtNextChannelPath.argtypes = (
+            wintypes.HANDLE, wintypes.DWORD, wintypes.LPWSTR, dword_p)
+        api.EvtNextChannelPath.restype = wintypes.BOOL
+        api.EvtOpenLog.argtypes = (wintypes.HANDLE, wintypes.LPCWSTR, wintypes.DWORD)
+        api.EvtOpenLog.restype = wintypes.HANDLE
+        api.EvtGetLogInfo.argtypes = (
+            wintypes.HANDLE, ctypes.c_int, wintypes.DWORD, ctypes.POINTER(EvtVariant), dword_p)
+        api.EvtGetLogInfo.restype = wintypes.BOOL
+        api.EvtClearLog.argtypes = (
+            wintypes.HANDLE, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD)
+        api.EvtClearLog.restype = wintypes.BOOL
+        api.EvtClose.argtypes = (wintypes.HANDLE,)
+        api.EvtClose.restype = wintypes.BOOL
+
+    @staticmethod
+    def _error(function: str) -> Error:
+        code = ctypes.get_last_error()
+        return Error(code, f"{function}, {ctypes.FormatError(code).strip()}")
+
+    @override
+    def channels(self) -> Result[list[str]]:
+        handle = self._wevtapi.EvtOpenChannelEnum(None, 0)
+        if not handle:
+            return Result(error=self._error("EvtOpenChannelEnum"))
+
+        channels: list[str] = []
+        buffer = ctypes.create_unicode_buffer(512)
+        used = wintypes.DWORD()
+        try:
+            while True:
+                if self._wevtapi.EvtNextChannelPath(
+                    handle, len(buffer), buffer, ctypes.byref(used)
+                ):
+                    channels.append(buffer.value)
+                    continue
+                code = ctypes.get_last_error()
+                if code == ERROR_NO_MORE_ITEMS:
+                    return Result(channels)
+                if code != ERROR_INSUFFICIENT_BUFFER:
+                    return Result(error=self._error("EvtNextChannelPath"))
+                buffer = ctypes.create_unicode_buffer(used.value)
+        finally:
+            self._wevtapi.EvtClose(handle)
+
+    def _log_property(self, handle: int, property_id: int) -> int | None:
+        variant = EvtVariant()
+        used = wintypes.DWORD()
+        if not self._wevtapi.EvtGetLogInfo(
+            handle, property_id, ctypes.sizeof(variant),
+            ctypes.byref(variant), ctypes.byref(used)
+        ) or variant.type == EVT_VAR_TYPE_NULL:
+            return None
+        return variant.value
+
+    @override
+    def log_infos(self, channels: list[str]) -> dict[str, LogInfo]:
+        infos: dict[str, LogInfo] = {}
+        for channel in channels:
+            handle = self._wevtapi.EvtOpenLog(None, channel, EVT_OPEN_CHANNEL_PATH)
+            if not handle:
+                continue
+            try:
+                infos[channel] = LogInfo(
+                    self._log_property(handle, EVT_LOG_NUMBER_OF_LOG_RECORDS),
+                    self._log_property(handle, EVT_LOG_FILE_SIZE),
+                )
+            finally:
+                self._wevtapi.EvtClose(handle)
+        return infos
+
+    @override
+    def clear(self, channel: str) -> StatusResult:
+        if self._wevtapi.EvtClearLog(None, channel, None, 0):
+            return StatusResult(0)
+        error = self._error("EvtClearLog")
+        return StatusResult(error.winerr, error.stderr)
+
+
+class EventLogCleaner:
+    """Clear all the event log channels, keeping the outcome of each."""
+
+    def __init__(self, backend: EventLogBackend | None = None,
+                 max_clears: int = MAX_CLEARS) -> None:
+        self.backend = event_log_backend() if backend is None else backend
+        self.max_clears = max_clears
+        self.results: list[ChannelResult] = []
+
+    def _clear(self, channel: str, size: int) -> ChannelResult:
+        start_time = time.perf_counter()
+        status = self.backend.clear(channel)
+        latency = time.perf_counter() - start_time
+        if status.success:
+            return ChannelResult(channel, latency, size=size)
+        return ChannelResult(channel, latency, status.error or f"Error code {status.status}")
+
+    def clear(self, is_cancelled: Callable[[], bool] = lambda: False
+              ) -> Generator[Progress, None, None]:
+        """Clear the channels, yield the progress of each cleared channel and error.
+
+        Channels known to have no records are skipped silently, the others
+        are cleared. No more channels are cleared once `is_cancelled`
+        returns True.
+        """
+        result = self.backend.channels()
+        if result.value is None:
+            yield Progress(f"Failed to list event logs. {result.error.stderr}", errors=1)
+            return
+        if not result.value:
+            yield Progress("No event logs found.")
+            return
+
+        infos = self.backend.log_infos(result.value)
+        pending: deque[tuple[str, int]] = deque()
+        for channel in result.value:
+            info = infos.get(channel, LogInfo())
+            if info.records == 0:
+                self.results.append(ChannelResult(channel, 0.0, skipped=True))
+            else:
+                pending.append((channel, info.size or 0))
+
+        workers = pool()
+        done_queue: queue.Queue[ChannelResult] = queue.Queue()
+        running = 0
+
+        def clear_channel(channel: str, size: int) -> None:
+            try:
+                done_queue.put(self._clear(channel, size))
+            except Exception as e:
+                done_queue.put(ChannelResult(channel, 0.0, str(e)))
+
+        while pending or running:
+            if is_cancelled():
+                pending.clear()
+            while pending and running < self.max_clears:
+                workers.submit(clear_channel, *pending.popleft(), priority=Priority.LOW)
+                running += 1
+            if not running:
+                break
+
+            with workers.blocking():  # let the tasks use this worker.
+                channel_result = done_queue.get()
+            running -= 1
+            self.results.append(channel_result)
+
+            channel, latency = channel_result.channel, channel_result.latency
+            if channel_result.success:
+                yield Progress(f"Cleared event log: {channel} ({latency * 1000:.0f} ms)",
+                               size=channel_result.size)
+            else:
+                yield Progress(f"EventLogError: {channel}, {channel_result.error}", errors=1)
+
+    def summary(self) -> Generator[str, None, None]:
+        """Yield the totals of the cleared channels and the slowest ones."""
+        cleared = [result for result in self.results if result.success and not result.skipped]
+        skipped = sum(result.skipped for result in self.results)
+        errors = sum(not result.success for result in self.results)
+        size = format_size(sum(result.size for result in cleared))
+        yield f"Event logs: {len(cleared)} cleared, {size}"
+        yield f"    {skipped} empty skipped, {errors} errors"
+        for result in sorted(cleared, key=lambda result: result.latency, reverse=True)[:3]:
+            yield f"    {result.latency * 1000:.0f} ms: {result.channel}"
+
+
+_backend: EventLogBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def _default_backend() -> EventLogBackend:
+    name = os.environ.get("EVENT_LOG_BACKEND", "").lower()
+    if name != "wevtutil":
+        try:
+            return WevtApiBackend()
+        except (AttributeError, OSError):  # not on windows.
+            if name == "wevtapi":
+                raise
+    return WevtutilBackend()
+
+
+def event_log_backend() -> EventLogBackend:
+    """Return the backend used to enumerate and clear the event logs."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _default_backend()
+        return _backend
+
+
+def set_event_log_backend(backend: EventLogBackend) -> None:
+    """Set the backend used to enumerate and clear the event logs."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,149 @@
+"""
+Index of the files a cleanup would delete.
+
+The index is built by a scan-only pass over the roots of the cleanup rules,
+one per root whatever the number of rules, and keeps
+the path, size and modification time of each candidate in compact arrays,
+so the space a cleanup reclaims can be previewed per category and
+directory, then the same index is deleted without scanning again.
+"""
+import os
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Generator, Iterable
+
+from utils.progress import format_size, Progress
+
+from . import scan_cache
+from .deleter import DeleteStats, TreeDeleter
+from .rules import CleanupRule, compile_rules, RootRules
+from .scan_cache import ScanCache
+from .scanner import CachedEntry
+
+
+@dataclass(slots=True)
+class Totals:
+    files: int = 0
+    size: int = 0  # bytes.
+
+
+class JunkIndex:
+    """Candidate files and directories of a cleanup."""
+
+    def __init__(self) -> None:
+        self.categories: list[str] = []
+        self.paths: list[str] = []
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        self.category_ids = array("B")
+        # directories emptied by the cleanup, removed after their files.
+        self.dirs: list[str] = []
+        self.errors = 0  # directories which couldn't be listed.
+        self.reused = 0  # directories unchanged since the previous scan.
+        self.roots: list[str] = []  # scanned directories.
+        self.stats: DeleteStats | None = None  # of the last delete.
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def size(self) -> int:
+        return sum(self.sizes)
+
+    def _category_id(self, category: str) -> int:
+        try:
+            return self.categories.index(category)
+        except ValueError:
+            self.categories.append(category)
+            return len(self.categories) - 1
+
+    def add(self, category: str, path: str, size: int, mtime: float) -> None:
+        self.paths.append(path)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.category_ids.append(self._category_id(category))
+
+    def add_root(self, rules: RootRules, is_cancelled: Callable[[], bool] = lambda: False,
+                 cache: ScanCache | None = None) -> None:
+        """Scan the root of the rules and add the candidates of each rule.
+
+        The cache is not used for roots emptied by a rule, their whole
+        content is a candidate, so listing it is cheaper. Files taken from
+        the cache keep their listed size and time, they are stat again
+        only for the rules filtering files by age or size.
+        """
+        scanner = rules.scanner(cache)
+        self.roots.append(rules.root)
+        now = time.time()
+
+        for entry in scanner.scan(rules.root, is_cancelled):
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if rules.match_dir(entry.path):
+                        self.dirs.append(entry.path)
+                    continue
+                rule = rules.match(entry.name, entry.path)
+                if rule is None:
+                    continue
+                if isinstance(entry, CachedEntry) and not rule.filters:
+                    size, mtime = entry.size, entry.mtime
+                else:
+                    stat = entry.stat(follow_symlinks=False)
+                    size, mtime = stat.st_size, stat.st_mtime
+            except OSError:
+                continue  # vanished since listed.
+            if rules.accepts(rule, size, mtime, now):
+                self.add(rule.category, entry.path, size, mtime)
+        self.errors += scanner.errors
+        self.reused += scanner.reused
+
+    def totals(self) -> dict[str, Totals]:
+        """Return the number and size of the files per category."""
+        totals = {category: Totals() for category in self.categories}
+        for category_id, size in zip(self.category_ids, self.sizes):
+            category_totals = totals[self.categories[category_id]]
+            category_totals.files += 1
+            category_totals.size += size
+        return totals
+
+    def directory_totals(self, category: str | None = None) -> dict[str, Totals]:
+        """Return the number and size of the files per directory, largest first."""
+        totals: dict[str, Totals] = {}
+        for path, size, category_id in zip(self.paths, self.sizes, self.category_ids):
+            if category is not None and self.categories[category_id] != category:
+                continue
+            directory_totals = totals.setdefault(os.path.dirname(path), Totals())
+            directory_totals.files += 1
+            directory_totals.size += size
+        return dict(sorted(totals.items(), key=lambda item: item[1].size, reverse=True))
+
+    def summary(self) -> Generator[str, None, None]:
+        """Yield a line of totals per category then the grand total."""
+        for category, totals in self.totals().items():
+            yield f"{category}: {totals.files} files, {format_size(totals.size)}"
+        yield f"Total: {len(self)} files, {format_size(self.size)}"
+
+    def delete(self, is_cancelled: Callable[[], bool] = lambda: False
+               ) -> Generator[Progress, None, None]:
+        """Delete the indexed files in parallel, then the emptied directories.
+
+        Yield the progress of each deleted file or directory, then of each
+        group of errors, the deletion statistics are kept in `stats`.
+        """
+        deleter = TreeDeleter(self.roots)
+        self.stats = deleter.stats
+        yield from deleter.delete(list(zip(self.paths, self.sizes)), self.dirs, is_cancelled)
+
+
+def build_index(rules: Iterable[CleanupRule],
+                is_cancelled: Callable[[], bool] = lambda: False,
+                cache: ScanCache | None = None) -> JunkIndex:
+    """Scan the roots of the rules into a new index, with the opened scan cache if None."""
+    cache = scan_cache.cache() if cache is None else cache
+    index = JunkIndex()
+    for root_rules in compile_rules(rules):
+        if is_cancelled():
+            break
+        index.add_root(root_rules, is_cancelled, cache)
+    return index
@@ -0,0 +1,419 @@
+"""
+Declarative rules of the files deleted by the cleanups.
+
+The rules are read from a JSON file next to config.ini, mapping each
+cleanup, "junk" and "windows_update", to a list of rules:
+
+    {
+        "category": "Junk files",
+        "roots": ["%SYSTEMDRIVE%\\\\"],
+        "include": ["*.tmp", "*.log"],
+        "exclude": ["%TEMP%", "node_modules"],
+        "min_age": 1,
+        "max_size": 104857600
+    }
+
+roots are the scanned directories, %VAR% expanded. include are globs of the
+file names, the whole content of the roots, directories included, if
+empty. exclude are globs of the names, or of the paths if they contain a
+separator, of the files and directories kept. Files modified less than
+min_age days ago or larger than max_size bytes are kept.
+
+The rules sharing a root are compiled together into a `RootRules`: the
+"*.ext" globs into a suffix lookup and the other globs into one regex with
+a group per rule, so each root is scanned once, along with the roots
+nested in it. The rules file is parsed and compiled once, and again only
+when it is modified.
+"""
+import fnmatch
+import json
+import os
+import re
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from typing import Any, Final, Iterable, Iterator, Sequence, Self
+
+from utils.config_parser import ConfigurationError
+
+from .scan_cache import ScanCache
+from .scanner import GLOB_CHARS, JunkScanner, PRUNED_NAMES, PruneRules, suffix
+
+JUNK: Final = "junk"
+WINDOWS_UPDATE: Final = "windows_update"
+
+SECONDS_PER_DAY = 86400
+
+# Globs compiled into the suffix lookup.
+SUFFIX_GLOB = re.compile(r"\*(\.[^.*?\[\]]+)")
+
+
+def _is_path(pattern: str) -> bool:
+    return "/" in pattern or os.sep in pattern or ":" in pattern
+
+
+def _strings(section: str, data: dict[str, Any], key: str) -> tuple[str, ...]:
+    values: Any = data.get(key, [])
+    if not isinstance(values, list) or not all(
+        isinstance(value, str) for value in typing.cast(list[Any], values)
+    ):
+        raise ConfigurationError(section, f"{key!r} must be a list of strings: {values!r}")
+    return tuple(typing.cast(list[str], values))
+
+
+@dataclass(frozen=True, slots=True)
+class CleanupRule:
+    category: str
+    roots: tuple[str, ...]
+    include: tuple[str, ...] = ()  # all the content if empty.
+    exclude: tuple[str, ...] = ()
+    min_age: float = 0  # days.
+    max_size: int | None = None  # bytes.
+
+    @classmethod
+    def from_json(cls, section: str, data: Any) -> Self:
+        """Return the rule of a JSON object of the rules file.
+
+        Raise:
+            ConfigurationError: If the object isn't a valid rule.
+        """
+        if not isinstance(data, dict):
+            raise ConfigurationError(section, f"Rule must be an object: {data!r}")
+        data = typing.cast(dict[str, Any], data)
+        category = data.get("category")
+        if not isinstance(category, str) or not category:
+            raise ConfigurationError(section, f"Rule has no 'category': {data!r}")
+        roots = _strings(section, data, "roots")
+        if not roots:
+            raise ConfigurationError(section, f"Rule {category!r} has no 'roots'.")
+        min_age = data.get("min_age", 0)
+        max_size = data.get("max_size")
+        if not isinstance(min_age, int | float) or min_age < 0:
+            raise ConfigurationError(section, f"Rule {category!r} 'min_age' must be >= 0.")
+        if max_size is not None and (not isinstance(max_size, int) or max_size < 0):
+            raise ConfigurationError(section, f"Rule {category!r} 'max_size' must be >= 0.")
+        return cls(
+            category,
+            tuple(os.path.normpath(os.path.expandvars(root)) for root in roots),
+            _strings(section, data, "include"),
+            _strings(section, data, "exclude"),
+            min_age,
+            max_size,
+        )
+
+    @property
+    def whole_dir(self) -> bool:
+        return not self.include
+
+    @property
+    def filters(self) -> bool:
+        """Return whether the rule accepts files by their age or size."""
+        return bool(self.min_age) or self.max_size is not None
+
+    def excludes(self) -> tuple[list[str], list[str]]:
+        """Return the name and the path globs of the excluded entries."""
+        names: list[str] = []
+        paths: list[str] = []
+        for pattern in self.exclude:
+            pattern = os.path.expandvars(pattern)
+            if _is_path(pattern):
+                paths.append(pattern)
+            else:
+                names.append(pattern)
+        return names, paths
+
+    def prune_rules(self) -> PruneRules:
+        names, paths = self.excludes()
+        if not self.whole_dir:
+            names.extend(PRUNED_NAMES)
+        return PruneRules.create(names, paths)
+
+
+def _under(path: str, root: str) -> bool:
+    """Return whether the normalized path is the root or under it."""
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class RootRules:
+    """Rules of a root compiled into the matchers of a single scan.
+
+    Rules of roots nested in the root may be scanned with it, each rule
+    only applies under its own root.
+    """
+
+    def __init__(self, root: str, rules: Sequence[CleanupRule],
+                 rule_roots: Sequence[str] | None = None) -> None:
+        """
+        Parameters:
+            - root: The scanned directory.
+            - rules: The rules applying under it, in order of precedence.
+            - rule_roots: The root of each rule, the scanned root if None.
+        """
+        self.root = root
+        self.rules = list(rules)
+        self.excludes = [rule.prune_rules() for rule in rules]
+        # the content matched by no other rule belongs to the whole_dir rule.
+        self.whole_dir = next((i for i, rule in enumerate(rules) if rule.whole_dir), None)
+        scan_root = os.path.normcase(root)
+        roots = [scan_root] * len(rules) if rule_roots is None else [
+            os.path.normcase(rule_root) for rule_root in rule_roots
+        ]
+        # the roots of the nested rules, None for the scanned root.
+        self.rule_roots = [None if rule_root == scan_root else rule_root for rule_root in roots]
+
+        self.suffixes: dict[str, list[int]] = {}
+        self.patterns: dict[int, re.Pattern[str]] = {}
+        groups: list[str] = []
+        for index, rule in enumerate(rules):
+            globs: list[str] = []
+            for glob in rule.include:
+                glob = glob.lower()
+                if match := SUFFIX_GLOB.fullmatch(glob):
+                    self.suffixes.setdefault(match[1], []).append(index)
+                else:
+                    globs.append(fnmatch.translate(glob))
+            if globs:
+                groups.append(f"(?P<r{index}>{'|'.join(globs)})")
+                self.patterns[index] = re.compile("|".join(globs))
+        self.pattern = re.compile("|".join(groups)) if groups else None
+
+        # directories are pruned only when all the rules applying there
+        # exclude them, the others are checked per rule and directory.
+        excludes = [rule.excludes() for rule in rules]
+        names = [name for name in excludes[0][0] if all(name in other for other, _ in excludes)]
+        paths: list[str] = []
+        for _, rule_paths in excludes:
+            for path in rule_paths:
+                normalized = os.path.normcase(os.path.normpath(path))
+                if path not in paths and all(
+                    path in other_paths for (_, other_paths), other_root in zip(excludes, roots)
+                    if GLOB_CHARS.intersection(path)
+                    or _under(normalized, other_root) or _under(other_root, normalized)
+                ):
+                    paths.append(path)
+        self.dir_excludes: list[PruneRules | None] = []
+        for rule_names, rule_paths in excludes:
+            extra_names = [name for name in rule_names if name not in names]
+            extra_paths = [path for path in rule_paths if path not in paths]
+            self.dir_excludes.append(
+                PruneRules.create(extra_names, extra_paths) if extra_names or extra_paths else None
+            )
+        if self.whole_dir is None:
+            names.extend(PRUNED_NAMES)
+        self.prune = PruneRules.create(names, paths)
+
+        self._check_dirs = any(self.dir_excludes) or any(self.rule_roots)
+        # rules skipped in the directory of the last matched path.
+        self._last_dir: tuple[str, frozenset[int]] = ("", frozenset())
+
+    def scanner(self, cache: ScanCache | None = None) -> JunkScanner:
+        """Return the scanner of the files matched by any rule."""
+        if self.whole_dir is not None:
+            return JunkScanner(None, self.prune, include_dirs=True)
+        return JunkScanner(self.suffixes.keys(), self.prune, cache=cache, pattern=self.pattern)
+
+    def _skips(self, index: int, directory: str) -> bool:
+        """Return whether the directory is out of the root of the rule or excluded by it."""
+        rule_root = self.rule_roots[index]
+        if rule_root is not None and not _under(os.path.normcase(directory), rule_root):
+            return True
+        prune = self.dir_excludes[index]
+        if prune is None:
+            return False
+        top = len(self.root if rule_root is None else rule_root)
+        while len(directory) > top:
+            if prune.prunes_path(os.path.basename(directory), directory):
+                return True
+            directory = os.path.dirname(directory)
+        return False
+
+    def _skipped(self, directory: str) -> frozenset[int]:
+        """Return the rules not applying in the directory.
+
+        The scan prunes the directories every rule excludes, the others are
+        checked once per directory, the files of a directory come together.
+        """
+        if not self._check_dirs:
+            return frozenset()
+        last_dir, skipped = self._last_dir
+        if directory != last_dir:
+            skipped = frozenset(
+                index for index in range(len(self.rules)) if self._skips(index, directory)
+            )
+            self._last_dir = (directory, skipped)
+        return skipped
+
+    def _candidates(self, name: str) -> Iterator[int]:
+        """Yield the rules including the file name, in order of precedence."""
+        yield from self.suffixes.get(suffix(name), ())
+        if self.pattern is not None:
+            lowered = name.lower()
+            match = self.pattern.match(lowered)
+            if match is not None and match.lastgroup is not None:
+                first = int(match.lastgroup[1:])
+                yield first
+                # the combined regex only tells the first rule matching.
+                yield from (index for index, pattern in self.patterns.items()
+                            if index > first and pattern.match(lowered))
+        if self.whole_dir is not None:
+            yield self.whole_dir
+
+    def match(self, name: str, path: str) -> CleanupRule | None:
+        """Return the first rule including the file and not excluding it, None if none does.
+
+        Suffix globs are looked up before the other globs, then the whole_dir
+        rule. The excludes are matched against the name and path of the
+        file, its excluded directories are pruned by the scan.
+        """
+        skipped = self._skipped(os.path.dirname(path))
+        for index in self._candidates(name):
+            if index not in skipped and not self.excludes[index].prunes_path(name, path):
+                return self.rules[index]
+        return None
+
+    def match_dir(self, path: str) -> bool:
+        """Return whether the directory is deleted with its content."""
+        index = self.whole_dir
+        return (index is not None and index not in self._skipped(os.path.dirname(path))
+                and not self.excludes[index].prunes_path(os.path.basename(path), path))
+
+    @staticmethod
+    def accepts(rule: CleanupRule, size: int, mtime: float, now: float | None = None) -> bool:
+        """Return whether the file is old and small enough to be deleted by the rule."""
+        if rule.max_size is not None and size > rule.max_size:
+            return False
+        if rule.min_age:
+            now = time.time() if now is None else now
+            return now - mtime >= rule.min_age * SECONDS_PER_DAY
+        return True
+
+
+def _reaches(rules: RootRules, root: str) -> bool:
+    """Return whether the scan of the rules descends to the nested root."""
+    while len(root) > len(rules.root):
+        if rules.prune.prunes_path(os.path.basename(root), root):
+            return False
+        root = os.path.dirname(root)
+    return True
+
+
+def _compile(rules: tuple[CleanupRule, ...]) -> list[RootRules]:
+    roots: dict[str, tuple[str, list[CleanupRule]]] = {}
+    for rule in rules:
+        for root in rule.roots:
+            roots.setdefault(os.path.normcase(root), (root, []))[1].append(rule)
+
+    # roots scanning everything under them are kept apart.
+    scans = {key: group for key, group in roots.items()
+             if not any(rule.whole_dir for rule in group[1])}
+    compiled: dict[str, RootRules] = {}
+    for key, (root, root_rules) in roots.items():
+        enclosing = min(
+            (other for other in scans if other != key and _under(key, other)),
+            key=len, default=None,
+        ) if key in scans else None
+        if enclosing is None:
+            if key not in compiled:  # else merged with its nested roots.
+                compiled[key] = RootRules(root, root_rules)
+            continue
+        outer = compiled.get(enclosing) or RootRules(*scans[enclosing])
+        nested = [rule for rule in root_rules if rule not in scans[enclosing][1]]
+        merged = RootRules(
+            outer.root, outer.rules + nested,
+            [outer.root if rule_root is None else rule_root for rule_root in outer.rule_roots]
+            + [root] * len(nested),
+        )
+        if _reaches(merged, root):
+            compiled[enclosing] = merged
+        else:
+            compiled[key] = RootRules(root, root_rules)
+    return list(compiled.values())
+
+
+# Compiled rules by their rules, the least recently compiled are dropped.
+MAX_COMPILED = 8
+_compiled: dict[tuple[CleanupRule, ...], list[RootRules]] = {}
+_compiled_lock = threading.Lock()
+
+
+def compile_rules(rules: Iterable[CleanupRule]) -> list[RootRules]:
+    """Group the rules by root and compile them, in order of their first rule.
+
+    The rules of a root nested in another root are scanned with the
+    enclosing root unless either is emptied by a rule. Compiling the
+    same rules again returns the kept matchers.
+    """
+    rules = tuple(rules)
+    with _compiled_lock:
+        compiled = _compiled.get(rules)
+    if compiled is None:
+        compiled = _compile(rules)
+        with _compiled_lock:
+            if len(_compiled) >= MAX_COMPILED:
+                del _compiled[next(iter(_compiled))]
+            _compiled[rules] = compiled
+    return list(compiled)
+
+
+def load_rules(filepath: str) -> dict[str, list[CleanupRule]]:
+    """Return the rules of the rules file by cleanup.
+
+    Raise:
+        ConfigurationError: If the file can't be read or holds invalid rules.
+    """
+    try:
+        with open(filepath, encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as e:
+        raise ConfigurationError(filepath, str(e)) from e
+    if not isinstance(data, dict):
+        raise ConfigurationError(filepath, "Rules file must hold an object of cleanups.")
+
+    rules: dict[str, list[CleanupRule]] = {}
+    for section, items in typing.cast(dict[str, Any], data).items():
+        if not isinstance(items, list):
+            raise ConfigurationError(section, "Cleanup must be a list of rules.")
+        rules[section] = [
+            CleanupRule.from_json(section, item) for item in typing.cast(list[Any], items)
+        ]
+    return rules
+
+
+_rules_file: str | None = None
+# modification time and rules of the rules file when last read.
+_loaded: tuple[int, dict[str, list[CleanupRule]]] | None = None
+_rules_lock = threading.Lock()
+
+
+def set_rules_file(filepath: str | None) -> None:
+    """Set the rules file read by `cleanup_rules`."""
+    global _rules_file, _loaded
+    with _rules_lock:
+        _rules_file = filepath
+        _loaded = None
+
+
+def cleanup_rules(section: str) -> list[CleanupRule]:
+    """Return the rules of the cleanup.
+
+    The rules file is read again only once modified.
+
+    Raise:
+        ConfigurationError: If the rules file can't be read, holds invalid
+        rules or none for the cleanup.
+    """
+    global _loaded
+    with _rules_lock:
+        if _rules_file is None:
+            raise ConfigurationError(section, "No cleanup rules file is set.")
+        try:
+            mtime = os.stat(_rules_file).st_mtime_ns
+        except OSError as e:
+            raise ConfigurationError(_rules_file, str(e)) from e
+        if _loaded is None or _loaded[0] != mtime:
+            _loaded = (mtime, load_rules(_rules_file))
+        rules = _loaded[1]
+        if section not in rules:
+            raise ConfigurationError(_rules_file, f"Rules file has no {section!r} cleanup.")
+        return list(rules[section])
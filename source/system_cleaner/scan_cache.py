@@ -0,0 +1,187 @@
+"""
+Persist the directories listed by the junk scans between runs.
+
+For each directory a scan lists, the cache keeps its modification time,
+the names of its subdirectories and the names, sizes and modification
+times of its matching files in a SQLite file next to the config. A directory's modification time changes when entries
+are added, removed or renamed in it, so the next scan lists again only the
+directories whose time changed and takes the others from the cache.
+The sizes and times of the files are those of the last listing, a file
+rewritten in place doesn't change its directory.
+
+Directories are kept per scope, the suffixes matched by the scan, and per
+scanned root. Once the file holds more than `max_dirs` directories, the
+roots scanned least recently are evicted.
+"""
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Final, Iterable
+
+SCAN_CACHE_FILE: Final = "junk_index.sqlite3"
+
+# Directories kept in the cache, about 100 bytes each and 16 more per file.
+MAX_DIRS = 500_000
+
+# Directories modified this close to their listing may change again within
+# the timestamp resolution unnoticed, they are listed on each scan.
+RACY_NS = 2_000_000_000
+
+# Bumped when the tables change, older files are emptied.
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    scope TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    subdirs TEXT NOT NULL,
+    files TEXT NOT NULL,
+    sizes BLOB NOT NULL,
+    mtimes BLOB NOT NULL,
+    PRIMARY KEY (scope, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS roots (
+    scope TEXT NOT NULL,
+    path TEXT NOT NULL,
+    scanned REAL NOT NULL,
+    PRIMARY KEY (scope, path)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class CachedDir:
+    """Listing of a directory, names are joined by NUL in the file."""
+    mtime: int  # nanoseconds, -1 if to be listed again.
+    subdirs: tuple[str, ...]  # except the symbolic links and junctions.
+    files: tuple[str, ...]  # matching the scope.
+    sizes: tuple[int, ...] = ()  # bytes, of the files.
+    mtimes: tuple[int, ...] = ()  # nanoseconds, of the files.
+
+
+def _split(names: str) -> tuple[str, ...]:
+    return tuple(names.split("\0")) if names else ()
+
+
+def _unpack(values: bytes) -> tuple[int, ...]:
+    numbers = array("q")
+    numbers.frombytes(values)
+    return tuple(numbers)
+
+
+def _range(root: str) -> tuple[str, str]:
+    """Return the bounds of the paths under the root, in string order."""
+    prefix = root.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class ScanCache:
+    """Directory listings of the previous scans."""
+
+    def __init__(self, filepath: str = ":memory:", max_dirs: int = MAX_DIRS) -> None:
+        self.filepath = filepath
+        self.max_dirs = max_dirs
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filepath, check_same_thread=False)
+        with self._lock, self._db:
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._db.executescript(
+                    "DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS roots;"
+                    + SCHEMA + f"PRAGMA user_version = {SCHEMA_VERSION};"
+                )
+
+    def load(self, scope: str, root: str) -> dict[str, CachedDir]:
+        """Return the cached directories of the scope, by path, under the root."""
+        low, high = _range(root)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, mtime, subdirs, files, sizes, mtimes FROM dirs"
+                + " WHERE scope = ? AND (path = ? OR (path >= ? AND path < ?))",
+                (scope, root, low, high),
+            ).fetchall()
+        return {
+            path: CachedDir(mtime, _split(subdirs), _split(files), _unpack(sizes), _unpack(mtimes))
+            for path, mtime, subdirs, files, sizes, mtimes in rows
+        }
+
+    def update(self, scope: str, root: str, listed: dict[str, CachedDir],
+               removed: Iterable[str] = ()) -> None:
+        """Store the directories listed by a scan of the root, forget the removed ones.
+
+        Roots scanned least recently are evicted if the cache is full.
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM dirs WHERE scope = ? AND path = ?",
+                ((scope, path) for path in removed),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((scope, path, cached.mtime, "\0".join(cached.subdirs), "\0".join(cached.files),
+                  array("q", cached.sizes).tobytes(), array("q", cached.mtimes).tobytes())
+                 for path, cached in listed.items()),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO roots VALUES (?, ?, ?)", (scope, root, time.time())
+            )
+            self._evict(scope, root)
+
+    def _count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+
+    def _delete_root(self, scope: str, root: str) -> None:
+        low, high = _range(root)
+        self._db.execute(
+            "DELETE FROM dirs WHERE scope = ? AND (path = ? OR (path >= ? AND path < ?))",
+            (scope, root, low, high),
+        )
+        self._db.execute("DELETE FROM roots WHERE scope = ? AND path = ?", (scope, root))
+
+    def _evict(self, scope: str, root: str) -> None:
+        """Delete the least recently scanned roots until the cache fits."""
+        if self._count() <= self.max_dirs:
+            return
+        roots: list[tuple[str, str]] = self._db.execute(
+            "SELECT scope, path FROM roots ORDER BY scanned"
+        ).fetchall()
+        for old_scope, old_root in roots:
+            if (old_scope, old_root) == (scope, root):
+                continue
+            self._delete_root(old_scope, old_root)
+            if self._count() <= self.max_dirs:
+                return
+        self._delete_root(scope, root)  # too large to be cached alone.
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM dirs")
+            self._db.execute("DELETE FROM roots")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_cache: ScanCache | None = None
+
+
+def open_cache(filepath: str = ":memory:") -> ScanCache | None:
+    """Open the cache used by the cleanup scans, return None if it can't be opened."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    try:
+        _cache = ScanCache(filepath)
+    except sqlite3.Error:
+        _cache = None
+    return _cache
+
+
+def cache() -> ScanCache | None:
+    """Return the cache used by the cleanup scans, if opened."""
+    return _cache
@@ -0,0 +1,308 @@
+"""
+Scan directory trees for junk files in the shared worker pool.
+
+Directories are listed with `os.scandir` by pool tasks, each task walks
+its subtree until it has listed a bounded number of entries and hands the
+remaining sub-directories back so large subtrees are spread over the
+workers. Files are matched by their lowercase suffix against a set, and
+by a regex combining the other name patterns, if any. The
+yielded `os.DirEntry` objects keep the stat data read while listing, so
+sizes and times need no extra system call on windows.
+
+With a `ScanCache`, directories unchanged since the previous scan are not
+listed again, their matching files are taken from the cache along with
+their size and time. The time of a listed subdirectory is taken from its
+entry, which holds it without a system call on windows, only the
+subdirectories of the reused directories are stat.
+"""
+import fnmatch
+import os
+import queue
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Generator, Iterable
+
+from utils.threads import pool, Priority
+
+from .scan_cache import CachedDir, RACY_NS, ScanCache
+
+# Entries listed by a task before it hands its remaining directories back,
+# bounds the per task overhead without serializing large subtrees.
+TASK_ENTRIES = 2048
+
+# Characters making a name or path a glob pattern.
+GLOB_CHARS = frozenset("*?[")
+
+# Directories never holding junk files of interest, yet huge to walk.
+PRUNED_NAMES = frozenset({
+    "$recycle.bin",
+    "system volume information",
+    "winsxs",
+    "node_modules",
+    ".git",
+})
+
+
+@dataclass(frozen=True, slots=True)
+class PruneRules:
+    """Directories the scanner doesn't descend into.
+
+    names are matched case-insensitively against the directory name, paths
+    against the whole normalized path, glob patterns of either are compiled
+    into one regex. Symbolic links and junctions are never followed, which
+    also avoids cycles.
+    """
+    names: frozenset[str] = PRUNED_NAMES
+    paths: frozenset[str] = field(default_factory=frozenset[str])
+    name_pattern: re.Pattern[str] | None = None
+    path_pattern: re.Pattern[str] | None = None
+
+    @classmethod
+    def create(cls, names: Iterable[str] = PRUNED_NAMES, paths: Iterable[str] = ()) -> 'PruneRules':
+        names = [name.lower() for name in names]
+        paths = [os.path.normcase(os.path.normpath(path)) for path in paths]
+        return cls(
+            frozenset(name for name in names if not GLOB_CHARS.intersection(name)),
+            frozenset(path for path in paths if not GLOB_CHARS.intersection(path)),
+            glob_pattern(name for name in names if GLOB_CHARS.intersection(name)),
+            glob_pattern(path for path in paths if GLOB_CHARS.intersection(path)),
+        )
+
+    def prunes_path(self, name: str, path: str) -> bool:
+        """Return whether the directory is pruned by its name or path."""
+        name = name.lower()
+        if name in self.names:
+            return True
+        if self.name_pattern is not None and self.name_pattern.match(name):
+            return True
+        if not self.paths and self.path_pattern is None:
+            return False
+        path = os.path.normcase(path)
+        if path in self.paths:
+            return True
+        return self.path_pattern is not None and bool(self.path_pattern.match(path))
+
+
+class CachedEntry:
+    """Directory entry taken from the scan cache, with the size and time listed."""
+    __slots__ = ("path", "name", "size", "mtime", "_is_dir")
+
+    def __init__(self, path: str, name: str, is_dir: bool,
+                 size: int = 0, mtime: float = 0.0) -> None:
+        self.path = path
+        self.name = name
+        self.size = size  # bytes, when last listed.
+        self.mtime = mtime  # seconds, when last listed.
+        self._is_dir = is_dir
+
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        return self._is_dir
+
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        return os.stat(self.path, follow_symlinks=follow_symlinks)
+
+
+Entry = os.DirEntry[str] | CachedEntry
+
+# Directory to list and its modification time in nanoseconds, if known.
+Pending = tuple[str, int | None]
+
+
+def glob_pattern(globs: Iterable[str]) -> re.Pattern[str] | None:
+    """Return a regex matching any of the glob patterns, None if there are none."""
+    globs = list(globs)
+    if not globs:
+        return None
+    return re.compile("|".join(fnmatch.translate(glob) for glob in globs))
+
+
+def suffix(filename: str) -> str:
+    """Return the lowercase extension of the filename, '' for dot files."""
+    index = filename.rfind(".")
+    return filename[index:].lower() if index > 0 else ""
+
+
+class JunkScanner:
+    """Find the files having one of the suffixes or matching the pattern under a directory."""
+
+    def __init__(self, suffixes: Iterable[str] | None, prune: PruneRules | None = None,
+                 max_tasks: int | None = None, include_dirs: bool = False,
+                 cache: ScanCache | None = None, pattern: re.Pattern[str] | None = None) -> None:
+        """
+        Parameters:
+            - suffixes: The file extensions to match, including the dot.
+            All the files match if None and there is no pattern.
+            - prune: The directories to skip, `PruneRules()` if None.
+            - max_tasks: Directories listed at once, the pool size if None.
+            - include_dirs: Also yield the directories descended into.
+            - cache: The listings of the previous scans, updated by the scan.
+            - pattern: The regex the other matching lowercase file names match.
+        """
+        self.suffixes = None if suffixes is None else frozenset(ext.lower() for ext in suffixes)
+        self.pattern = pattern
+        self.prune = PruneRules() if prune is None else prune
+        self.max_tasks = max_tasks
+        self.include_dirs = include_dirs
+        self.cache = cache
+        self.errors = 0  # directories which couldn't be listed.
+        self.reused = 0  # directories taken from the cache.
+
+    @property
+    def scope(self) -> str:
+        """Return the key of the listings of this scanner in the cache."""
+        scope = "*" if self.suffixes is None else " ".join(sorted(self.suffixes))
+        if self.pattern is not None:
+            scope = f"{'' if self.suffixes is None else scope}|{self.pattern.pattern}"
+        return f"{scope}|dirs" if self.include_dirs else scope
+
+    def matches(self, name: str) -> bool:
+        """Return whether the file name has a suffix or matches the pattern."""
+        if self.suffixes is None and self.pattern is None:
+            return True
+        if self.suffixes is not None and suffix(name) in self.suffixes:
+            return True
+        return self.pattern is not None and self.pattern.match(name.lower()) is not None
+
+    def _reuse(self, path: str, cached: CachedDir, files: list[Entry], dirs: list[Pending]) -> None:
+        """Add the files and the directories of the cached listing."""
+        for name in cached.subdirs:
+            subdir = os.path.join(path, name)
+            if not self.prune.prunes_path(name, subdir):
+                dirs.append((subdir, None))
+                if self.include_dirs:
+                    files.append(CachedEntry(subdir, name, True))
+        files.extend(
+            CachedEntry(os.path.join(path, name), name, False, size, mtime / 1e9)
+            for name, size, mtime in zip(cached.files, cached.sizes, cached.mtimes)
+        )
+
+    def _list(self, path: str, files: list[Entry], dirs: list[Pending],
+              listing: list[tuple[str, int, int]] | None = None,
+              subdirs: list[str] | None = None) -> int:
+        """Add the matching files and the directories to descend into.
+
+        The name, size and time of the matching files are added to listing
+        if given, and the names of the subdirectories, pruned ones
+        included, to subdirs. The time of the directories to descend into
+        is read from their entry if listing is given.
+
+        Return the number of listed entries.
+        """
+        count = 0
+        with os.scandir(path) as entries:
+            for entry in entries:
+                count += 1
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.is_symlink() or entry.is_junction():
+                            continue
+                        if subdirs is not None:
+                            subdirs.append(entry.name)
+                        if not self.prune.prunes_path(entry.name, entry.path):
+                            mtime = None
+                            if listing is not None:
+                                mtime = entry.stat(follow_symlinks=False).st_mtime_ns
+                            dirs.append((entry.path, mtime))
+                            if self.include_dirs:
+                                files.append(entry)
+                    elif self.matches(entry.name):
+                        if listing is not None:
+                            stat = entry.stat(follow_symlinks=False)
+                            listing.append((entry.name, stat.st_size, stat.st_mtime_ns))
+                        files.append(entry)
+                except OSError:
+                    continue  # entry vanished or unreadable.
+        return count
+
+    def scan(self, directory: str, is_cancelled: Callable[[], bool] = lambda: False
+             ) -> Generator[Entry, None, None]:
+        """Yield the matching files under the directory as they are found.
+
+        Directories are yielded before their content if `include_dirs`.
+
+        Unreadable directories are skipped and counted in `errors`, no more
+        directories are listed once `is_cancelled` returns True.
+        """
+        workers = pool()
+        max_tasks = self.max_tasks or workers.max_workers
+        pending: deque[Pending] = deque([(directory, None)])
+        done_queue: queue.Queue[
+            tuple[list[Entry], list[Pending], int, dict[str, CachedDir], list[str]]
+        ] = queue.Queue()
+        running = 0
+        cancelled = False
+
+        scope = self.scope
+        cached = {} if self.cache is None else self.cache.load(scope, directory)
+        racy_time = time.time_ns() - RACY_NS
+        listed: dict[str, CachedDir] = {}  # directories listed again.
+        visited: set[str] = set()
+
+        def list_dir(path: str, mtime: int | None, files: list[Entry], dirs: list[Pending],
+                     task_listed: dict[str, CachedDir]) -> int:
+            """List the directory or reuse its cached listing if unchanged.
+
+            Return the number of listed entries, 1 for a reused listing.
+            """
+            if self.cache is None:
+                return self._list(path, files, dirs)
+            if mtime is None:
+                mtime = os.stat(path).st_mtime_ns
+            cached_dir = cached.get(path)
+            if cached_dir is not None and cached_dir.mtime == mtime:
+                self._reuse(path, cached_dir, files, dirs)
+                return 1
+            listing: list[tuple[str, int, int]] = []
+            subdirs: list[str] = []
+            count = self._list(path, files, dirs, listing, subdirs)
+            names, sizes, mtimes = zip(*listing) if listing else ((), (), ())
+            task_listed[path] = CachedDir(
+                -1 if mtime > racy_time else mtime, tuple(subdirs), names, sizes, mtimes)
+            return count
+
+        def list_dirs(path: str, mtime: int | None) -> None:
+            """List the subtree depth first until TASK_ENTRIES are listed."""
+            files: list[Entry] = []
+            dirs: list[Pending] = [(path, mtime)]
+            task_listed: dict[str, CachedDir] = {}
+            task_visited: list[str] = []
+            errors = listed_count = 0
+            try:
+                while dirs and listed_count < TASK_ENTRIES:
+                    dir_path, dir_mtime = dirs.pop()
+                    try:
+                        count = list_dir(dir_path, dir_mtime, files, dirs, task_listed)
+                    except OSError:
+                        errors += 1
+                        continue
+                    task_visited.append(dir_path)
+                    listed_count += count
+            finally:  # report back whatever happens.
+                done_queue.put((files, dirs, errors, task_listed, task_visited))
+
+        while pending or running:
+            if is_cancelled():
+                cancelled = True
+                pending.clear()
+            while pending and running < max_tasks:
+                workers.submit(list_dirs, *pending.pop(), priority=Priority.LOW)
+                running += 1
+            if not running:
+                break
+
+            with workers.blocking():  # let the tasks use this worker.
+                files, dirs, errors, task_listed, task_visited = done_queue.get()
+            running -= 1
+            self.errors += errors
+            listed.update(task_listed)
+            visited.update(task_visited)
+            pending.extend(dirs)
+            yield from files
+
+        if self.cache is not None:
+            self.reused += len(visited) - len(listed)
+            # directories no longer reached are forgotten after a whole scan.
+            removed = () if cancelled else cached.keys() - visited
+            self.cache.update(scope, directory, listed, removed)
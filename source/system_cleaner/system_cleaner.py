@@ -1,15 +1,23 @@
 from enum import IntEnum
 from functools import partial
 
-from PyQt6.QtCore import pyqtSignal, QMutex, QMutexLocker
+from PyQt6.QtCore import QMutex, QMutexLocker, QTimer
 from PyQt6.QtWidgets import QFrame, QStackedWidget, QVBoxLayout, QWidget
 
 from utils import styles
+from utils.config_parser import ConfigurationError
+from utils.progress import FLUSH_INTERVAL, format_size, Progress, ProgressBuffer
 from utils.threads import Thread
 
-from .clean import clean_eventlogs, clean_junkfiles, clean_windows_updates
+from .clean import junk_rules, windows_update_rules
 from .cleaner_gui import CleanerGui
 from .cleanup_view import CleanupView
+from .event_logs import EventLogCleaner
+from .junk_index import build_index, JunkIndex
+from .rules import CleanupRule
+
+# Directories listed by the preview, largest first.
+PREVIEW_DIRECTORIES = 10
 
 
 class CleanupTask(IntEnum):
@@ -20,10 +28,12 @@ class CleanupTask(IntEnum):
 
 
 class SystemCleaner(QFrame):
-    signal = pyqtSignal(str)
-
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
+        # messages of the cleanup threads, shown in batches by the timer.
+        self.progress = ProgressBuffer()
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(FLUSH_INTERVAL)
         self.setupWidgets()
         self.connectSlots()
         self.setStyleSheet(styles.get("cleaner"))
@@ -32,6 +42,9 @@ class SystemCleaner(QFrame):
         self.__cancel_flag = False
         self.threads: dict[CleanupTask, Thread] = {}
         self.thread_states: dict[CleanupTask, bool] = {}
+        # indexes of the last preview, deleted by its clean button, dropped on close.
+        self.indexes: dict[CleanupTask, JunkIndex] = {}
+        self.preview_thread: Thread | None = None
 
     def setupWidgets(self) -> None:
         """Setup the widgets in layout."""
@@ -55,6 +68,7 @@ class SystemCleaner(QFrame):
         self.cleaner_gui.clean_button.clicked.connect(
             partial(self.runCleanup, CleanupTask.JUNK_CLEANUP)
         )
+        self.cleaner_gui.preview_button.clicked.connect(self.runPreview)
         self.cleaner_gui.clean_event_logs_button.clicked.connect(
             partial(self.runCleanup, CleanupTask.EVENT_LOGS)
         )
@@ -64,17 +78,22 @@ class SystemCleaner(QFrame):
         self.cleanup_view.connectClose(lambda: (
             self.stacked_widget.setCurrentWidget(self.cleaner_gui),
             self.thread_states.clear(),  # clear previous thread states.
-            self.cleanup_view.text_widget.clear()  # clear previous messages.
+            self.progress.reset(),
+            self.cleanup_view.text_widget.clear(),  # clear previous messages.
+            self.cleanup_view.setCounters(None),
+            self.dropIndexes()  # a later cleanup scans again.
         ))
+        self.cleanup_view.connectClean(self.cleanPreviewed)
         self.cleanup_view.connectCancel(lambda: (
             self.cancel(), self.cleanup_view.
             setBorderMessage("Canceled cleanup operation")
         ))
-        self.signal.connect(self.cleanup_view.appendText)
+        self.progress_timer.timeout.connect(self.showProgress)
 
     def runCleanup(self, task: CleanupTask) -> None:
         """Run cleanup task in a new thread."""
         self.reset_cancel()
+        self.progress_timer.start()
 
         if task != CleanupTask.ALL_CHECKED:
             thread = self.threads.get(task)
@@ -132,6 +151,44 @@ class SystemCleaner(QFrame):
             self.stacked_widget.setCurrentWidget(self.cleanup_view)
         self.cleanup_view.border_widget.showCloseButton(False)
 
+    def runPreview(self) -> None:
+        """Scan the checked cleanup targets in a new thread, without deleting."""
+        self.reset_cancel()
+        self.progress_timer.start()
+
+        tasks = [CleanupTask.JUNK_CLEANUP]
+        if self.cleaner_gui.clean_windows_update_checkbox.isChecked():
+            tasks.append(CleanupTask.WINDOWS_UPDATE)
+
+        self.preview_thread = Thread(self.previewCleanup, tasks)
+        self.preview_thread.started.connect(lambda: (
+            self.is_cancelled()
+            or self.cleanup_view.setBorderMessage("Scanning cleanup targets...")
+        ))
+        self.preview_thread.finished.connect(self.onPreviewFinished)
+        self.preview_thread.start()
+
+        if self.stacked_widget.currentWidget() is not self.cleanup_view:
+            self.stacked_widget.setCurrentWidget(self.cleanup_view)
+        self.cleanup_view.border_widget.showCloseButton(False)
+
+    def onPreviewFinished(self) -> None:
+        """Handle preview thread finished, offer to clean the previewed files."""
+        self.stopProgress()
+        if self.is_cancelled():
+            self.dropIndexes()  # keep the canceled message.
+        else:
+            self.cleanup_view.setBorderMessage("Finished scanning cleanup targets.")
+        self.cleanup_view.border_widget.showCloseButton(True)
+        self.cleanup_view.border_widget.showCleanButton(bool(self.indexes))
+
+    def cleanPreviewed(self) -> None:
+        """Delete the files of the last preview, from its indexes."""
+        with QMutexLocker(self.__mutex):
+            tasks = list(self.indexes)
+        for task in tasks:
+            self.runCleanup(task)
+
     def onThreadStarted(self, task: CleanupTask) -> None:
         """Handle cleanup task thread started."""
         self.thread_states[task] = False  # implies running
@@ -181,8 +238,23 @@ class SystemCleaner(QFrame):
         self.cleanup_view.setBorderMessage(message)
 
         if all(self.thread_states.values()):
+            self.stopProgress()
             self.cleanup_view.border_widget.showCloseButton(True)
 
+    def showProgress(self) -> None:
+        """Append the messages added since the last call and show the counters."""
+        batch = self.progress.take()
+        if batch is None:
+            return
+        if batch.lines or batch.dropped:
+            self.cleanup_view.appendText(batch.text)
+        self.cleanup_view.setCounters(batch.counters)
+
+    def stopProgress(self) -> None:
+        """Show the remaining messages and stop the progress timer."""
+        self.progress_timer.stop()
+        self.showProgress()
+
     def cancel(self) -> None:
         with QMutexLocker(self.__mutex):
             self.__cancel_flag = True
@@ -195,23 +267,84 @@ class SystemCleaner(QFrame):
         with QMutexLocker(self.__mutex):
             return self.__cancel_flag
 
+    def takeIndex(self, task: CleanupTask) -> JunkIndex | None:
+        """Return and forget the previewed index of the task, if any."""
+        with QMutexLocker(self.__mutex):
+            return self.indexes.pop(task, None)
+
+    def dropIndexes(self) -> None:
+        """Forget the previewed indexes, their listing gets stale."""
+        with QMutexLocker(self.__mutex):
+            self.indexes.clear()
+
+    def loadRules(self, task: CleanupTask) -> list[CleanupRule] | None:
+        """Return the cleanup rules of the task, None if the rules file is invalid."""
+        try:
+            match task:
+                case CleanupTask.JUNK_CLEANUP:
+                    return junk_rules()
+                case CleanupTask.WINDOWS_UPDATE:
+                    return windows_update_rules()
+                case _:
+                    return []
+        except ConfigurationError as e:
+            self.progress.add(Progress(str(e), errors=1))
+            return None
+
+    def previewCleanup(self, tasks: list[CleanupTask]) -> None:
+        """Index the files the tasks would delete and show their totals."""
+        for task in tasks:
+            rules = self.loadRules(task)
+            if not rules:
+                continue
+
+            index = build_index(rules, self.is_cancelled)
+            if self.is_cancelled():
+                return
+            with QMutexLocker(self.__mutex):
+                self.indexes[task] = index
+
+            for msg in index.summary():
+                self.progress.add(msg)
+            for directory, totals in list(index.directory_totals().items())[:PREVIEW_DIRECTORIES]:
+                self.progress.add(
+                    f"    {format_size(totals.size)} in {totals.files} files: {directory}"
+                )
+            if index.errors:
+                self.progress.add(f"Couldn't list {index.errors} directories.")
+            if index.reused:
+                self.progress.add(f"{index.reused} directories unchanged since the last scan.")
+
     def cleanJunkFiles(self) -> None:
         """Clean system junk files."""
-        for msg in clean_junkfiles():
-            if self.is_cancelled():
-                break
-            self.signal.emit(msg)
+        index = self.takeIndex(CleanupTask.JUNK_CLEANUP)
+        if index is None:
+            rules = self.loadRules(CleanupTask.JUNK_CLEANUP)
+            if rules is None:
+                return
+            index = build_index(rules, self.is_cancelled)
+        for progress in index.delete(self.is_cancelled):
+            self.progress.add(progress)
+        if index.stats is not None:
+            self.progress.add(index.stats.summary())
 
     def cleanEventLogs(self) -> None:
         """Clean system event logs."""
-        for msg in clean_eventlogs():
-            if self.is_cancelled():
-                break
-            self.signal.emit(msg)
+        cleaner = EventLogCleaner()
+        for progress in cleaner.clear(self.is_cancelled):
+            self.progress.add(progress)
+        for msg in cleaner.summary():
+            self.progress.add(msg)
 
     def cleanWindowsUpdates(self) -> None:
         """Clean windows updates."""
-        for msg in clean_windows_updates():
-            if self.is_cancelled():
-                break
-            self.signal.emit(msg)
+        index = self.takeIndex(CleanupTask.WINDOWS_UPDATE)
+        if index is None:
+            rules = self.loadRules(CleanupTask.WINDOWS_UPDATE)
+            if rules is None:
+                return
+            index = build_index(rules, self.is_cancelled)
+        for progress in index.delete(self.is_cancelled):
+            self.progress.add(progress)
+        if index.stats is not None:
+            self.progress.add(index.stats.summary())
@@ -0,0 +1,172 @@
+"""
+Record and replay command results.
+
+RecordingBackend runs the commands with another backend and appends a
+record of each command to a JSON lines file, ReplayBackend serves the
+results from such a file with the recorded or scaled latency so the
+modules running commands can be exercised where the commands do not exist.
+
+Set the COMMAND_RECORD or COMMAND_REPLAY environment variable to a file
+path to install a backend at startup, COMMAND_REPLAY_SCALE scales the
+replayed latency.
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, override, Self
+
+from .threads import (
+    CommandBackend,
+    ERROR_TIMEOUT,
+    Error,
+    ProcessBackend,
+    Result,
+    RunStats,
+    set_command_backend,
+)
+
+ERROR_FILE_NOT_FOUND = 2
+
+
+@dataclass(frozen=True, slots=True)
+class CommandRecord:
+    """Recorded result of a command.
+
+    stdout is the output of a successful command, stderr is the error
+    message of a failed one, as carried by the `Result`.
+    """
+    argv: tuple[str, ...]
+    stdout: str
+    stderr: str
+    exit_code: int
+    latency: float  # seconds.
+
+    @classmethod
+    def from_json(cls, line: str) -> Self:
+        data = json.loads(line)
+        return cls(
+            argv=tuple(data["argv"]),
+            stdout=data["stdout"],
+            stderr=data["stderr"],
+            exit_code=data["exit_code"],
+            latency=data["latency"],
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+
+class RecordingBackend(CommandBackend):
+    """Backend recording the commands run by another backend."""
+
+    def __init__(self, path: str, backend: CommandBackend | None = None) -> None:
+        self.path = path
+        self.backend = backend or ProcessBackend()
+        self._lock = threading.Lock()
+
+    @override
+    def run(
+        self,
+        command: list[str],
+        timeout: float | None = None,
+        on_output: Callable[[str], Any] | None = None,
+    ) -> Result[str]:
+        lines: list[str] = []
+
+        def consumer(line: str) -> None:
+            lines.append(line)
+            if on_output is not None:
+                on_output(line)
+
+        start_time = time.perf_counter()
+        result = self.backend.run(
+            command, timeout, None if on_output is None else consumer
+        )
+        latency = time.perf_counter() - start_time
+
+        record = CommandRecord(
+            argv=tuple(command),
+            stdout="\n".join(lines) if on_output is not None else result.value or "",
+            stderr=result.error.stderr,
+            exit_code=result.error.winerr if result.value is None else 0,
+            latency=latency,
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(record.to_json() + "\n")
+        return result
+
+
+class ReplayBackend(CommandBackend):
+    """Backend serving the results of recorded commands.
+
+    Records of the same command are served in recorded order, the last one
+    is repeated once they are exhausted. Latency is multiplied by
+    `latency_scale`, 0 replays without any delay.
+    """
+
+    def __init__(self, path: str, latency_scale: float = 1.0) -> None:
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._records: dict[tuple[str, ...], list[CommandRecord]] = {}
+        self._served: dict[tuple[str, ...], int] = {}
+
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = CommandRecord.from_json(line)
+                self._records.setdefault(record.argv, []).append(record)
+
+    def _next(self, argv: tuple[str, ...]) -> CommandRecord | None:
+        records = self._records.get(argv)
+        if not records:
+            return None
+        with self._lock:
+            index = self._served.get(argv, 0)
+            self._served[argv] = index + 1
+        return records[min(index, len(records) - 1)]
+
+    @override
+    def run(
+        self,
+        command: list[str],
+        timeout: float | None = None,
+        on_output: Callable[[str], Any] | None = None,
+    ) -> Result[str]:
+        record = self._next(tuple(command))
+        if record is None:
+            return Result(error=Error(
+                ERROR_FILE_NOT_FOUND, f"{' '.join(command)}, No recorded result"
+            ))
+
+        latency = record.latency * self.latency_scale
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            return Result(
+                error=Error(ERROR_TIMEOUT, f"{' '.join(command)}, Timed out after {timeout} seconds"),
+                stats=RunStats(record.exit_code, timeout, 0, True),
+            )
+        time.sleep(latency)
+
+        stats = RunStats(
+            record.exit_code, latency, len(record.stdout) + len(record.stderr)
+        )
+        if record.exit_code != 0:
+            return Result(error=Error(record.exit_code, record.stderr), stats=stats)
+
+        if on_output is None:
+            return Result(record.stdout, stats=stats)
+        for line in record.stdout.splitlines():
+            on_output(line)
+        return Result("", stats=stats)
+
+
+def install_from_environment() -> None:
+    """Install the recording or replay backend set in the environment."""
+    if path := os.environ.get("COMMAND_REPLAY"):
+        scale = float(os.environ.get("COMMAND_REPLAY_SCALE") or 1.0)
+        set_command_backend(ReplayBackend(path, scale))
+    elif path := os.environ.get("COMMAND_RECORD"):
+        set_command_backend(RecordingBackend(path))
@@ -0,0 +1,110 @@
+"""
+Cache of read-only command results.
+
+Results of commands matching a TTL rule are kept for the rule's seconds,
+commands matching an invalidation rule drop the cached results of the
+commands they modify. Rules match the leading arguments of a command,
+options and GUIDs are compared case-insensitively, options with '/' and
+'-' prefixes alike, other values like names are compared as given.
+"""
+import re
+import threading
+import time
+from typing import Iterable, Mapping
+
+from .threads import Result
+
+ArgsType = tuple[str, ...]
+
+GUID = re.compile(r"[0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}")
+
+
+def _normalize(arg: str) -> str:
+    if arg.startswith(("-", "/")):
+        return "-" + arg[1:].lower()
+    if GUID.fullmatch(arg):
+        return arg.lower()
+    return arg
+
+
+def normalize(command: Iterable[str]) -> ArgsType:
+    """Return the command arguments as compared by the cache."""
+    return tuple(_normalize(arg) for arg in command)
+
+
+class CommandCache:
+    def __init__(
+        self,
+        ttls: Mapping[ArgsType, float],
+        invalidations: Mapping[ArgsType, Iterable[ArgsType]],
+        timeout: float | None = None,
+    ) -> None:
+        """
+        Parameters:
+            - ttls: Seconds to keep results of the commands starting with the args.
+            - invalidations: Commands invalidated by the commands starting with the args.
+            - timeout: Seconds after which the commands run are killed, never if None.
+        """
+        self.timeout = timeout
+        self.ttls = {normalize(args): ttl for args, ttl in ttls.items()}
+        self.invalidations = {
+            normalize(args): [normalize(other_args) for other_args in args_list]
+            for args, args_list in invalidations.items()
+        }
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # incremented by each invalidation, results of the commands run
+        # across an invalidation may be stale and are not stored.
+        self._generation = 0
+        self._results: dict[ArgsType, tuple[float, Result[str]]] = {}
+
+    @staticmethod
+    def _match[T](rules: Mapping[ArgsType, T], args: ArgsType) -> T | None:
+        for rule_args, value in rules.items():
+            if args[:len(rule_args)] == rule_args:
+                return value
+        return None
+
+    def run(self, command: list[str], timeout: float | None = None) -> Result[str]:
+        """Return the cached result of the command or run it.
+
+        The command is killed after timeout seconds, the cache's timeout if None.
+        """
+        args = normalize(command)
+        timeout = self.timeout if timeout is None else timeout
+
+        invalidated = self._match(self.invalidations, args)
+        if invalidated is not None:
+            result = Result.from_command(command, timeout=timeout)
+            for other_args in invalidated:  # on success or failure.
+                self.invalidate(other_args)
+            return result
+
+        ttl = self._match(self.ttls, args)
+        if ttl is None:
+            return Result.from_command(command, timeout=timeout)
+
+        with self._lock:
+            expires, result = self._results.get(args, (0.0, None))
+            if result is not None and time.monotonic() < expires:
+                self.hits += 1
+                return result
+            self.misses += 1
+            generation = self._generation
+
+        result = Result.from_command(command, timeout=timeout)
+        if result.value is not None:  # errors are not cached.
+            with self._lock:
+                if generation == self._generation:
+                    self._results[args] = time.monotonic() + ttl, result
+        return result
+
+    def invalidate(self, command: Iterable[str] = ()) -> None:
+        """Drop the results of the commands starting with the args, all if empty."""
+        args = normalize(command)
+        with self._lock:
+            self._generation += 1
+            for cached_args in list(self._results):
+                if cached_args[:len(args)] == args:
+                    del self._results[cached_args]
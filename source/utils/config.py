@@ -3,10 +3,11 @@ import os
 from typing import Final, Iterable
 
 from .config_parser import Config, Service
-from .service import display_name, startup_type
+from .service import display_name, handles, startup_types
 from .styles import parent_dir
 
 CONFIG_FILE: Final = "config.ini"
+CLEANUP_RULES_FILE: Final = "cleanup_rules.json"
 PROJECT_DIR: Final = os.path.dirname(parent_dir)
 
 
@@ -78,20 +79,20 @@ def backup(service_names: Iterable[str], backup_dir: str, filename: str) -> None
         if os.path.exists(backup_file) else {}
 
     services_config: dict[str, list[str]] = {}
+    service_names = [name for name in service_names if name not in backup_config]
+    start_types = startup_types(service_names)
 
-    for service_name in service_names:
-        if service_name in backup_config:
-            continue
+    with handles():  # share service handles across lookups.
+        for service_name in service_names:
+            start_type = start_types[service_name].value
+            if start_type == 'disabled' or start_type is None:
+                continue  # skip disabled services
 
-        start_type = startup_type(service_name).value
-        if start_type == 'disabled' or start_type is None:
-            continue  # skip disabled services
+            svc_display_name = display_name(service_name).value
+            if svc_display_name is None:
+                continue  # skip services with no retrievable display name
 
-        svc_display_name = display_name(service_name).value
-        if svc_display_name is None:
-            continue  # skip services with no retrievable display name
-
-        services_config[service_name] = [start_type, svc_display_name]
+            services_config[service_name] = [start_type, svc_display_name]
 
     if not services_config:
         return  # nothing to backup.
@@ -1,9 +1,25 @@
 import os
 import re
-import winreg
 
-from .registry import create_key, del_key, key_value, set_key_value
-from .threads import Result, StatusResult
+from .power_backend import POWERCFG_CACHE, power_backend
+from .power_scheme import (
+    diff,
+    PowerScheme,
+    SettingChange,
+    STANDBYIDLE,
+    SUB_SLEEP,
+    SUB_VIDEO,
+    VIDEOIDLE,
+)
+from .registry import (
+    create_key,
+    del_key,
+    RegistrySession,
+    session_scope,
+    set_key_value,
+)
+from .registry_backend import winreg
+from .threads import Error, Result, StatusResult
 
 DEFAULT_SCHEME_GUIDS = [
     "381b4222-f694-41f0-9685-ff5bb260df2e",  # Balanced
@@ -18,27 +34,14 @@ GUID_PATTERN = "[a-zA-Z0-9]{8}-[a-zA-Z0-9]{4}" + \
 def schemes() -> Result[list[tuple[str, str]]]:
     "Get list of all the power schemes."
 
-    cmd = ["powercfg", "-list"]
-    proc_result = Result.from_command(cmd)
-    if proc_result.value is None:
-        return Result(error=proc_result.error)
-
-    result: list[tuple[str, str]] = []
-    for line in proc_result.value.splitlines():
-        guids = re.findall(GUID_PATTERN, line)
-        names = re.findall(r'\(([^\)]+)\)', line)
-        if not names or not guids:
-            continue
-        result.append((names[0], guids[0]))
-
-    return Result(result)
+    return power_backend().schemes()
 
 
 def aliases() -> Result[dict[str, str]]:
     "Get aliases and their corresponding GUIDs."
 
     cmd = ["powercfg", "-aliases"]
-    proc_result = Result.from_command(cmd)
+    proc_result = POWERCFG_CACHE.run(cmd)
     if proc_result.value is None:
         return Result(error=proc_result.error)
 
@@ -53,21 +56,13 @@ def aliases() -> Result[dict[str, str]]:
 def active() -> Result[tuple[str, str]]:
     "Get the active power scheme name and GUID."
 
-    cmd = ["powercfg", "-getactivescheme"]
-    proc_result = Result.from_command(cmd)
-    if proc_result.value is None:
-        return Result(error=proc_result.error)
-
-    names = re.findall(r'\(([^\)]+)\)', proc_result.value)
-    guids = re.findall(GUID_PATTERN, proc_result.value)
-    return Result(((names or [''])[0], (guids or [''])[0]))
+    return power_backend().active()
 
 
 def set_active(guid: str) -> StatusResult:
     "Set this GUID as active power scheme."
 
-    cmd = ["powercfg", "-setactive", guid]
-    return Result.from_command(cmd).status()
+    return power_backend().set_active(guid)
 
 
 def change_name(guid: str, name: str, description: str = "") -> StatusResult:
@@ -75,7 +70,7 @@ def change_name(guid: str, name: str, description: str = "") -> StatusResult:
 
     cmd = ["powercfg", "-changename", guid, name]
     _ = description and cmd.append(description)
-    return Result.from_command(cmd).status()
+    return POWERCFG_CACHE.run(cmd).status()
 
 
 def duplicate_scheme(scheme_guid: str, destination_guid: str = "") -> Result[tuple[str, str]]:
@@ -92,7 +87,7 @@ def duplicate_scheme(scheme_guid: str, destination_guid: str = "") -> Result[tup
     cmd = ["powercfg", "-duplicatescheme", scheme_guid]
     _ = destination_guid and cmd.append(destination_guid)
 
-    proc_result = Result.from_command(cmd)
+    proc_result = POWERCFG_CACHE.run(cmd)
     if proc_result.value is None:
         return Result(error=proc_result.error)
 
@@ -105,7 +100,7 @@ def delete_scheme(guid: str) -> StatusResult:
     "Delete power scheme associated with GUID."
 
     cmd = ["powercfg", "-delete", guid]
-    return Result.from_command(cmd).status()
+    return POWERCFG_CACHE.run(cmd).status()
 
 
 def change_setting_value(setting: str, value: int) -> StatusResult:
@@ -126,7 +121,86 @@ def change_setting_value(setting: str, value: int) -> StatusResult:
     <VALUE> Specify the new value, in minutes.
     """
     cmd = ["powercfg", "-change", setting, str(value)]
-    return Result.from_command(cmd).status()
+    return POWERCFG_CACHE.run(cmd).status()
+
+
+class SettingsTransaction:
+    """Pending AC/DC setting changes of a power scheme.
+
+    Changes are written to the scheme by the power backend on commit,
+    the scheme is re-applied once only if it is the active scheme.
+    """
+
+    def __init__(self, scheme_guid: str) -> None:
+        self.scheme_guid = scheme_guid
+        # (subgroup guid, setting guid, is ac): value index.
+        self._changes: dict[tuple[str, str, bool], int] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._changes)
+
+    def set_value(self, subgroup_guid: str, setting_guid: str, value: int, ac: bool = True) -> None:
+        """Stage the AC or DC value index of the setting."""
+        self._changes[subgroup_guid, setting_guid, ac] = value
+
+    def rollback(self) -> None:
+        """Discard the pending changes."""
+        self._changes.clear()
+
+    def commit(self) -> StatusResult:
+        """Write the pending changes to the scheme."""
+        if not self._changes:
+            return StatusResult(0)
+
+        changes, self._changes = self._changes, {}
+        backend = power_backend()
+        failed: list[StatusResult] = []
+        for (subgroup_guid, setting_guid, ac), value in changes.items():
+            result = backend.write_value(
+                self.scheme_guid, subgroup_guid, setting_guid, value, ac
+            )
+            if not result.success:
+                failed.append(result)
+
+        # changes to the active scheme take effect once it is re-applied.
+        active_result = backend.active()
+        if active_result.value is not None and \
+                active_result.value[1].lower() == self.scheme_guid.lower():
+            result = backend.set_active(self.scheme_guid)
+            if not result.success:
+                failed.append(result)
+
+        if not failed:
+            return StatusResult(0)
+        return StatusResult(
+            failed[0].status, "\n\n".join(result.error for result in failed)
+        )
+
+
+def apply_scheme(scheme_guid: str, target: PowerScheme) -> Result[list[SettingChange]]:
+    """Write the settings of the target scheme differing from the scheme.
+
+    Only the differing values are written in one transaction, so applying
+    a target the scheme already matches runs only the query.
+
+    Return:
+        The applied changes.
+    """
+    scheme_result = query_scheme(scheme_guid)
+    if scheme_result.value is None:
+        return Result(error=scheme_result.error)
+
+    changes = diff(scheme_result.value, target)
+    transaction = SettingsTransaction(scheme_guid)
+    for change in changes:
+        transaction.set_value(
+            change.subgroup_guid, change.setting_guid, change.target, change.ac
+        )
+
+    result = transaction.commit()
+    if not result.success:
+        return Result(error=Error(result.status, result.error))
+    return Result(changes)
 
 
 def import_scheme(filepath: str, guid: str = "") -> StatusResult:
@@ -139,7 +213,7 @@ def import_scheme(filepath: str, guid: str = "") -> StatusResult:
     """
     cmd = ["powercfg", "-import", filepath]
     _ = guid and cmd.append(guid)
-    return Result.from_command(cmd).status()
+    return POWERCFG_CACHE.run(cmd).status()
 
 
 def export_scheme(filepath: str, guid: str) -> StatusResult:
@@ -150,14 +224,14 @@ def export_scheme(filepath: str, guid: str) -> StatusResult:
         - guid: The GUID of the power scheme to export.
     """
     cmd = ["powercfg", "-export", filepath, guid]
-    return Result.from_command(cmd).status()
+    return POWERCFG_CACHE.run(cmd).status()
 
 
 def list_powerthrottling() -> Result[list[str]]:
     "List all powerthrottling disabled applications."
 
     cmd = ["powercfg", "powerthrottling", "list"]
-    result = Result.from_command(cmd)
+    result = POWERCFG_CACHE.run(cmd)
     if result.value is None:
         return Result(error=result.error)
     return Result(re.findall(": (.*).", result.value))
@@ -170,7 +244,7 @@ def disable_powerthrottling(program: str) -> StatusResult:
         cmd = ["powercfg", "powerthrottling", "disable", "/pfn", program]
     else:
         cmd = ["powercfg", "powerthrottling", "disable", "/path", program]
-    return Result.from_command(cmd).status()
+    return POWERCFG_CACHE.run(cmd).status()
 
 
 def reset_powerthrottling(program: str) -> StatusResult:
@@ -180,32 +254,36 @@ def reset_powerthrottling(program: str) -> StatusResult:
         cmd = ["powercfg", "powerthrottling", "reset", "/pfn", program]
     else:
         cmd = ["powercfg", "powerthrottling", "reset", "/path", program]
-    return Result.from_command(cmd).status()
+    return POWERCFG_CACHE.run(cmd).status()
 
 
-def get_display_timeout(scheme_guid: str) -> Result[tuple[int, int]]:
-    """Get scheme display timeout in minutes.
+def query_scheme(scheme_guid: str) -> Result[PowerScheme]:
+    "Get all the subgroups and settings of the power scheme."
+
+    return power_backend().query_scheme(scheme_guid)
+
+
+def get_timeout(scheme_guid: str, subgroup_guid: str, setting_guid: str) -> Result[tuple[int, int]]:
+    """Get scheme timeout setting in minutes.
 
     Return:
         AC Power Timeout, DC Power Timeout.
     """
-    aliases_result = aliases()
-    if aliases_result.value is None:
-        return Result(error=aliases_result.error)
+    result = power_backend().read_value(scheme_guid, subgroup_guid, setting_guid)
+    if result.value is None:
+        return Result(error=result.error)
 
-    guid = aliases_result.value['SUB_VIDEO']
-    cmd = ["powercfg", "/query", scheme_guid, guid]
-    query_result = Result.from_command(cmd)
+    ac_value, dc_value = result.value
+    return Result((ac_value // 60, dc_value // 60))
 
-    if query_result.value is None:
-        return Result(error=query_result.error)
 
-    ac_value = re.findall(
-        r"Current AC Power Setting Index: ([a-z-0-9]*)", query_result.value)[0]
-    dc_value = re.findall(
-        r"Current DC Power Setting Index: ([a-z-0-9]*)", query_result.value)[0]
+def get_display_timeout(scheme_guid: str) -> Result[tuple[int, int]]:
+    """Get scheme display timeout in minutes.
 
-    return Result((int(ac_value, 0) // 60, int(dc_value, 0) // 60))
+    Return:
+        AC Power Timeout, DC Power Timeout.
+    """
+    return get_timeout(scheme_guid, SUB_VIDEO, VIDEOIDLE)
 
 
 def get_sleep_timeout(scheme_guid: str) -> Result[tuple[int, int]]:
@@ -214,37 +292,21 @@ def get_sleep_timeout(scheme_guid: str) -> Result[tuple[int, int]]:
     Return:
         AC Power Timeout, DC Power Timeout.
     """
-    aliases_result = aliases()
-    if aliases_result.value is None:
-        return Result(error=aliases_result.error)
-
-    guid = aliases_result.value['SUB_SLEEP']
-    cmd = ["powercfg", "/query", scheme_guid, guid]
-    query_result = Result.from_command(cmd)
-
-    if query_result.value is None:
-        return Result(error=query_result.error)
-
-    ac_value = re.findall(
-        r"Current AC Power Setting Index: ([a-z-0-9]*)", query_result.value)[0]
-    dc_value = re.findall(
-        r"Current DC Power Setting Index: ([a-z-0-9]*)", query_result.value)[0]
-
-    return Result((int(ac_value, 0) // 60, int(dc_value, 0) // 60))
+    return get_timeout(scheme_guid, SUB_SLEEP, STANDBYIDLE)
 
 
 def enable_hibernation() -> StatusResult:
     "Enable system hibernation."
 
     cmd = ["powercfg", "-h", "on"]
-    return Result.from_command(cmd).status()
+    return POWERCFG_CACHE.run(cmd).status()
 
 
 def disable_hibernation() -> StatusResult:
     "Disable system hibernation."
 
     cmd = ["powercfg", "-h", "off"]
-    return Result.from_command(cmd).status()
+    return POWERCFG_CACHE.run(cmd).status()
 
 
 def restart(force_restart: bool = False) -> StatusResult:
@@ -269,79 +331,84 @@ def launch_advanced_settings() -> StatusResult:
 # **************************************************************************
 
 
-def is_gamemode_enabled() -> bool:
+def is_gamemode_enabled(session: RegistrySession | None = None) -> bool:
     "Check if gamemode is enabled within registry."
 
-    try:
-        return not not key_value(
-            winreg.HKEY_CURRENT_USER,
-            "SOFTWARE\\Microsoft\\GameBar",
-            "AutoGameModeEnabled"
-        )
-    except FileNotFoundError:
-        return True  # assume True
-    except OSError:
-        return True  # assume True
+    with session_scope(session) as session:
+        try:
+            return not not session.key_value(
+                winreg.HKEY_CURRENT_USER,
+                "SOFTWARE\\Microsoft\\GameBar",
+                "AutoGameModeEnabled"
+            )
+        except FileNotFoundError:
+            return True  # assume True
+        except OSError:
+            return True  # assume True
 
 
-def is_fast_startup_enabled() -> bool:
+def is_fast_startup_enabled(session: RegistrySession | None = None) -> bool:
     "Check if fast startup is enabled within registry."
 
-    try:
-        return not not key_value(
-            winreg.HKEY_LOCAL_MACHINE,
-            "SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Power",
-            "HiberbootEnabled"
-        )
-    except FileNotFoundError:
-        return True  # assume True
-    except OSError:
-        return True  # assume True
+    with session_scope(session) as session:
+        try:
+            return not not session.key_value(
+                winreg.HKEY_LOCAL_MACHINE,
+                "SYSTEM\\CurrentControlSet\\Control\\Session Manager\\Power",
+                "HiberbootEnabled"
+            )
+        except FileNotFoundError:
+            return True  # assume True
+        except OSError:
+            return True  # assume True
 
 
-def is_hibernation_enabled() -> bool:
+def is_hibernation_enabled(session: RegistrySession | None = None) -> bool:
     "Check if hibernation is enabled within registry."
 
-    try:
-        return not not key_value(
-            winreg.HKEY_LOCAL_MACHINE,
-            "SYSTEM\\CurrentControlSet\\Control\\Power",
-            "HibernateEnabled"
-        )
-    except FileNotFoundError:
-        return True  # assume True
-    except OSError:
-        return True  # assume True
+    with session_scope(session) as session:
+        try:
+            return not not session.key_value(
+                winreg.HKEY_LOCAL_MACHINE,
+                "SYSTEM\\CurrentControlSet\\Control\\Power",
+                "HibernateEnabled"
+            )
+        except FileNotFoundError:
+            return True  # assume True
+        except OSError:
+            return True  # assume True
 
 
-def is_usb_power_saving_enabled() -> bool:
+def is_usb_power_saving_enabled(session: RegistrySession | None = None) -> bool:
     "Check if usb power saving is enabled within registry."
 
-    try:
-        return not key_value(
-            winreg.HKEY_LOCAL_MACHINE,
-            "SYSTEM\\CurrentControlSet\\Services\\USB",
-            "DisableSelectiveSuspend"
-        )
-    except FileNotFoundError:
-        return True  # assume True
-    except OSError:
-        return True  # assume True
+    with session_scope(session) as session:
+        try:
+            return not session.key_value(
+                winreg.HKEY_LOCAL_MACHINE,
+                "SYSTEM\\CurrentControlSet\\Services\\USB",
+                "DisableSelectiveSuspend"
+            )
+        except FileNotFoundError:
+            return True  # assume True
+        except OSError:
+            return True  # assume True
 
 
-def is_powerthrottling_enabled() -> bool:
+def is_powerthrottling_enabled(session: RegistrySession | None = None) -> bool:
     "Check if power throttling is enabled within registry."
 
-    try:
-        return not key_value(
-            winreg.HKEY_LOCAL_MACHINE,
-            "SYSTEM\\CurrentControlSet\\Control\\Power\\PowerThrottling",
-            "PowerThrottlingOff"
-        )
-    except FileNotFoundError:
-        return True  # assume True
-    except OSError:
-        return True  # assume True
+    with session_scope(session) as session:
+        try:
+            return not session.key_value(
+                winreg.HKEY_LOCAL_MACHINE,
+                "SYSTEM\\CurrentControlSet\\Control\\Power\\PowerThrottling",
+                "PowerThrottlingOff"
+            )
+        except FileNotFoundError:
+            return True  # assume True
+        except OSError:
+            return True  # assume True
 
 
 def set_gamemode(enable: bool) -> None:
@@ -0,0 +1,507 @@
+"""
+Backends reading and writing power scheme data.
+
+PowercfgBackend runs powercfg and parses its output, PowrProfBackend calls
+the PowrProf API directly, which avoids spawning a process for each query,
+and MemoryPowerBackend keeps the schemes in memory so the modules using
+the schemes can be exercised where neither exists.
+
+The backend is selected on first use: PowrProf when it can be loaded,
+powercfg otherwise. Set the POWER_BACKEND environment variable to
+"powercfg" or "powrprof" to force one.
+"""
+import copy
+import ctypes
+import os
+import re
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from ctypes import wintypes
+from typing import Any, Callable, Iterable, override
+
+from .command_cache import CommandCache
+from .power_scheme import (
+    GUID_PATTERN,
+    parse,
+    PossibleValue,
+    PowerScheme,
+    PowerSetting,
+    PowerSubgroup,
+)
+from .threads import Error, Result, StatusResult
+
+ERROR_SUCCESS = 0
+ERROR_FILE_NOT_FOUND = 2
+ERROR_NO_MORE_ITEMS = 259
+
+# PowerEnumerate access flags.
+ACCESS_SCHEME = 16
+ACCESS_SUBGROUP = 17
+ACCESS_INDIVIDUAL_SETTING = 18
+
+# Seconds after which a hung powercfg is killed.
+POWERCFG_TIMEOUT = 30.0
+
+# Cache of read-only powercfg queries, invalidated by the powercfg
+# commands changing their output. TTLs bound staleness of changes made
+# outside of the application.
+POWERCFG_CACHE = CommandCache(
+    ttls={
+        ("powercfg", "-aliases"): 3600,  # aliases never change.
+        ("powercfg", "-list"): 30,
+        ("powercfg", "-getactivescheme"): 30,
+        ("powercfg", "-query"): 30,
+        ("powercfg", "powerthrottling", "list"): 30,
+    },
+    invalidations={
+        ("powercfg", "-setactive"): [("powercfg", "-getactivescheme"), ("powercfg", "-list")],
+        ("powercfg", "-changename"): [
+            ("powercfg", "-getactivescheme"), ("powercfg", "-list"), ("powercfg", "-query")
+        ],
+        ("powercfg", "-delete"): [("powercfg", "-list"), ("powercfg", "-query")],
+        ("powercfg", "-import"): [("powercfg", "-list")],
+        ("powercfg", "-duplicatescheme"): [("powercfg", "-list")],
+        ("powercfg", "-change"): [("powercfg", "-query")],
+        ("powercfg", "-setacvalueindex"): [("powercfg", "-query")],
+        ("powercfg", "-setdcvalueindex"): [("powercfg", "-query")],
+        ("powercfg", "powerthrottling", "disable"): [("powercfg", "powerthrottling", "list")],
+        ("powercfg", "powerthrottling", "reset"): [("powercfg", "powerthrottling", "list")],
+    },
+    timeout=POWERCFG_TIMEOUT,
+)
+
+
+class PowerBackend(ABC):
+    """Reads and writes the power schemes."""
+
+    @abstractmethod
+    def schemes(self) -> Result[list[tuple[str, str]]]:
+        """Return (name, GUID) of all the power schemes."""
+
+    @abstractmethod
+    def active(self) -> Result[tuple[str, str]]:
+        """Return (name, GUID) of the active power scheme."""
+
+    @abstractmethod
+    def set_active(self, scheme_guid: str) -> StatusResult:
+        """Activate the power scheme."""
+
+    @abstractmethod
+    def query_scheme(self, scheme_guid: str) -> Result[PowerScheme]:
+        """Return all the subgroups and settings of the power scheme."""
+
+    def read_value(self, scheme_guid: str, subgroup_guid: str,
+                   setting_guid: str) -> Result[tuple[int, int]]:
+        """Return the AC and DC value indexes of the setting."""
+        scheme_result = self.query_scheme(scheme_guid)
+        if scheme_result.value is None:
+            return Result(error=scheme_result.error)
+        return _setting_values(scheme_result.value, scheme_guid, setting_guid)
+
+    @abstractmethod
+    def write_value(self, scheme_guid: str, subgroup_guid: str,
+                    setting_guid: str, value: int, ac: bool = True) -> StatusResult:
+        """Write the AC or DC value index of the setting.
+
+        Changes to the active scheme take effect once it is re-activated.
+        """
+
+
+def _setting_values(scheme: PowerScheme, scheme_guid: str,
+                    setting_guid: str) -> Result[tuple[int, int]]:
+    setting = scheme.setting(setting_guid)
+    if setting is None or setting.ac_value is None or setting.dc_value is None:
+        return Result(error=Error(
+            ERROR_FILE_NOT_FOUND, f"Power setting {setting_guid} not found in scheme {scheme_guid}."
+        ))
+    return Result((setting.ac_value, setting.dc_value))
+
+
+class PowercfgBackend(PowerBackend):
+    """Backend running powercfg, read-only queries are cached."""
+
+    def __init__(self) -> None:
+        # scheme GUID -> the cached /query output and its parsed tree.
+        self._parsed: dict[str, tuple[str, PowerScheme]] = {}
+
+    @override
+    def schemes(self) -> Result[list[tuple[str, str]]]:
+        proc_result = POWERCFG_CACHE.run(["powercfg", "-list"])
+        if proc_result.value is None:
+            return Result(error=proc_result.error)
+
+        result: list[tuple[str, str]] = []
+        for line in proc_result.value.splitlines():
+            guids = re.findall(GUID_PATTERN, line)
+            names = re.findall(r'\(([^\)]+)\)', line)
+            if not names or not guids:
+                continue
+            result.append((names[0], guids[0]))
+
+        return Result(result)
+
+    @override
+    def active(self) -> Result[tuple[str, str]]:
+        proc_result = POWERCFG_CACHE.run(["powercfg", "-getactivescheme"])
+        if proc_result.value is None:
+            return Result(error=proc_result.error)
+
+        names = re.findall(r'\(([^\)]+)\)', proc_result.value)
+        guids = re.findall(GUID_PATTERN, proc_result.value)
+        return Result(((names or [''])[0], (guids or [''])[0]))
+
+    @override
+    def set_active(self, scheme_guid: str) -> StatusResult:
+        return POWERCFG_CACHE.run(["powercfg", "-setactive", scheme_guid]).status()
+
+    @override
+    def query_scheme(self, scheme_guid: str) -> Result[PowerScheme]:
+        proc_result = POWERCFG_CACHE.run(["powercfg", "/query", scheme_guid])
+        if proc_result.value is None:
+            return Result(error=proc_result.error)
+
+        try:
+            return Result(parse(proc_result.value))
+        except ValueError as e:
+            return Result(error=Error(1, str(e)))
+
+    @override
+    def read_value(self, scheme_guid: str, subgroup_guid: str,
+                   setting_guid: str) -> Result[tuple[int, int]]:
+        # values are read from the tree of the cached scheme query, parsed
+        # again only when the output changes.
+        proc_result = POWERCFG_CACHE.run(["powercfg", "/query", scheme_guid])
+        if proc_result.value is None:
+            return Result(error=proc_result.error)
+
+        output, scheme = self._parsed.get(scheme_guid, ("", None))
+        if scheme is None or output != proc_result.value:
+            try:
+                scheme = parse(proc_result.value)
+            except ValueError as e:
+                return Result(error=Error(1, str(e)))
+            self._parsed[scheme_guid] = (proc_result.value, scheme)
+        return _setting_values(scheme, scheme_guid, setting_guid)
+
+    @override
+    def write_value(self, scheme_guid: str, subgroup_guid: str,
+                    setting_guid: str, value: int, ac: bool = True) -> StatusResult:
+        option = "/setacvalueindex" if ac else "/setdcvalueindex"
+        cmd = ["powercfg", option, scheme_guid, subgroup_guid, setting_guid, str(value)]
+        return POWERCFG_CACHE.run(cmd).status()
+
+
+class GUID(ctypes.Structure):
+    _fields_ = [
+        ("Data1", ctypes.c_uint32),
+        ("Data2", ctypes.c_uint16),
+        ("Data3", ctypes.c_uint16),
+        ("Data4", ctypes.c_ubyte * 8),
+    ]
+
+    @classmethod
+    def from_string(cls, guid: str) -> "GUID":
+        return cls.from_buffer_copy(uuid.UUID(guid).bytes_le)
+
+    @override
+    def __str__(self) -> str:
+        return str(uuid.UUID(bytes_le=bytes(self)))
+
+
+class PowrProfError(Exception):
+    def __init__(self, function: str, code: int) -> None:
+        super().__init__(f"{function}, {ctypes.FormatError(code).strip()}")
+        self.code = code
+
+
+class PowrProfBackend(PowerBackend):
+    """Backend calling the PowrProf API.
+
+    The API does not expose the powercfg aliases, so the settings tree
+    has none; settings are looked up by GUID.
+    """
+
+    def __init__(self) -> None:
+        self._powrprof = ctypes.WinDLL("powrprof")
+        self._kernel32 = ctypes.WinDLL("kernel32")
+        guid_p = ctypes.POINTER(GUID)
+        dword_p = ctypes.POINTER(wintypes.DWORD)
+
+        for name in ("PowerReadACValueIndex", "PowerReadDCValueIndex"):
+            function = getattr(self._powrprof, name)
+            function.argtypes = (wintypes.HKEY, guid_p, guid_p, guid_p, dword_p)
+        for name in ("PowerWriteACValueIndex", "PowerWriteDCValueIndex"):
+            function = getattr(self._powrprof, name)
+            function.argtypes = (wintypes.HKEY, guid_p, guid_p, guid_p, wintypes.DWORD)
+        for name in ("PowerReadValueMin", "PowerReadValueMax", "PowerReadValueIncrement"):
+            function = getattr(self._powrprof, name)
+            function.argtypes = (wintypes.HKEY, guid_p, guid_p, dword_p)
+        self._powrprof.PowerEnumerate.argtypes = (
+            wintypes.HKEY, guid_p, guid_p, wintypes.DWORD, wintypes.ULONG,
+            ctypes.c_void_p, dword_p)
+        self._powrprof.PowerReadFriendlyName.argtypes = (
+            wintypes.HKEY, guid_p, guid_p, guid_p, ctypes.c_void_p, dword_p)
+        self._powrprof.PowerReadValueUnitsSpecifier.argtypes = (
+            wintypes.HKEY, guid_p, guid_p, ctypes.c_void_p, dword_p)
+        self._powrprof.PowerReadPossibleFriendlyName.argtypes = (
+            wintypes.HKEY, guid_p, guid_p, wintypes.ULONG, ctypes.c_void_p, dword_p)
+        self._powrprof.PowerGetActiveScheme.argtypes = (
+            wintypes.HKEY, ctypes.POINTER(guid_p))
+        self._powrprof.PowerSetActiveScheme.argtypes = (wintypes.HKEY, guid_p)
+        self._kernel32.LocalFree.argtypes = (ctypes.c_void_p,)
+
+    def _call(self, name: str, *args: Any) -> None:
+        code = getattr(self._powrprof, name)(*args)
+        if code != ERROR_SUCCESS:
+            raise PowrProfError(name, code)
+
+    def _read_string(self, name: str, *args: Any) -> str:
+        """Return the UTF-16 string read by a PowerRead* function, or ''."""
+        size = wintypes.DWORD()
+        if getattr(self._powrprof, name)(*args, None, ctypes.byref(size)) != ERROR_SUCCESS \
+                or not size.value:
+            return ""
+        buffer = ctypes.create_string_buffer(size.value)
+        if getattr(self._powrprof, name)(*args, buffer, ctypes.byref(size)) != ERROR_SUCCESS:
+            return ""
+        return buffer.raw[:size.value].decode("utf-16-le").rstrip("\0")
+
+    def _read_dword(self, name: str, *args: Any) -> int | None:
+        value = wintypes.DWORD()
+        if getattr(self._powrprof, name)(*args, ctypes.byref(value)) != ERROR_SUCCESS:
+            return None
+        return value.value
+
+    def _enumerate(self, access: int, scheme: GUID | None = None,
+                   subgroup: GUID | None = None) -> Iterable[GUID]:
+        index = 0
+        while True:
+            guid = GUID()
+            size = wintypes.DWORD(ctypes.sizeof(guid))
+            code = self._powrprof.PowerEnumerate(
+                None, scheme and ctypes.byref(scheme), subgroup and ctypes.byref(subgroup),
+                access, index, ctypes.byref(guid), ctypes.byref(size)
+            )
+            if code == ERROR_NO_MORE_ITEMS:
+                return
+            if code != ERROR_SUCCESS:
+                raise PowrProfError("PowerEnumerate", code)
+            yield guid
+            index += 1
+
+    def _friendly_name(self, scheme: GUID | None, subgroup: GUID | None = None,
+                       setting: GUID | None = None) -> str:
+        return self._read_string(
+            "PowerReadFriendlyName", None,
+            scheme and ctypes.byref(scheme),
+            subgroup and ctypes.byref(subgroup),
+            setting and ctypes.byref(setting),
+        )
+
+    def _active_guid(self) -> GUID:
+        pointer = ctypes.POINTER(GUID)()
+        self._call("PowerGetActiveScheme", None, ctypes.byref(pointer))
+        try:
+            return GUID.from_buffer_copy(pointer.contents)
+        finally:
+            self._kernel32.LocalFree(pointer)
+
+    def _setting(self, scheme: GUID, subgroup: GUID, setting: GUID) -> PowerSetting:
+        result = PowerSetting(str(setting), self._friendly_name(scheme, subgroup, setting))
+        refs = ctypes.byref(scheme), ctypes.byref(subgroup), ctypes.byref(setting)
+        result.ac_value = self._read_dword("PowerReadACValueIndex", None, *refs)
+        result.dc_value = self._read_dword("PowerReadDCValueIndex", None, *refs)
+
+        # settings have either a range or a list of possible values.
+        range_refs = refs[1:]
+        result.minimum = self._read_dword("PowerReadValueMin", None, *range_refs)
+        if result.minimum is not None:
+            result.maximum = self._read_dword("PowerReadValueMax", None, *range_refs)
+            result.increment = self._read_dword("PowerReadValueIncrement", None, *range_refs)
+            result.units = self._read_string(
+                "PowerReadValueUnitsSpecifier", None, *range_refs)
+            return result
+
+        index = 0
+        while name := self._read_string(
+            "PowerReadPossibleFriendlyName", None, *range_refs, index
+        ):
+            result.values.append(PossibleValue(index, name))
+            index += 1
+        return result
+
+    @staticmethod
+    def _result[T](function: Callable[[], T]) -> Result[T]:
+        try:
+            return Result(function())
+        except PowrProfError as e:
+            return Result(error=Error(e.code, str(e)))
+        except ValueError as e:  # malformed GUID.
+            return Result(error=Error(1, str(e)))
+
+    @override
+    def schemes(self) -> Result[list[tuple[str, str]]]:
+        return self._result(lambda: [
+            (self._friendly_name(guid), str(guid))
+            for guid in list(self._enumerate(ACCESS_SCHEME))
+        ])
+
+    @override
+    def active(self) -> Result[tuple[str, str]]:
+        def read() -> tuple[str, str]:
+            guid = self._active_guid()
+            return self._friendly_name(guid), str(guid)
+        return self._result(read)
+
+    @override
+    def set_active(self, scheme_guid: str) -> StatusResult:
+        return self._result(lambda: self._call(
+            "PowerSetActiveScheme", None, ctypes.byref(GUID.from_string(scheme_guid))
+        )).status()
+
+    @override
+    def query_scheme(self, scheme_guid: str) -> Result[PowerScheme]:
+        def read() -> PowerScheme:
+            scheme_id = GUID.from_string(scheme_guid)
+            scheme = PowerScheme(str(scheme_id), self._friendly_name(scheme_id))
+            for subgroup_id in list(self._enumerate(ACCESS_SUBGROUP, scheme_id)):
+                subgroup = PowerSubgroup(
+                    str(subgroup_id), self._friendly_name(scheme_id, subgroup_id))
+                for setting_id in list(self._enumerate(
+                    ACCESS_INDIVIDUAL_SETTING, scheme_id, subgroup_id
+                )):
+                    setting = self._setting(scheme_id, subgroup_id, setting_id)
+                    subgroup.settings[setting.guid] = setting
+                scheme.subgroups[subgroup.guid] = subgroup
+            return scheme
+        return self._result(read)
+
+    @override
+    def read_value(self, scheme_guid: str, subgroup_guid: str,
+                   setting_guid: str) -> Result[tuple[int, int]]:
+        def read() -> tuple[int, int]:
+            refs = (
+                ctypes.byref(GUID.from_string(scheme_guid)),
+                ctypes.byref(GUID.from_string(subgroup_guid)),
+                ctypes.byref(GUID.from_string(setting_guid)),
+            )
+            values: list[int] = []
+            for name in ("PowerReadACValueIndex", "PowerReadDCValueIndex"):
+                value = wintypes.DWORD()
+                self._call(name, None, *refs, ctypes.byref(value))
+                values.append(value.value)
+            return values[0], values[1]
+        return self._result(read)
+
+    @override
+    def write_value(self, scheme_guid: str, subgroup_guid: str,
+                    setting_guid: str, value: int, ac: bool = True) -> StatusResult:
+        return self._result(lambda: self._call(
+            "PowerWriteACValueIndex" if ac else "PowerWriteDCValueIndex", None,
+            ctypes.byref(GUID.from_string(scheme_guid)),
+            ctypes.byref(GUID.from_string(subgroup_guid)),
+            ctypes.byref(GUID.from_string(setting_guid)),
+            value,
+        )).status()
+
+
+class MemoryPowerBackend(PowerBackend):
+    """Backend keeping the power schemes in memory."""
+
+    def __init__(self, schemes: Iterable[PowerScheme] = (), active_guid: str = "") -> None:
+        self._lock = threading.Lock()
+        self._schemes = {scheme.guid.lower(): copy.deepcopy(scheme) for scheme in schemes}
+        self._active = active_guid.lower() or next(iter(self._schemes), "")
+        self.writes = 0
+
+    def _not_found(self, guid: str) -> Error:
+        return Error(ERROR_FILE_NOT_FOUND, f"Power scheme {guid} not found.")
+
+    @override
+    def schemes(self) -> Result[list[tuple[str, str]]]:
+        with self._lock:
+            return Result([(scheme.name, scheme.guid) for scheme in self._schemes.values()])
+
+    @override
+    def active(self) -> Result[tuple[str, str]]:
+        with self._lock:
+            scheme = self._schemes.get(self._active)
+            if scheme is None:
+                return Result(error=self._not_found(self._active))
+            return Result((scheme.name, scheme.guid))
+
+    @override
+    def set_active(self, scheme_guid: str) -> StatusResult:
+        with self._lock:
+            if scheme_guid.lower() not in self._schemes:
+                error = self._not_found(scheme_guid)
+                return StatusResult(error.winerr, error.stderr)
+            self._active = scheme_guid.lower()
+            return StatusResult(0)
+
+    @override
+    def query_scheme(self, scheme_guid: str) -> Result[PowerScheme]:
+        with self._lock:
+            scheme = self._schemes.get(scheme_guid.lower())
+            if scheme is None:
+                return Result(error=self._not_found(scheme_guid))
+            return Result(copy.deepcopy(scheme))
+
+    @override
+    def read_value(self, scheme_guid: str, subgroup_guid: str,
+                   setting_guid: str) -> Result[tuple[int, int]]:
+        with self._lock:
+            scheme = self._schemes.get(scheme_guid.lower())
+            if scheme is None:
+                return Result(error=self._not_found(scheme_guid))
+            return _setting_values(scheme, scheme_guid, setting_guid)
+
+    @override
+    def write_value(self, scheme_guid: str, subgroup_guid: str,
+                    setting_guid: str, value: int, ac: bool = True) -> StatusResult:
+        with self._lock:
+            scheme = self._schemes.get(scheme_guid.lower())
+            subgroup = scheme and scheme.subgroups.get(subgroup_guid.lower())
+            setting = subgroup and subgroup.settings.get(setting_guid.lower())
+            if setting is None:
+                return StatusResult(ERROR_FILE_NOT_FOUND, (
+                    f"Power setting {setting_guid} not found in scheme {scheme_guid}."
+                ))
+            if ac:
+                setting.ac_value = value
+            else:
+                setting.dc_value = value
+            self.writes += 1
+            return StatusResult(0)
+
+
+_backend: PowerBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def _default_backend() -> PowerBackend:
+    name = os.environ.get("POWER_BACKEND", "").lower()
+    if name != "powercfg":
+        try:
+            return PowrProfBackend()
+        except (AttributeError, OSError):  # not on windows.
+            if name == "powrprof":
+                raise
+    return PowercfgBackend()
+
+
+def power_backend() -> PowerBackend:
+    """Return the backend used to read and write the power schemes."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _default_backend()
+        return _backend
+
+
+def set_power_backend(backend: PowerBackend) -> None:
+    """Set the backend used to read and write the power schemes."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
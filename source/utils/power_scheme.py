@@ -0,0 +1,251 @@
+"""
+Parse the output of `powercfg /query <scheme>` into a settings tree.
+
+The labels of the output are localized, so lines are recognized by their
+indentation and values instead of their labels:
+
+    Power Scheme GUID: <guid>  (<name>)
+      GUID Alias: <alias>
+      Subgroup GUID: <guid>  (<name>)
+        GUID Alias: <alias>
+        Power Setting GUID: <guid>  (<name>)
+          GUID Alias: <alias>
+          Minimum Possible Setting: 0x<hex>
+          Maximum Possible Setting: 0x<hex>
+          Possible Settings increment: 0x<hex>
+          Possible Settings units: <units>
+          Possible Setting Index: <decimal>
+          Possible Setting Friendly Name: <name>
+        Current AC Power Setting Index: 0x<hex>
+        Current DC Power Setting Index: 0x<hex>
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+GUID_PATTERN = "[a-fA-F0-9]{8}-[a-fA-F0-9]{4}" + \
+    "-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{12}"
+
+# GUIDs of the subgroups and settings used by `utils.power`.
+SUB_VIDEO = "7516b95f-f776-4464-8c53-06167f40cc99"  # Display.
+SUB_SLEEP = "238c9fa8-0aad-41ed-83f4-97be242c8f20"  # Sleep.
+VIDEOIDLE = "3c0bc021-c8a8-4e07-a973-6b14cbcb2b7e"  # Turn off display after.
+STANDBYIDLE = "29f6c1db-86da-48c5-9fdb-f2b67b1f44da"  # Sleep after.
+
+GUID_LINE = re.compile(rf"^(\s*).*?({GUID_PATTERN})\s*(?:\((.*)\))?\s*$")
+VALUE_LINE = re.compile(r"^(\s*)[^:：]*[:：]\s*(.*?)\s*$")
+ALIAS_VALUE = re.compile(r"^[A-Z][A-Z0-9_]*$")
+HEX_VALUE = re.compile(r"^0x[0-9a-fA-F]+$")
+INDEX_VALUE = re.compile(r"^[0-9]+$")
+
+
+@dataclass(slots=True)
+class PossibleValue:
+    index: int
+    name: str
+
+
+@dataclass(slots=True)
+class PowerSetting:
+    guid: str
+    name: str
+    alias: str = ""
+    ac_value: int | None = None
+    dc_value: int | None = None
+    minimum: int | None = None
+    maximum: int | None = None
+    increment: int | None = None
+    units: str = ""
+    values: list[PossibleValue] = field(default_factory=list[PossibleValue])
+
+
+@dataclass(slots=True)
+class PowerSubgroup:
+    guid: str
+    name: str
+    alias: str = ""
+    settings: dict[str, PowerSetting] = field(default_factory=dict[str, PowerSetting])
+
+
+@dataclass(slots=True)
+class PowerScheme:
+    guid: str
+    name: str
+    alias: str = ""
+    subgroups: dict[str, PowerSubgroup] = field(default_factory=dict[str, PowerSubgroup])
+
+    def subgroup(self, key: str) -> PowerSubgroup | None:
+        """Return the subgroup by its GUID or alias."""
+        key = key.lower()
+        for subgroup in self.subgroups.values():
+            if key in (subgroup.guid, subgroup.alias.lower()):
+                return subgroup
+        return None
+
+    def setting(self, key: str) -> PowerSetting | None:
+        """Return the setting by its GUID or alias."""
+        key = key.lower()
+        for subgroup in self.subgroups.values():
+            if key in subgroup.settings:
+                return subgroup.settings[key]
+            for setting in subgroup.settings.values():
+                if key == setting.alias.lower():
+                    return setting
+        return None
+
+
+def parse(output: str) -> PowerScheme:
+    """Parse output of `powercfg /query <scheme>`.
+
+    Raise ValueError if the output does not contain a power scheme.
+    """
+    scheme: PowerScheme | None = None
+    subgroup: PowerSubgroup | None = None
+    setting: PowerSetting | None = None
+    # indentation of the scheme, subgroup and setting lines.
+    levels: list[int] = []
+    current: PowerScheme | PowerSubgroup | PowerSetting | None = None
+    range_values: list[int] = []
+    possible_index: int | None = None
+    expect_alias = False
+
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+
+        if match := GUID_LINE.match(line):
+            indent = len(match[1])
+            while levels and levels[-1] >= indent:
+                levels.pop()
+            levels.append(indent)
+            guid, name = match[2].lower(), (match[3] or "").strip()
+
+            if len(levels) == 1:
+                current = scheme = PowerScheme(guid, name)
+                subgroup = setting = None
+            elif len(levels) == 2 and scheme is not None:
+                current = subgroup = scheme.subgroups[guid] = PowerSubgroup(guid, name)
+                setting = None
+            elif len(levels) == 3 and subgroup is not None:
+                current = setting = subgroup.settings[guid] = PowerSetting(guid, name)
+                range_values = []
+                possible_index = None
+            expect_alias = True  # alias line follows GUIDs having one.
+            continue
+
+        match = VALUE_LINE.match(line)
+        if match is None or current is None:
+            continue
+        indent, value = len(match[1]), match[2]
+
+        if expect_alias:
+            expect_alias = False
+            if indent > levels[-1] and ALIAS_VALUE.match(value):
+                current.alias = value
+                continue
+
+        if setting is None:
+            continue
+
+        if indent > levels[-1]:  # attributes of the setting.
+            if possible_index is not None:
+                setting.values.append(PossibleValue(possible_index, value))
+                possible_index = None
+            elif HEX_VALUE.match(value) and len(range_values) < 3:
+                range_values.append(int(value, 16))
+                setting.minimum, setting.maximum, setting.increment = (
+                    range_values + [None, None, None])[:3]
+            elif INDEX_VALUE.match(value):
+                possible_index = int(value)
+            elif range_values and not setting.units:
+                setting.units = value
+        elif HEX_VALUE.match(value):  # current AC then DC index.
+            if setting.ac_value is None:
+                setting.ac_value = int(value, 16)
+            elif setting.dc_value is None:
+                setting.dc_value = int(value, 16)
+
+    if scheme is None:
+        raise ValueError("No power scheme found in powercfg output.")
+    return scheme
+
+
+@dataclass(frozen=True, slots=True)
+class SettingChange:
+    subgroup_guid: str
+    setting_guid: str
+    ac: bool
+    current: int | None
+    target: int
+
+
+def diff(current: PowerScheme, target: PowerScheme) -> list[SettingChange]:
+    """Return the AC/DC indices of the target scheme differing from current."""
+    changes: list[SettingChange] = []
+    for target_subgroup in target.subgroups.values():
+        subgroup = current.subgroups.get(target_subgroup.guid)
+        for target_setting in target_subgroup.settings.values():
+            setting = subgroup.settings.get(target_setting.guid) if subgroup else None
+            for ac, target_value, value in (
+                (True, target_setting.ac_value, setting and setting.ac_value),
+                (False, target_setting.dc_value, setting and setting.dc_value),
+            ):
+                if target_value is None or target_value == value:
+                    continue
+                changes.append(SettingChange(
+                    target_subgroup.guid, target_setting.guid, ac, value, target_value
+                ))
+    return changes
+
+
+def to_baseline(scheme: PowerScheme) -> dict[str, Any]:
+    """Return the AC/DC indices of the scheme as a JSON serializable baseline."""
+    return {
+        "guid": scheme.guid,
+        "name": scheme.name,
+        "subgroups": {
+            subgroup.guid: {
+                setting.guid: {"ac": setting.ac_value, "dc": setting.dc_value}
+                for setting in subgroup.settings.values()
+            }
+            for subgroup in scheme.subgroups.values()
+        },
+    }
+
+
+def from_baseline(baseline: dict[str, Any]) -> PowerScheme:
+    """Return the scheme of a baseline created by `to_baseline`.
+
+    Raise ValueError if the baseline is malformed.
+    """
+    try:
+        scheme = PowerScheme(str(baseline.get("guid", "")), str(baseline.get("name", "")))
+        for subgroup_guid, settings in baseline["subgroups"].items():
+            subgroup_guid = str(subgroup_guid).lower()
+            subgroup = scheme.subgroups[subgroup_guid] = PowerSubgroup(subgroup_guid, "")
+            for setting_guid, values in settings.items():
+                setting_guid = str(setting_guid).lower()
+                subgroup.settings[setting_guid] = PowerSetting(
+                    setting_guid, "",
+                    ac_value=None if values.get("ac") is None else int(values["ac"]),
+                    dc_value=None if values.get("dc") is None else int(values["dc"]),
+                )
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid power scheme baseline: {e}") from e
+    return scheme
+
+
+def save_baseline(scheme: PowerScheme, filepath: str) -> None:
+    """Write the baseline of the scheme to a JSON file."""
+    with open(filepath, "w", encoding="utf-8") as file:
+        json.dump(to_baseline(scheme), file, indent=4)
+
+
+def load_baseline(filepath: str) -> PowerScheme:
+    """Read the scheme of a JSON baseline file.
+
+    Raise OSError if the file can't be read, ValueError if it is malformed.
+    """
+    with open(filepath, encoding="utf-8") as file:
+        return from_baseline(json.load(file))
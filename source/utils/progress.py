@@ -0,0 +1,108 @@
+"""
+Coalesce the progress messages of worker threads for the UI.
+
+Workers add lines and counters to a `ProgressBuffer` as fast as they run,
+the UI thread takes them in batches on a timer, so a long operation costs
+one text insert and repaint per interval instead of a cross-thread signal
+per line. Pending lines are kept in a bounded ring buffer, lines pushed out
+of it before being taken are only counted.
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+
+# Interval the widgets take the pending batch at, in milliseconds.
+FLUSH_INTERVAL = 100
+
+# Lines kept until taken, the oldest are dropped past it.
+MAX_PENDING = 1000
+
+
+def format_size(size: int) -> str:
+    """Return the size in bytes as a human readable string."""
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+@dataclass(frozen=True, slots=True)
+class Progress:
+    """Message of a worker and what it accounts for."""
+    line: str
+    files: int = 0
+    size: int = 0  # bytes.
+    errors: int = 0
+
+
+@dataclass(slots=True)
+class Counters:
+    files: int = 0
+    size: int = 0  # bytes.
+    errors: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class Batch:
+    """Lines added since the previous batch and the running counters."""
+    lines: list[str]
+    dropped: int  # lines added but pushed out of the buffer before taken.
+    counters: Counters
+
+    @property
+    def text(self) -> str:
+        """Return the batch as one block of text."""
+        lines = self.lines
+        if self.dropped:
+            lines = [f"... {self.dropped} lines skipped ...", *lines]
+        return "\n".join(lines)
+
+
+class ProgressBuffer:
+    """Thread-safe buffer of progress lines and counters."""
+
+    def __init__(self, max_pending: int = MAX_PENDING) -> None:
+        self._lock = threading.Lock()
+        self._lines: deque[str] = deque(maxlen=max_pending)
+        self._dropped = 0
+        self._counters = Counters()
+        self._changed = False
+
+    def add(self, progress: Progress | str) -> None:
+        """Add a line, and its files, size and errors to the counters."""
+        if isinstance(progress, str):
+            progress = Progress(progress)
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self._dropped += 1
+            self._lines.append(progress.line)
+            self._counters.files += progress.files
+            self._counters.size += progress.size
+            self._counters.errors += progress.errors
+            self._changed = True
+
+    @property
+    def counters(self) -> Counters:
+        with self._lock:
+            return replace(self._counters)
+
+    def take(self) -> Batch | None:
+        """Return the pending lines and the counters, None if nothing was added."""
+        with self._lock:
+            if not self._changed:
+                return None
+            batch = Batch(list(self._lines), self._dropped, replace(self._counters))
+            self._lines.clear()
+            self._dropped = 0
+            self._changed = False
+            return batch
+
+    def reset(self) -> None:
+        """Drop the pending lines and zero the counters."""
+        with self._lock:
+            self._lines.clear()
+            self._dropped = 0
+            self._counters = Counters()
+            self._changed = False
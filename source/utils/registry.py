@@ -1,8 +1,10 @@
+import threading
 import typing
-import winreg
+from contextlib import contextmanager
 
-if typing.TYPE_CHECKING:
-    _KeyType = winreg._KeyType  # type: ignore
+from .registry_backend import KeyHandle, winreg
+
+_KeyType = KeyHandle
 
 
 KEY_NAMES = {
@@ -16,6 +18,27 @@ KEY_NAMES = {
 }
 
 
+# Called with (key, sub_key, value name) before a value is changed and with
+# (key, sub_key, None) before the sub_key itself is created or deleted.
+ChangeListener = typing.Callable[['_KeyType', str, str | None], None]
+_change_listeners: list[ChangeListener] = []
+
+
+def add_change_listener(listener: ChangeListener) -> None:
+    """Call the listener before each change of the registry."""
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener: ChangeListener) -> None:
+    _change_listeners.remove(listener)
+
+
+def record_change(key: '_KeyType', sub_key: str, name: str | None = None) -> None:
+    """Notify the listeners the value, or the key if name is None, is about to change."""
+    for listener in list(_change_listeners):
+        listener(key, sub_key, name)
+
+
 class KeyNotExistsError(FileNotFoundError):
     """Raised when a key doesn't exist."""
 
@@ -23,7 +46,7 @@ class KeyNotExistsError(FileNotFoundError):
         super().__init__(f"{key_path} doesn't exist.")
 
 
-def OpenKey(key: '_KeyType', sub_key: str, reserved: int = 0, access: int = 131097) -> winreg.HKEYType:
+def OpenKey(key: '_KeyType', sub_key: str, reserved: int = 0, access: int = 131097) -> KeyHandle:
     """Opens the specified key.
 
     key
@@ -50,6 +73,22 @@ def OpenKey(key: '_KeyType', sub_key: str, reserved: int = 0, access: int = 1310
         raise error
 
 
+def _query_value(reg_key: KeyHandle, key: '_KeyType', sub_key: str, name: str) -> typing.Any:
+    try:
+        return winreg.QueryValueEx(reg_key, name)[0]
+
+    except FileNotFoundError:
+        key_name = KEY_NAMES[int(key)]
+        reg_path = f"{key_name}\\{sub_key}\\{name}"
+        raise KeyNotExistsError(reg_path) from None
+
+    except PermissionError as error:
+        key_name = KEY_NAMES[int(key)]
+        reg_path = f"{key_name}\\{sub_key}\\{name}"
+        error.add_note(f"Couldn't read key: {reg_path}")
+        raise error
+
+
 def key_value(key: '_KeyType', sub_key: str, name: str) -> typing.Any:
     """Retrieve value of the specified sub-key from the Windows registry.
 
@@ -64,23 +103,80 @@ def key_value(key: '_KeyType', sub_key: str, name: str) -> typing.Any:
     reg_key = OpenKey(key, sub_key)
 
     try:
-        return winreg.QueryValueEx(reg_key, name)[0]
-
-    except FileNotFoundError:
-        key_name = KEY_NAMES[int(key)]
-        reg_path = f"{key_name}\\{sub_key}\\{name}"
-        raise KeyNotExistsError(reg_path) from None
-
-    except PermissionError as error:
-        key_name = KEY_NAMES[int(key)]
-        reg_path = f"{key_name}\\{sub_key}\\{name}"
-        error.add_note(f"Couldn't read key: {reg_path}")
-        raise error
+        return _query_value(reg_key, key, sub_key, name)
 
     finally:
         winreg.CloseKey(reg_key)
 
 
+class RegistrySession:
+    """Registry keys kept open for the lifetime of the session.
+
+    Handles are cached by (hive, path, access) so reading several values
+    of a key opens it once, all of them are closed by `close` or on exit
+    of the `with` block.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._handles: dict[tuple[int, str, int], KeyHandle] = {}
+
+    def __enter__(self) -> typing.Self:
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def open(self, key: '_KeyType', sub_key: str, access: int = winreg.KEY_READ) -> KeyHandle:
+        """Return the cached handle of the key, open it on first use.
+
+        Raise the errors of `OpenKey`.
+        """
+        handle_key = int(key), sub_key.lower(), access
+        with self._lock:
+            reg_key = self._handles.get(handle_key)
+            if reg_key is None:
+                reg_key = self._handles[handle_key] = OpenKey(key, sub_key, 0, access)
+            return reg_key
+
+    def key_value(self, key: '_KeyType', sub_key: str, name: str) -> typing.Any:
+        """Retrieve value of the specified sub-key, same as `key_value`."""
+        return _query_value(self.open(key, sub_key), key, sub_key, name)
+
+    def read_many(
+        self, values: typing.Iterable[tuple['_KeyType', str, str]]
+    ) -> dict[tuple['_KeyType', str, str], typing.Any]:
+        """Retrieve the (key, sub_key, name) values.
+
+        Return:
+            The value of each one, or the OSError raised reading it.
+        """
+        result: dict[tuple['_KeyType', str, str], typing.Any] = {}
+        for key, sub_key, name in values:
+            try:
+                result[key, sub_key, name] = self.key_value(key, sub_key, name)
+            except OSError as error:
+                result[key, sub_key, name] = error
+        return result
+
+    def close(self) -> None:
+        """Close all the handles opened by the session."""
+        with self._lock:
+            handles, self._handles = self._handles, {}
+        for reg_key in handles.values():
+            winreg.CloseKey(reg_key)
+
+
+@contextmanager
+def session_scope(session: RegistrySession | None = None) -> typing.Generator[RegistrySession, None, None]:
+    """Yield the session, or a new one closed on exit if None."""
+    if session is not None:
+        yield session
+        return
+    with RegistrySession() as new_session:
+        yield new_session
+
+
 def set_key_value(key: '_KeyType', sub_key: str, name: str, value: int) -> None:
     """Change the given key value in windows registry.
 
@@ -90,6 +186,7 @@ def set_key_value(key: '_KeyType', sub_key: str, name: str, value: int) -> None:
         - name: A string containing the name of the value to set.
         - value: A string that specifies the new value.
     """
+    record_change(key, sub_key, name)
     reg_key = OpenKey(key, sub_key, 0, winreg.KEY_SET_VALUE)
 
     try:
@@ -112,6 +209,7 @@ def create_key(key: '_KeyType', sub_key: str, name: str) -> None:
         - sub_key: A string that identifies the sub_key to open.
         - name: The name of the key this function opens or creates.
     """
+    record_change(key, f"{sub_key}\\{name}")
     reg_key = OpenKey(key, sub_key, 0, winreg.KEY_ALL_ACCESS)
 
     try:
@@ -140,6 +238,7 @@ def del_key(key: '_KeyType', sub_key: str, name: str) -> None:
 
     If the function succeeds, the entire key, including all of its values, is removed. If the function fails, an OSError exception is raised.
     """
+    record_change(key, f"{sub_key}\\{name}")
     reg_key = OpenKey(key, sub_key, access=winreg.KEY_ALL_ACCESS)
 
     try:
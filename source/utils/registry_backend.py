@@ -0,0 +1,390 @@
+"""
+Backends of the registry helpers.
+
+`winreg` below is a drop-in for the subset of the standard `winreg` module
+used by the helpers, forwarding each call to the current backend:
+WinregBackend on windows, MemoryRegistry elsewhere or when set with
+`set_registry_backend`, so the registry helpers run unchanged on a
+virtual registry where the windows one is unavailable.
+"""
+import errno
+import itertools
+import sys
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, SupportsInt, override
+
+if sys.platform == "win32":
+    import winreg as _winreg
+
+# Predefined keys and constants, same values as the winreg ones.
+HKEY_CLASSES_ROOT = 0x80000000
+HKEY_CURRENT_USER = 0x80000001
+HKEY_LOCAL_MACHINE = 0x80000002
+HKEY_USERS = 0x80000003
+HKEY_PERFORMANCE_DATA = 0x80000004
+HKEY_CURRENT_CONFIG = 0x80000005
+HKEY_DYN_DATA = 0x80000006
+
+KEY_QUERY_VALUE = 0x0001
+KEY_SET_VALUE = 0x0002
+KEY_CREATE_SUB_KEY = 0x0004
+KEY_ENUMERATE_SUB_KEYS = 0x0008
+KEY_READ = 0x20019
+KEY_WRITE = 0x20006
+KEY_ALL_ACCESS = 0xF003F
+
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+ERROR_FILE_NOT_FOUND = 2
+ERROR_ACCESS_DENIED = 5
+ERROR_INVALID_HANDLE = 6
+ERROR_NO_MORE_ITEMS = 259
+
+# A predefined HKEY_* constant or a key opened by a backend.
+KeyHandle = SupportsInt
+
+
+class RegistryBackend(ABC):
+    """The winreg functions used by the registry helpers."""
+
+    @abstractmethod
+    def OpenKey(self, key: KeyHandle, sub_key: str, reserved: int = 0,
+                access: int = KEY_READ) -> KeyHandle: ...
+
+    @abstractmethod
+    def CloseKey(self, key: KeyHandle) -> None: ...
+
+    @abstractmethod
+    def CreateKeyEx(self, key: KeyHandle, sub_key: str, reserved: int = 0,
+                    access: int = KEY_WRITE) -> KeyHandle: ...
+
+    @abstractmethod
+    def DeleteKey(self, key: KeyHandle, sub_key: str) -> None: ...
+
+    @abstractmethod
+    def QueryValueEx(self, key: KeyHandle, name: str) -> tuple[Any, int]: ...
+
+    @abstractmethod
+    def SetValueEx(self, key: KeyHandle, name: str, reserved: int,
+                   value_type: int, value: Any) -> None: ...
+
+    @abstractmethod
+    def DeleteValue(self, key: KeyHandle, name: str) -> None: ...
+
+    @abstractmethod
+    def EnumValue(self, key: KeyHandle, index: int) -> tuple[str, Any, int]: ...
+
+    @abstractmethod
+    def QueryInfoKey(self, key: KeyHandle) -> tuple[int, int, int]:
+        """Return the number of sub-keys, of values and the last modified time."""
+
+
+class WinregBackend(RegistryBackend):
+    """Backend of the windows registry."""
+
+    @override
+    def OpenKey(self, key: KeyHandle, sub_key: str, reserved: int = 0,
+                access: int = KEY_READ) -> KeyHandle:
+        return _winreg.OpenKey(key, sub_key, reserved, access)  # type: ignore
+
+    @override
+    def CloseKey(self, key: KeyHandle) -> None:
+        _winreg.CloseKey(key)  # type: ignore
+
+    @override
+    def CreateKeyEx(self, key: KeyHandle, sub_key: str, reserved: int = 0,
+                    access: int = KEY_WRITE) -> KeyHandle:
+        return _winreg.CreateKeyEx(key, sub_key, reserved, access)  # type: ignore
+
+    @override
+    def DeleteKey(self, key: KeyHandle, sub_key: str) -> None:
+        _winreg.DeleteKey(key, sub_key)  # type: ignore
+
+    @override
+    def QueryValueEx(self, key: KeyHandle, name: str) -> tuple[Any, int]:
+        return _winreg.QueryValueEx(key, name)  # type: ignore
+
+    @override
+    def SetValueEx(self, key: KeyHandle, name: str, reserved: int,
+                   value_type: int, value: Any) -> None:
+        _winreg.SetValueEx(key, name, reserved, value_type, value)  # type: ignore
+
+    @override
+    def DeleteValue(self, key: KeyHandle, name: str) -> None:
+        _winreg.DeleteValue(key, name)  # type: ignore
+
+    @override
+    def EnumValue(self, key: KeyHandle, index: int) -> tuple[str, Any, int]:
+        return _winreg.EnumValue(key, index)  # type: ignore
+
+    @override
+    def QueryInfoKey(self, key: KeyHandle) -> tuple[int, int, int]:
+        return _winreg.QueryInfoKey(key)  # type: ignore
+
+
+def _error[E: OSError](cls: type[E], code: int, winerror: int, message: str) -> E:
+    """Return the error as raised by winreg, with its winerror set on any platform."""
+    error = cls(code, message, None, winerror)  # formatted as "[WinError n]" on windows.
+    error.winerror = winerror
+    return error
+
+
+class _Node:
+    __slots__ = ("name", "keys", "values", "denied")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.keys: dict[str, _Node] = {}  # lowercase name: sub-key.
+        self.values: dict[str, tuple[str, Any, int]] = {}  # lowercase name: (name, value, type).
+        self.denied = 0  # access rights denied to open the key with.
+
+
+class MemoryKey:
+    """Key opened by the MemoryRegistry."""
+
+    def __init__(self, handle: int, node: _Node, access: int, path: str) -> None:
+        self.handle = handle
+        self.node = node
+        self.access = access
+        self.path = path
+        self.closed = False
+
+    def __int__(self) -> int:
+        return self.handle
+
+
+class MemoryRegistry(RegistryBackend):
+    """Backend of a virtual registry kept in memory.
+
+    Keys and values are case-insensitive, values are typed and checked like
+    winreg does, and missing keys, denied access and closed handles raise
+    the same errors as the windows registry.
+    """
+
+    HIVES = (
+        HKEY_CLASSES_ROOT, HKEY_CURRENT_USER, HKEY_LOCAL_MACHINE, HKEY_USERS,
+        HKEY_PERFORMANCE_DATA, HKEY_CURRENT_CONFIG, HKEY_DYN_DATA,
+    )
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._hives = {hive: _Node(str(hive)) for hive in self.HIVES}
+        self._handles = itertools.count(1)
+
+    # virtual registry setup.
+
+    def set_value(self, hive: int, path: str, name: str, value: Any,
+                  value_type: int = REG_DWORD) -> None:
+        """Set the value, creating the key and its parents if needed."""
+        with self._lock:
+            node = self._walk(self._hives[hive], path, create=True)
+            self._check_value(value_type, value)
+            node.values[name.lower()] = name, value, value_type
+
+    def deny(self, hive: int, path: str, access: int = KEY_ALL_ACCESS) -> None:
+        """Deny opening the key, creating it if needed, with the access rights."""
+        with self._lock:
+            self._walk(self._hives[hive], path, create=True).denied = access
+
+    # winreg functions.
+
+    def _node(self, key: KeyHandle, required: int = 0) -> _Node:
+        if isinstance(key, MemoryKey):
+            if key.closed:
+                raise _error(OSError, errno.EBADF, ERROR_INVALID_HANDLE, "The handle is invalid")
+            if required and not key.access & required:
+                raise _error(PermissionError, errno.EACCES, ERROR_ACCESS_DENIED, "Access is denied")
+            return key.node
+        node = self._hives.get(int(key))
+        if node is None:
+            raise _error(OSError, errno.EBADF, ERROR_INVALID_HANDLE, "The handle is invalid")
+        return node
+
+    def _walk(self, node: _Node, sub_key: str, create: bool = False) -> _Node:
+        for name in filter(None, sub_key.split("\\")):
+            child = node.keys.get(name.lower())
+            if child is None:
+                if not create:
+                    raise _error(
+                        FileNotFoundError, errno.ENOENT, ERROR_FILE_NOT_FOUND,
+                        "The system cannot find the file specified"
+                    )
+                child = node.keys[name.lower()] = _Node(name)
+            node = child
+        return node
+
+    def _open(self, node: _Node, access: int, path: str) -> MemoryKey:
+        if node.denied & access:
+            raise _error(PermissionError, errno.EACCES, ERROR_ACCESS_DENIED, "Access is denied")
+        return MemoryKey(next(self._handles), node, access, path)
+
+    @staticmethod
+    def _check_value(value_type: int, value: Any) -> None:
+        if value_type in (REG_DWORD, REG_QWORD):
+            bits = 32 if value_type == REG_DWORD else 64
+            valid = isinstance(value, int) and 0 <= value < 2 ** bits
+        elif value_type in (REG_SZ, REG_EXPAND_SZ):
+            valid = value is None or isinstance(value, str)
+        elif value_type == REG_MULTI_SZ:
+            valid = isinstance(value, list) and all(
+                isinstance(item, str) for item in value  # type: ignore
+            )
+        else:
+            valid = value is None or isinstance(value, bytes)
+        if not valid:
+            raise ValueError(f"Could not convert the data to the specified type: {value!r}")
+
+    @override
+    def OpenKey(self, key: KeyHandle, sub_key: str, reserved: int = 0,
+                access: int = KEY_READ) -> KeyHandle:
+        with self._lock:
+            return self._open(self._walk(self._node(key), sub_key), access, sub_key)
+
+    @override
+    def CloseKey(self, key: KeyHandle) -> None:
+        if isinstance(key, MemoryKey):
+            key.closed = True
+
+    @override
+    def CreateKeyEx(self, key: KeyHandle, sub_key: str, reserved: int = 0,
+                    access: int = KEY_WRITE) -> KeyHandle:
+        with self._lock:
+            node = self._node(key, KEY_CREATE_SUB_KEY)
+            return self._open(self._walk(node, sub_key, create=True), access, sub_key)
+
+    @override
+    def DeleteKey(self, key: KeyHandle, sub_key: str) -> None:
+        with self._lock:
+            parent_path, _, name = sub_key.rstrip("\\").rpartition("\\")
+            parent = self._walk(self._node(key), parent_path)
+            node = self._walk(parent, name)
+            if node.keys or node is parent:  # keys with sub-keys can't be deleted.
+                raise _error(PermissionError, errno.EACCES, ERROR_ACCESS_DENIED, "Access is denied")
+            del parent.keys[name.lower()]
+
+    @override
+    def QueryValueEx(self, key: KeyHandle, name: str) -> tuple[Any, int]:
+        with self._lock:
+            item = self._node(key, KEY_QUERY_VALUE).values.get(name.lower())
+            if item is None:
+                raise _error(
+                    FileNotFoundError, errno.ENOENT, ERROR_FILE_NOT_FOUND,
+                    "The system cannot find the file specified"
+                )
+            return item[1], item[2]
+
+    @override
+    def SetValueEx(self, key: KeyHandle, name: str, reserved: int,
+                   value_type: int, value: Any) -> None:
+        with self._lock:
+            node = self._node(key, KEY_SET_VALUE)
+            self._check_value(value_type, value)
+            node.values[name.lower()] = name, value, value_type
+
+    @override
+    def DeleteValue(self, key: KeyHandle, name: str) -> None:
+        with self._lock:
+            node = self._node(key, KEY_SET_VALUE)
+            if node.values.pop(name.lower(), None) is None:
+                raise _error(
+                    FileNotFoundError, errno.ENOENT, ERROR_FILE_NOT_FOUND,
+                    "The system cannot find the file specified"
+                )
+
+    @override
+    def EnumValue(self, key: KeyHandle, index: int) -> tuple[str, Any, int]:
+        with self._lock:
+            values = list(self._node(key, KEY_QUERY_VALUE).values.values())
+            if not 0 <= index < len(values):
+                raise _error(OSError, errno.ENOENT, ERROR_NO_MORE_ITEMS, "No more data is available")
+            return values[index]
+
+    @override
+    def QueryInfoKey(self, key: KeyHandle) -> tuple[int, int, int]:
+        with self._lock:
+            node = self._node(key)
+            return len(node.keys), len(node.values), 0
+
+
+_backend: RegistryBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def registry_backend() -> RegistryBackend:
+    """Return the backend of the registry helpers."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = WinregBackend() if sys.platform == "win32" else MemoryRegistry()
+        return _backend
+
+
+def set_registry_backend(backend: RegistryBackend) -> None:
+    """Set the backend of the registry helpers."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+class _Winreg:
+    """Forwards the winreg functions to the current backend."""
+
+    HKEY_CLASSES_ROOT = HKEY_CLASSES_ROOT
+    HKEY_CURRENT_USER = HKEY_CURRENT_USER
+    HKEY_LOCAL_MACHINE = HKEY_LOCAL_MACHINE
+    HKEY_USERS = HKEY_USERS
+    HKEY_PERFORMANCE_DATA = HKEY_PERFORMANCE_DATA
+    HKEY_CURRENT_CONFIG = HKEY_CURRENT_CONFIG
+    HKEY_DYN_DATA = HKEY_DYN_DATA
+    KEY_QUERY_VALUE = KEY_QUERY_VALUE
+    KEY_SET_VALUE = KEY_SET_VALUE
+    KEY_CREATE_SUB_KEY = KEY_CREATE_SUB_KEY
+    KEY_READ = KEY_READ
+    KEY_WRITE = KEY_WRITE
+    KEY_ALL_ACCESS = KEY_ALL_ACCESS
+    REG_NONE = REG_NONE
+    REG_SZ = REG_SZ
+    REG_BINARY = REG_BINARY
+    REG_DWORD = REG_DWORD
+    REG_MULTI_SZ = REG_MULTI_SZ
+    REG_QWORD = REG_QWORD
+
+    def OpenKey(self, key: KeyHandle, sub_key: str, reserved: int = 0,
+                access: int = KEY_READ) -> KeyHandle:
+        return registry_backend().OpenKey(key, sub_key, reserved, access)
+
+    def CloseKey(self, key: KeyHandle) -> None:
+        registry_backend().CloseKey(key)
+
+    def CreateKeyEx(self, key: KeyHandle, sub_key: str, reserved: int = 0,
+                    access: int = KEY_WRITE) -> KeyHandle:
+        return registry_backend().CreateKeyEx(key, sub_key, reserved, access)
+
+    def DeleteKey(self, key: KeyHandle, sub_key: str) -> None:
+        registry_backend().DeleteKey(key, sub_key)
+
+    def QueryValueEx(self, key: KeyHandle, name: str) -> tuple[Any, int]:
+        return registry_backend().QueryValueEx(key, name)
+
+    def SetValueEx(self, key: KeyHandle, name: str, reserved: int,
+                   value_type: int, value: Any) -> None:
+        registry_backend().SetValueEx(key, name, reserved, value_type, value)
+
+    def DeleteValue(self, key: KeyHandle, name: str) -> None:
+        registry_backend().DeleteValue(key, name)
+
+    def EnumValue(self, key: KeyHandle, index: int) -> tuple[str, Any, int]:
+        return registry_backend().EnumValue(key, index)
+
+    def QueryInfoKey(self, key: KeyHandle) -> tuple[int, int, int]:
+        return registry_backend().QueryInfoKey(key)
+
+
+winreg = _Winreg()
@@ -0,0 +1,280 @@
+"""
+Snapshot the registry state touched by the tweaks so they can be reverted.
+
+Before a registry helper changes a value or creates or deletes a key,
+the snapshot records its prior state: whether the value or key existed
+and the value and type it had. Only the first state of each path is kept,
+so restoring brings the registry back to how it was before any change.
+
+Entries are appended to a JSON lines file as they are captured, one short
+array per entry. Each run of the application starts a new session with an
+empty file, so a rollback reverts only the changes made since it started.
+A path whose prior state can't be read is recorded as unreadable and left
+as is by the rollback, the change itself still goes ahead.
+"""
+import base64
+import json
+import os
+import threading
+import typing
+from dataclasses import dataclass
+from typing import Any, Final, Iterable, Self
+
+from . import registry
+from .registry_backend import KeyHandle, winreg
+from .threads import StatusResult
+
+SNAPSHOT_FILE: Final = "registry_snapshot.jsonl"
+
+
+@dataclass(frozen=True, slots=True)
+class Entry:
+    """State of a registry value, or of a key if name is None."""
+    hive: int
+    path: str
+    name: str | None
+    exists: bool
+    value_type: int = winreg.REG_NONE
+    value: Any = None
+    error: str = ""  # why the state couldn't be read, if it couldn't.
+
+    @property
+    def readable(self) -> bool:
+        return not self.error
+
+    @property
+    def id(self) -> tuple[int, str, str | None]:
+        return self.hive, self.path.lower(), None if self.name is None else self.name.lower()
+
+    @property
+    def reg_path(self) -> str:
+        path = f"{registry.KEY_NAMES.get(self.hive, self.hive)}\\{self.path}"
+        return path if self.name is None else f"{path}\\{self.name}"
+
+    def to_json(self) -> str:
+        value = self.value
+        if isinstance(value, bytes):
+            value = {"b64": base64.b64encode(value).decode("ascii")}
+        fields = [self.hive, self.path, self.name, int(self.exists), self.value_type, value]
+        if self.error:
+            fields.append(self.error)
+        return json.dumps(fields, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, line: str) -> Self:
+        hive, path, name, exists, value_type, value, *error = json.loads(line)
+        if isinstance(value, dict):
+            value = base64.b64decode(typing.cast(dict[str, str], value)["b64"])
+        return cls(hive, path, name, bool(exists), value_type, value, *error)
+
+
+def read_entry(hive: int, path: str, name: str | None) -> Entry:
+    """Return the current state of the value, or of the key if name is None.
+
+    The entry is unreadable, with the error, if the state couldn't be read.
+    """
+    try:
+        reg_key = winreg.OpenKey(hive, path)
+    except FileNotFoundError:
+        return Entry(hive, path, name, False)
+    except OSError as e:
+        return Entry(hive, path, name, False, error=str(e))
+
+    try:
+        if name is None:
+            return Entry(hive, path, None, True)
+        value, value_type = winreg.QueryValueEx(reg_key, name)
+        return Entry(hive, path, name, True, value_type, value)
+    except FileNotFoundError:
+        return Entry(hive, path, name, False)
+    except OSError as e:
+        return Entry(hive, path, name, False, error=str(e))
+    finally:
+        winreg.CloseKey(reg_key)
+
+
+def _key_values(hive: int, path: str) -> list[Entry]:
+    """Return the states of the values of an existing key, those readable."""
+    entries: list[Entry] = []
+    try:
+        reg_key = winreg.OpenKey(hive, path)
+    except OSError:
+        return entries
+
+    try:
+        for index in range(winreg.QueryInfoKey(reg_key)[1]):
+            name, value, value_type = winreg.EnumValue(reg_key, index)
+            entries.append(Entry(hive, path, name, True, value_type, value))
+    except OSError:
+        pass  # keep the values read.
+    finally:
+        winreg.CloseKey(reg_key)
+    return entries
+
+
+class RegistrySnapshot:
+    """Prior states of the registry paths changed since the snapshot began."""
+
+    def __init__(self, filepath: str | None = None) -> None:
+        """
+        Parameters:
+            - filepath: The JSON lines file the entries are persisted to,
+            entries already in the file are loaded. Kept in memory if None.
+        """
+        self.filepath = filepath
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[int, str, str | None], Entry] = {}
+
+        if filepath is not None and os.path.exists(filepath):
+            with open(filepath, encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = Entry.from_json(line)
+                        self._entries.setdefault(entry.id, entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entries(self) -> list[Entry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def _add(self, entries: Iterable[Entry]) -> None:
+        with self._lock:
+            added: list[Entry] = []
+            for entry in entries:
+                if entry.id not in self._entries:
+                    self._entries[entry.id] = entry
+                    added.append(entry)
+            if added and self.filepath is not None:
+                with open(self.filepath, "a", encoding="utf-8") as file:
+                    file.writelines(entry.to_json() + "\n" for entry in added)
+
+    def capture(self, key: KeyHandle, sub_key: str, name: str | None = None) -> None:
+        """Record the state of the value, or of the key and its values if name is None.
+
+        Paths already captured keep their first state. Keys not opened
+        from a predefined HKEY_* constant are ignored.
+        """
+        hive = int(key)
+        if hive not in registry.KEY_NAMES:
+            return
+        if (hive, sub_key.lower(), None if name is None else name.lower()) in self._entries:
+            return
+
+        entry = read_entry(hive, sub_key, name)
+        if name is None and entry.exists:  # deleting the key removes its values.
+            self._add([entry, *_key_values(hive, sub_key)])
+        else:
+            self._add([entry])
+
+    def diff(self) -> list[tuple[Entry, Entry]]:
+        """Return the (captured, current) states of the paths changed since captured.
+
+        Paths whose captured state is unreadable are left out.
+        """
+        changes: list[tuple[Entry, Entry]] = []
+        for entry in self.entries():
+            if not entry.readable:
+                continue
+            current = read_entry(entry.hive, entry.path, entry.name)
+            if (current.exists, current.value_type, current.value) != \
+                    (entry.exists, entry.value_type, entry.value):
+                changes.append((entry, current))
+        return changes
+
+    def restore(self) -> StatusResult:
+        """Write back the captured states of the changed paths in one batch.
+
+        Keys are recreated before their values are written, created keys are
+        deleted last, deepest first. The snapshot is cleared if all succeed.
+        """
+        changes = [entry for entry, _ in self.diff()]
+        errors: list[str] = []
+        status = 0
+
+        def apply(entry: Entry) -> None:
+            nonlocal status
+            try:
+                if entry.name is None and entry.exists:
+                    winreg.CloseKey(winreg.CreateKeyEx(entry.hive, entry.path))
+                elif entry.name is None:
+                    winreg.DeleteKey(entry.hive, entry.path)
+                elif entry.exists:
+                    reg_key = winreg.CreateKeyEx(
+                        entry.hive, entry.path, 0, winreg.KEY_SET_VALUE)
+                    try:
+                        winreg.SetValueEx(
+                            reg_key, entry.name, 0, entry.value_type, entry.value)
+                    finally:
+                        winreg.CloseKey(reg_key)
+                else:
+                    reg_key = winreg.OpenKey(
+                        entry.hive, entry.path, 0, winreg.KEY_SET_VALUE)
+                    try:
+                        winreg.DeleteValue(reg_key, entry.name)
+                    finally:
+                        winreg.CloseKey(reg_key)
+            except FileNotFoundError:
+                pass  # already absent.
+            except OSError as e:
+                status = status or e.winerror or 1
+                errors.append(f"{e}\nCouldn't restore key: {entry.reg_path}")
+
+        created_keys = [entry for entry in changes if entry.name is None and not entry.exists]
+        for entry in changes:
+            if entry.name is None and entry.exists:
+                apply(entry)
+        for entry in changes:
+            if entry.name is not None:
+                apply(entry)
+        for entry in sorted(created_keys, key=lambda e: e.path.count("\\"), reverse=True):
+            apply(entry)
+
+        if errors:
+            return StatusResult(status, "\n\n".join(errors))
+        self.clear()
+        return StatusResult(0)
+
+    def clear(self) -> None:
+        """Forget the captured states and remove the snapshot file."""
+        with self._lock:
+            self._entries.clear()
+            if self.filepath is not None and os.path.exists(self.filepath):
+                os.remove(self.filepath)
+
+
+_session: RegistrySnapshot | None = None
+
+
+def start_session(filepath: str | None = None) -> RegistrySnapshot:
+    """Capture the prior states of all the changes made by the registry helpers.
+
+    The snapshot of the previous session, if any, is discarded.
+    """
+    global _session
+    if _session is not None:
+        registry.remove_change_listener(_session.capture)
+    _session = RegistrySnapshot(filepath)
+    _session.clear()
+    registry.add_change_listener(_session.capture)
+    return _session
+
+
+def session() -> RegistrySnapshot | None:
+    """Return the snapshot of the current session, if started."""
+    return _session
+
+
+def session_changes() -> int:
+    """Return the number of paths changed in the session that can be restored."""
+    if _session is None:
+        return 0
+    return len(_session.diff())
+
+
+def rollback_session() -> StatusResult:
+    """Restore the registry to its state before the changes of the session."""
+    if _session is None:
+        return StatusResult(0)
+    return _session.restore()
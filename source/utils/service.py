@@ -1,73 +1,524 @@
-import winreg
+import threading
+import time
+import typing
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Generator, Iterable, Iterator, Self
 
 import psutil
-import win32con
 import win32service
-import win32serviceutil
 
+from . import registry
+from .registry_backend import KeyHandle, winreg
 from .threads import Error, Result, StatusResult
 
+if typing.TYPE_CHECKING:
+    from _win32typing import PySC_HANDLE  # type: ignore
+
+# Access rights requested from the service control manager.
+SCM_ACCESS = win32service.SC_MANAGER_CONNECT | \
+    win32service.SC_MANAGER_ENUMERATE_SERVICE
+
+# Access rights requested from services, per kind of operation.
+QUERY_ACCESS = win32service.SERVICE_QUERY_STATUS | \
+    win32service.SERVICE_QUERY_CONFIG
+START_ACCESS = win32service.SERVICE_START | win32service.SERVICE_QUERY_STATUS
+STOP_ACCESS = win32service.SERVICE_STOP | win32service.SERVICE_QUERY_STATUS
+
+ERROR_SERVICE_REQUEST_TIMEOUT = 1053
+ERROR_SERVICE_DOES_NOT_EXIST = 1060
+ERROR_SERVICE_NOT_ACTIVE = 1062
+ERROR_CANCELLED = 1223
+
+# Seconds to wait for a service to reach the requested state.
+STATE_TIMEOUT = 30.0
+# Seconds after which net start/stop commands are killed.
+NET_TIMEOUT = 60.0
+# Bounds of the delay in seconds between service status polls.
+MIN_POLL_DELAY = 0.05
+MAX_POLL_DELAY = 1.0
+
+PENDING_STATES = (
+    win32service.SERVICE_START_PENDING,
+    win32service.SERVICE_STOP_PENDING,
+    win32service.SERVICE_CONTINUE_PENDING,
+    win32service.SERVICE_PAUSE_PENDING,
+)
+
+SERVICES_KEY = "SYSTEM\\CurrentControlSet\\Services"
+
+# Service start types reported by the service control manager.
+START_TYPES = {
+    0: "boot",
+    1: "system",
+    2: "automatic",
+    3: "manual",
+    4: "disabled",
+}
+
+
+@dataclass(slots=True)
+class _Handle:
+    handle: 'PySC_HANDLE'
+    users: int = 0  # threads using the handle.
+    discarded: bool = False  # no longer in the pool, closed once unused.
+
+
+class HandlePool:
+    """Cache of service control manager and service handles.
+
+    The SCM handle is opened once and service handles are kept per
+    (service name, access) pair, the least recently used service handle
+    is discarded once more than `max_handles` are cached. Service handles
+    are checked out for the duration of a call, so a handle discarded
+    while another thread uses it is only closed when released. All the
+    handles are closed when the pool is closed.
+    """
+
+    def __init__(self, max_handles: int = 128) -> None:
+        self.max_handles = max_handles
+        self.opened = 0  # number of handles opened by the pool.
+        self.closed = 0  # number of handles closed by the pool.
+        self._lock = threading.Lock()
+        self._scm: 'PySC_HANDLE | None' = None
+        self._handles: OrderedDict[tuple[str, int], _Handle] = OrderedDict()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_args: object) -> None:
+        self.close()
+
+    def scm(self) -> 'PySC_HANDLE':
+        """Return the service control manager handle."""
+        with self._lock:
+            return self._open_scm()
+
+    def _open_scm(self) -> 'PySC_HANDLE':
+        if self._scm is None:
+            self._scm = win32service.OpenSCManager(None, None, SCM_ACCESS)
+            self.opened += 1
+        return self._scm
+
+    def _close(self, entry: _Handle) -> None:
+        win32service.CloseServiceHandle(entry.handle)
+        self.closed += 1
+
+    def _discard(self, entry: _Handle) -> None:
+        """Close the handle removed from the cache, or once its users release it."""
+        entry.discarded = True
+        if not entry.users:
+            self._close(entry)
+
+    @contextmanager
+    def service(self, service_name: str, access: int) -> Generator['PySC_HANDLE', None, None]:
+        """Check out the service handle opened with the given access.
+
+        Raise:
+            win32service.error: If the service couldn't be opened.
+        """
+        key = (service_name.lower(), access)
+
+        with self._lock:
+            entry = self._handles.get(key)
+            if entry is not None:
+                self._handles.move_to_end(key)
+            else:
+                entry = _Handle(win32service.OpenService(  # type: ignore
+                    self._open_scm(), service_name, access
+                ))
+                self.opened += 1
+                self._handles[key] = entry
+
+                while len(self._handles) > self.max_handles:
+                    _key, old_entry = self._handles.popitem(last=False)
+                    self._discard(old_entry)
+            entry.users += 1
+
+        try:
+            yield entry.handle
+        finally:
+            with self._lock:
+                entry.users -= 1
+                if entry.discarded and not entry.users:
+                    self._close(entry)
+
+    def evict(self, service_name: str) -> None:
+        """Discard the cached handles of the service."""
+        name = service_name.lower()
+
+        with self._lock:
+            for key in [key for key in self._handles if key[0] == name]:
+                self._discard(self._handles.pop(key))
+
+    def close(self) -> None:
+        """Close all the cached handles, the ones in use once released."""
+        with self._lock:
+            while self._handles:
+                _key, entry = self._handles.popitem()
+                self._discard(entry)
+
+            if self._scm is not None:
+                win32service.CloseServiceHandle(self._scm)
+                self.closed += 1
+                self._scm = None
+
+
+_pool: HandlePool | None = None
+_pool_users = 0
+_pool_lock = threading.Lock()
+
+
+@contextmanager
+def handles() -> Generator[HandlePool, None, None]:
+    """Share a handle pool between the service calls made within the context.
+
+    Nested and concurrent contexts share the same pool,
+    it's closed when the outermost context exits.
+    """
+    global _pool, _pool_users
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = HandlePool()
+        _pool_users += 1
+        pool = _pool
 
-def start(service_name: str) -> StatusResult:
-    """Start the windows service."""
     try:
-        win32serviceutil.StartService(service_name)  # type: ignore
-    except win32service.error as e:
-        return StatusResult(e.winerror, e.strerror)
-    else:
+        yield pool
+    finally:
+        with _pool_lock:
+            _pool_users -= 1
+            if _pool_users == 0:
+                _pool = None
+                pool.close()
+
+
+def start(
+    service_name: str,
+    timeout: float | None = None,
+    is_cancelled: Callable[[], bool] = lambda: False,
+) -> StatusResult:
+    """Start the windows service.
+
+    If timeout is given, wait for the service to be running.
+    """
+    with handles() as pool:
+        try:
+            with pool.service(service_name, START_ACCESS) as handle:
+                win32service.StartService(handle, None)
+        except win32service.error as e:
+            pool.evict(service_name)
+            return StatusResult(e.winerror, e.strerror)
+
+    if timeout is None:
         return StatusResult(0)
+    return wait_for_state(
+        service_name, win32service.SERVICE_RUNNING, timeout, is_cancelled
+    )
 
 
-def stop(service_name: str) -> StatusResult:
-    """Stop the windows service."""
-    try:
-        win32serviceutil.StopService(service_name)  # type: ignore
-    except win32service.error as e:
-        return StatusResult(e.winerror, e.strerror)
-    else:
+def stop(
+    service_name: str,
+    timeout: float | None = None,
+    is_cancelled: Callable[[], bool] = lambda: False,
+) -> StatusResult:
+    """Stop the windows service.
+
+    If timeout is given, wait for the service to be stopped.
+    """
+    with handles() as pool:
+        try:
+            with pool.service(service_name, STOP_ACCESS) as handle:
+                win32service.ControlService(  # type: ignore
+                    handle, win32service.SERVICE_CONTROL_STOP
+                )
+        except win32service.error as e:
+            pool.evict(service_name)
+            return StatusResult(e.winerror, e.strerror)
+
+    if timeout is None:
         return StatusResult(0)
+    return wait_for_state(
+        service_name, win32service.SERVICE_STOPPED, timeout, is_cancelled
+    )
+
+
+def wait_for_state(
+    service_name: str,
+    state: int,
+    timeout: float = STATE_TIMEOUT,
+    is_cancelled: Callable[[], bool] = lambda: False,
+) -> StatusResult:
+    """Wait for the windows service to reach the state.
+
+    The status is polled with an exponential backoff, the delay is capped
+    by a tenth of the service wait hint and reset whenever the service
+    advances its check point. Fails if the timeout expires, the service
+    stops advancing its check point within the wait hint, the service
+    settles in another state or is_cancelled returns True.
+    """
+    start_time = time.monotonic()
+    deadline = start_time + timeout
+    delay = MIN_POLL_DELAY
+    check_point = None
+    stall_deadline = None
+
+    while True:
+        result = status(service_name)
+        if result.value is None:
+            return result.status()
+
+        _, current_state, _, exit_code, _, curr_check_point, wait_hint = result.value
+        if current_state == state:
+            return StatusResult(0)
+
+        if current_state not in PENDING_STATES:
+            return StatusResult(
+                exit_code or ERROR_SERVICE_NOT_ACTIVE,
+                f"The {service_name} service stopped in state {current_state} " +
+                f"while waiting for state {state}."
+            )
+
+        now = time.monotonic()
+        if curr_check_point != check_point:  # the service made progress.
+            check_point = curr_check_point
+            delay = MIN_POLL_DELAY
+            stall_deadline = now + wait_hint / 1000 if wait_hint else None
+        elif stall_deadline is not None and now > stall_deadline:
+            return StatusResult(
+                ERROR_SERVICE_REQUEST_TIMEOUT,
+                f"The {service_name} service did not report progress " +
+                f"within its wait hint of {wait_hint} ms."
+            )
+
+        if now >= deadline:
+            return StatusResult(
+                ERROR_SERVICE_REQUEST_TIMEOUT,
+                f"The {service_name} service did not reach state {state} " +
+                f"within {now - start_time:.1f} seconds."
+            )
+        if is_cancelled():
+            return StatusResult(ERROR_CANCELLED, "The operation was cancelled.")
+
+        max_delay = MAX_POLL_DELAY
+        if wait_hint:
+            max_delay = min(max_delay, max(wait_hint / 10000, MIN_POLL_DELAY))
+        time.sleep(min(delay, max_delay, deadline - now))
+        delay *= 2
 
 
 def net_start(service_name: str) -> StatusResult:
     """Start the windows service using net command."""
     return Result.from_command(
-        ["net", "start", service_name, "/y"]
+        ["net", "start", service_name, "/y"], timeout=NET_TIMEOUT
     ).status()
 
 
 def net_stop(service_name: str) -> StatusResult:
     """Stop the windows service using net command."""
     return Result.from_command(
-        ["net", "stop", service_name, "/y"]
+        ["net", "stop", service_name, "/y"], timeout=NET_TIMEOUT
     ).status()
 
 
 def status(service_name: str) -> Result[tuple[int, int, int, int, int, int, int]]:
     """Return status of the windows service."""
-    try:
-        result = win32serviceutil.QueryServiceStatus(service_name)  # type: ignore # noqa
-    except win32service.error as e:
-        return Result(error=Error(e.winerror, e.strerror))
-    else:
-        return Result(result)  # type: ignore
+    with handles() as pool:
+        try:
+            with pool.service(service_name, QUERY_ACCESS) as handle:
+                result = win32service.QueryServiceStatus(handle)
+        except win32service.error as e:
+            pool.evict(service_name)
+            return Result(error=Error(e.winerror, e.strerror))
+        else:
+            return Result(tuple(result))  # type: ignore
 
 
 def running() -> tuple[tuple[str, str, tuple[int, int, int, int, int, int, int]], ...]:
     """Get active running services."""
-    accessSCM = win32con.GENERIC_READ
-    hscm = win32service.OpenSCManager(None, None, accessSCM)
     typeFilter = win32service.SERVICE_WIN32
     stateFilter = win32service.SERVICE_ACTIVE
-    return win32service.EnumServicesStatus(hscm, typeFilter, stateFilter)
+    with handles() as pool:
+        return win32service.EnumServicesStatus(pool.scm(), typeFilter, stateFilter)
 
 
 def services() -> tuple[tuple[str, str, tuple[int, int, int, int, int, int, int]], ...]:
     """Get all windows services."""
-    accessSCM = win32con.GENERIC_READ
-    hscm = win32service.OpenSCManager(None, None, accessSCM)
     typeFilter = win32service.SERVICE_WIN32
     stateFilter = win32service.SERVICE_STATE_ALL
-    return win32service.EnumServicesStatus(hscm, typeFilter, stateFilter)
+    with handles() as pool:
+        return win32service.EnumServicesStatus(pool.scm(), typeFilter, stateFilter)
+
+
+@dataclass(frozen=True, slots=True)
+class ServiceState:
+    service_name: str
+    display_name: str
+    state: int
+    process_id: int
+    start_type: str
+    delayed_auto: bool
+    dependencies: tuple[str, ...] = ()
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the service is starting or running."""
+        return self.state in (
+            win32service.SERVICE_START_PENDING,
+            win32service.SERVICE_RUNNING
+        )
+
+    @property
+    def startup_type(self) -> str:
+        """Start type accounting for automatic-delayed startup type."""
+        if self.start_type == "automatic" and self.delayed_auto:
+            return "automatic-delayed"
+        return self.start_type
+
+
+class ServiceSnapshot:
+    """States of the windows services taken with a single enumeration.
+
+    Start type, delayed-auto flag and dependencies are only known for the
+    services the snapshot was taken for, they're empty/False for the others.
+    """
+
+    def __init__(self, states: Iterable[ServiceState], error: Error | None = None,
+                 config_errors: dict[str, Error] | None = None) -> None:
+        """
+        Parameters:
+            - states: States of the enumerated services.
+            - error: Error of the enumeration, returned for every service.
+            - config_errors: Errors of the services whose start
+            configuration couldn't be read, by service name.
+        """
+        self.error = error
+        self._states = {state.service_name.lower(): state for state in states}
+        self._config_errors = {
+            name.lower(): config_error for name, config_error in (config_errors or {}).items()
+        }
+
+    @classmethod
+    def take(cls, service_names: Iterable[str] | None = None) -> Self:
+        """Take snapshot of all the services.
+
+        Start configurations are read from the registry in a single pass,
+        querying the service is only the fallback for unreadable entries.
+
+        Parameters:
+            - service_names: Services to read start configuration of.
+            If not specified, it's read for every service.
+        """
+        with handles() as pool:
+            entries: tuple[dict[str, typing.Any], ...]
+            try:
+                entries = win32service.EnumServicesStatusEx(  # type: ignore
+                    pool.scm(),
+                    win32service.SERVICE_WIN32,
+                    win32service.SERVICE_STATE_ALL,
+                    win32service.SC_ENUM_PROCESS_INFO
+                )
+            except win32service.error as e:
+                return cls((), Error(e.winerror, e.strerror))
+
+            names = None if service_names is None else \
+                {name.lower() for name in service_names}
+            configs = _registry_configs(
+                entry["ServiceName"] for entry in entries
+                if names is None or entry["ServiceName"].lower() in names
+            )
+
+            states: list[ServiceState] = []
+            config_errors: dict[str, Error] = {}
+            for entry in entries:
+                name: str = entry["ServiceName"]
+                startup_type, dependencies = "", ()
+                if names is None or name.lower() in names:
+                    config = configs.get(name)
+                    if config is None:  # unreadable from the registry.
+                        result = _service_config(pool, name)
+                        if result.value is None:
+                            config_errors[name] = result.error
+                        config = result.value
+                    if config is not None:
+                        startup_type, dependencies = config
+
+                delayed_auto = startup_type == "automatic-delayed"
+                states.append(ServiceState(
+                    service_name=name,
+                    display_name=entry["DisplayName"],
+                    state=entry["CurrentState"],
+                    process_id=entry["ProcessId"],
+                    start_type="automatic" if delayed_auto else startup_type,
+                    delayed_auto=delayed_auto,
+                    dependencies=dependencies
+                ))
+
+        return cls(states, config_errors=config_errors)
+
+    def __contains__(self, service_name: str) -> bool:
+        return service_name.lower() in self._states
+
+    def __iter__(self) -> Iterator[ServiceState]:
+        return iter(self._states.values())
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, service_name: str) -> ServiceState | None:
+        """Return state of the service, None if it doesn't exist."""
+        return self._states.get(service_name.lower())
+
+    def state(self, service_name: str) -> Result[ServiceState]:
+        """Return state of the service or error if it doesn't exist
+        or the services couldn't be enumerated."""
+        if self.error is not None:
+            return Result(error=self.error)
+        state = self._states.get(service_name.lower())
+        if state is not None:
+            return Result(state)
+        return Result(error=Error(
+            ERROR_SERVICE_DOES_NOT_EXIST,
+            f"{service_name}: The specified service does not exist as an installed service."
+        ))
+
+    def startup_type(self, service_name: str) -> Result[str]:
+        """Return startup type of the service or error if it couldn't be read."""
+        state_result = self.state(service_name)
+        if state_result.value is None:
+            return Result(error=state_result.error)
+        config_error = self._config_errors.get(service_name.lower())
+        if config_error is not None:
+            return Result(error=config_error)
+        if not state_result.value.start_type:
+            return Result(error=Error(
+                ERROR_SERVICE_DOES_NOT_EXIST,
+                f"{service_name}: Startup type wasn't read in the snapshot."
+            ))
+        return Result(state_result.value.startup_type)
+
+
+def _service_config(pool: HandlePool, service_name: str) -> Result[tuple[str, tuple[str, ...]]]:
+    """Return startup type and dependencies of the service by querying the service."""
+    try:
+        with pool.service(service_name, QUERY_ACCESS) as handle:
+            config = win32service.QueryServiceConfig(handle)  # type: ignore
+            start_type = START_TYPES.get(config[1], "")  # type: ignore
+            # load order groups are prefixed with '+', skip them.
+            dependencies: tuple[str, ...] = tuple(  # type: ignore
+                name for name in config[6] or () if not name.startswith("+")  # type: ignore
+            )
+            if start_type == "automatic" and win32service.QueryServiceConfig2(  # type: ignore
+                handle, win32service.SERVICE_CONFIG_DELAYED_AUTO_START_INFO
+            ):
+                start_type = "automatic-delayed"
+    except win32service.error as e:
+        pool.evict(service_name)
+        return Result(error=Error(e.winerror, e.strerror))
+    else:
+        return Result((start_type, dependencies))
 
 
 def info(service_name: str) -> Result[dict[str, str]]:
@@ -84,30 +535,103 @@ def info(service_name: str) -> Result[dict[str, str]]:
 
 def service_name(display_name: str) -> Result[str]:
     """Get service name of the windows service."""
-    accessSCM = win32con.GENERIC_READ
-    hscm = win32service.OpenSCManager(None, None, accessSCM)
-    try:
-        result = win32service.GetServiceKeyName(hscm, display_name)  # type: ignore # noqa
-    except win32service.error as e:
-        return Result(error=Error(e.winerror, e.strerror))
-    else:
-        return Result(result)  # type: ignore
+    with handles() as pool:
+        try:
+            result = win32service.GetServiceKeyName(pool.scm(), display_name)  # type: ignore # noqa
+        except win32service.error as e:
+            return Result(error=Error(e.winerror, e.strerror))
+        else:
+            return Result(result)  # type: ignore
 
 
 def display_name(service_name: str) -> Result[str]:
     """Get display name of the windows service."""
-    accessSCM = win32con.GENERIC_READ
-    hscm = win32service.OpenSCManager(None, None, accessSCM)
-    try:
-        result = win32service.GetServiceDisplayName(hscm, service_name)   # type: ignore # noqa
-    except win32service.error as e:
-        return Result(error=Error(e.winerror, e.strerror))
-    else:
-        return Result(result)  # type: ignore
+    with handles() as pool:
+        try:
+            result = win32service.GetServiceDisplayName(pool.scm(), service_name)   # type: ignore # noqa
+        except win32service.error as e:
+            return Result(error=Error(e.winerror, e.strerror))
+        else:
+            return Result(result)  # type: ignore
 
 
 def startup_type(service_name: str) -> Result[str]:
     """Get startup type of the windows service."""
+    return startup_types([service_name])[service_name]
+
+
+def startup_types(service_names: Iterable[str]) -> dict[str, Result[str]]:
+    """Get startup types of the windows services.
+
+    The types are read from the registry in a single pass over the services
+    key, querying the service is only the fallback for unreadable entries.
+    """
+    service_names = list(service_names)
+    configs = _registry_configs(service_names)
+    results: dict[str, Result[str]] = {}
+
+    for service_name in service_names:
+        config = configs.get(service_name)
+        if config is not None:
+            results[service_name] = Result(config[0])
+        else:
+            results[service_name] = _query_startup_type(service_name)
+
+    return results
+
+
+def _registry_configs(service_names: Iterable[str]) -> dict[str, tuple[str, tuple[str, ...]]]:
+    """Return startup type and dependencies of the services readable from the registry."""
+    configs: dict[str, tuple[str, tuple[str, ...]]] = {}
+
+    try:
+        services_key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, SERVICES_KEY)
+    except OSError:
+        return configs  # fallback for all the services.
+
+    try:
+        for service_name in service_names:
+            config = _registry_config(services_key, service_name)
+            if config is not None:
+                configs[service_name] = config
+    finally:
+        winreg.CloseKey(services_key)
+
+    return configs
+
+
+def _registry_config(services_key: KeyHandle, service_name: str) -> tuple[str, tuple[str, ...]] | None:
+    """Return startup type and dependencies from the service registry key, None if unreadable."""
+    try:
+        reg_key = winreg.OpenKey(services_key, service_name)
+    except OSError:
+        return None
+
+    try:
+        start_value = winreg.QueryValueEx(reg_key, "Start")[0]
+        try:
+            delayed_value = winreg.QueryValueEx(reg_key, "DelayedAutostart")[0]
+        except FileNotFoundError:
+            delayed_value = 0  # not delayed if value doesn't exist.
+        try:
+            dependencies = tuple(winreg.QueryValueEx(reg_key, "DependOnService")[0])
+        except FileNotFoundError:
+            dependencies = ()  # no dependencies if value doesn't exist.
+    except OSError:
+        return None
+    finally:
+        winreg.CloseKey(reg_key)
+
+    start_type = START_TYPES.get(start_value)
+    if start_type is None:
+        return None
+    if start_type == "automatic" and delayed_value:
+        return "automatic-delayed", dependencies
+    return start_type, dependencies
+
+
+def _query_startup_type(service_name: str) -> Result[str]:
+    """Get startup type of the windows service by querying the service."""
     info_result = info(service_name)
     if info_result.value is None:
         return Result(error=info_result.error)
@@ -162,7 +686,7 @@ def startup_value(service_name: str) -> Result[int]:
     "Get startup value of the service from windows registry."
 
     key = winreg.HKEY_LOCAL_MACHINE
-    sub_key = "SYSTEM\\CurrentControlSet\\Services"
+    sub_key = SERVICES_KEY
     reg_path = f"HKEY_LOCAL_MACHINE\\{sub_key}\\{service_name}"
 
     try:
@@ -213,8 +737,9 @@ def set_startup_value(service_name: str, startup_type: str) -> StatusResult:
             raise ValueError(f"startup type: {startup_type!r} is invalid.")
 
     key = winreg.HKEY_LOCAL_MACHINE
-    sub_key = "SYSTEM\\CurrentControlSet\\Services"
+    sub_key = SERVICES_KEY
     reg_path = f"HKEY_LOCAL_MACHINE\\{sub_key}\\{service_name}"
+    registry.record_change(key, f"{sub_key}\\{service_name}", "Start")
 
     try:
         reg_key = winreg.OpenKey(
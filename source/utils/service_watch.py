@@ -0,0 +1,334 @@
+"""
+Watch windows services for state changes.
+
+The watcher runs in a background thread blocked on an event source and
+publishes only the services whose state changed, the native source uses
+NotifyServiceStatusChange so no polling is done while services are idle.
+"""
+import ctypes
+import queue
+from abc import ABC, abstractmethod
+from ctypes import wintypes
+from typing import Iterable, override
+
+from PyQt6.QtCore import pyqtSignal, QCoreApplication, QObject, QThread
+
+# Service states, same as the win32service SERVICE_* state constants.
+STOPPED = 1
+START_PENDING = 2
+STOP_PENDING = 3
+RUNNING = 4
+CONTINUE_PENDING = 5
+PAUSE_PENDING = 6
+PAUSED = 7
+
+SC_MANAGER_CONNECT = 0x0001
+SERVICE_QUERY_STATUS = 0x0004
+SERVICE_NOTIFY_STATUS_CHANGE = 2
+SERVICE_NOTIFY_ALL = 0x7F  # notify masks of all the service states.
+SC_STATUS_PROCESS_INFO = 0
+
+ERROR_SUCCESS = 0
+ERROR_SERVICE_MARKED_FOR_DELETE = 1072
+ERROR_SERVICE_NOTIFY_CLIENT_LAGGING = 1294
+
+INFINITE = 0xFFFFFFFF
+WAIT_OBJECT_0 = 0
+WAIT_IO_COMPLETION = 0xC0
+
+ServiceChanges = list[tuple[str, int]]
+
+
+class EventSource(ABC):
+    """Source of service state change events."""
+
+    @abstractmethod
+    def wait(self) -> ServiceChanges | None:
+        """Block until states of the watched services change.
+
+        Return (service name, state) of the changed services,
+        None once the source is closed.
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """Close the source and wake up `wait`, may be called from any thread."""
+
+    def release(self) -> None:
+        """Release the resources of the closed source, once `wait` returned."""
+
+
+class SimulatedEventSource(EventSource):
+    """Event source driven by `push`, for use where the SCM is unavailable."""
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue[tuple[str, int] | None] = queue.Queue()
+
+    def push(self, service_name: str, state: int) -> None:
+        """Report the state of the service to the watcher."""
+        self._queue.put((service_name, state))
+
+    @override
+    def wait(self) -> ServiceChanges | None:
+        changes: ServiceChanges = []
+        item = self._queue.get()
+        while item is not None:
+            changes.append(item)
+            try:  # drain pending events into a single batch.
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return changes
+        self._queue.put(None)  # keep the source closed.
+        return None
+
+    @override
+    def close(self) -> None:
+        self._queue.put(None)
+
+
+class SERVICE_STATUS_PROCESS(ctypes.Structure):
+    _fields_ = [
+        ("dwServiceType", wintypes.DWORD),
+        ("dwCurrentState", wintypes.DWORD),
+        ("dwControlsAccepted", wintypes.DWORD),
+        ("dwWin32ExitCode", wintypes.DWORD),
+        ("dwServiceSpecificExitCode", wintypes.DWORD),
+        ("dwCheckPoint", wintypes.DWORD),
+        ("dwWaitHint", wintypes.DWORD),
+        ("dwProcessId", wintypes.DWORD),
+        ("dwServiceFlags", wintypes.DWORD),
+    ]
+
+
+# callbacks are stdcall, which is the only calling convention on x64.
+NOTIFY_CALLBACK = ctypes.CFUNCTYPE(None, ctypes.c_void_p)
+
+
+class SERVICE_NOTIFY(ctypes.Structure):
+    _fields_ = [
+        ("dwVersion", wintypes.DWORD),
+        ("pfnNotifyCallback", NOTIFY_CALLBACK),
+        ("pContext", ctypes.c_void_p),
+        ("dwNotificationStatus", wintypes.DWORD),
+        ("ServiceStatus", SERVICE_STATUS_PROCESS),
+        ("dwNotificationTriggered", wintypes.DWORD),
+        ("pszServiceNames", wintypes.LPWSTR),
+    ]
+
+
+class NativeEventSource(EventSource):
+    """Event source using NotifyServiceStatusChange.
+
+    Notifications are delivered as APCs to the thread calling `wait`, which
+    sleeps in an alertable wait on the close event in between. The notify
+    mask excludes the current state of a service, otherwise the SCM would
+    report it back immediately.
+    """
+
+    def __init__(self, service_names: Iterable[str]) -> None:
+        self._advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+        self._kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._advapi32.OpenSCManagerW.restype = wintypes.HANDLE
+        self._advapi32.OpenServiceW.restype = wintypes.HANDLE
+        self._advapi32.OpenSCManagerW.argtypes = (
+            wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD)
+        self._advapi32.OpenServiceW.argtypes = (
+            wintypes.HANDLE, wintypes.LPCWSTR, wintypes.DWORD)
+        self._advapi32.CloseServiceHandle.argtypes = (wintypes.HANDLE,)
+        self._advapi32.QueryServiceStatusEx.argtypes = (
+            wintypes.HANDLE, ctypes.c_int, ctypes.c_void_p,
+            wintypes.DWORD, ctypes.POINTER(wintypes.DWORD))
+        self._advapi32.NotifyServiceStatusChangeW.argtypes = (
+            wintypes.HANDLE, wintypes.DWORD, ctypes.POINTER(SERVICE_NOTIFY))
+        self._kernel32.CreateEventW.restype = wintypes.HANDLE
+        self._kernel32.WaitForSingleObjectEx.argtypes = (
+            wintypes.HANDLE, wintypes.DWORD, wintypes.BOOL)
+        self._kernel32.SetEvent.argtypes = (wintypes.HANDLE,)
+        self._kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+
+        self._service_names = list(service_names)
+        self._handles: dict[int, int] = {}  # service index: handle.
+        self._notify: dict[int, SERVICE_NOTIFY] = {}
+        self._fired: list[int] = []
+        # keep a reference to the callback as long as notifications are pending.
+        self._callback = NOTIFY_CALLBACK(self._onNotify)
+        self._close_event: int = self._kernel32.CreateEventW(None, True, False, None)
+        self._scm: int = self._advapi32.OpenSCManagerW(None, None, SC_MANAGER_CONNECT)
+        if not self._scm:
+            raise ctypes.WinError(ctypes.get_last_error())
+        self._registered = False
+
+    def _onNotify(self, parameter: int | None) -> None:
+        notify = SERVICE_NOTIFY.from_address(parameter or 0)
+        self._fired.append(notify.pContext or 0)
+
+    def _open(self, index: int) -> int:
+        handle = self._handles.get(index)
+        if handle is None:
+            handle = self._advapi32.OpenServiceW(
+                self._scm, self._service_names[index], SERVICE_QUERY_STATUS
+            ) or 0
+            self._handles[index] = handle
+        return handle
+
+    def _closeService(self, index: int) -> None:
+        handle = self._handles.pop(index, 0)
+        if handle:
+            self._advapi32.CloseServiceHandle(handle)
+
+    def _currentState(self, handle: int) -> int:
+        status = SERVICE_STATUS_PROCESS()
+        size = wintypes.DWORD()
+        if not self._advapi32.QueryServiceStatusEx(
+            handle, SC_STATUS_PROCESS_INFO, ctypes.byref(status),
+            ctypes.sizeof(status), ctypes.byref(size)
+        ):
+            return 0
+        return status.dwCurrentState
+
+    def _register(self, index: int) -> int | None:
+        """Request notification for the next state change of the service.
+
+        Return the current state of the service, None if it can not be watched.
+        """
+        for _ in range(2):  # reopen the handle once if the client is lagging.
+            handle = self._open(index)
+            if not handle:
+                return None
+
+            state = self._currentState(handle)
+            notify = SERVICE_NOTIFY(
+                dwVersion=SERVICE_NOTIFY_STATUS_CHANGE,
+                pfnNotifyCallback=self._callback,
+                pContext=index,
+            )
+            self._notify[index] = notify
+            error = self._advapi32.NotifyServiceStatusChangeW(
+                handle, SERVICE_NOTIFY_ALL & ~(1 << (state - 1)) if state else
+                SERVICE_NOTIFY_ALL, ctypes.byref(notify)
+            )
+            if error == ERROR_SUCCESS:
+                return state
+
+            self._closeService(index)
+            if error != ERROR_SERVICE_NOTIFY_CLIENT_LAGGING:
+                break
+        return None
+
+    @override
+    def wait(self) -> ServiceChanges | None:
+        changes: ServiceChanges = []
+        if not self._registered:
+            self._registered = True
+            for index, service_name in enumerate(self._service_names):
+                state = self._register(index)
+                if state:
+                    changes.append((service_name, state))
+            if changes:
+                return changes
+
+        while not changes:
+            result = self._kernel32.WaitForSingleObjectEx(
+                self._close_event, INFINITE, True
+            )
+            if result != WAIT_IO_COMPLETION:  # closed or failed.
+                self._release()
+                return None
+
+            fired, self._fired = self._fired, []
+            for index in fired:
+                notify = self._notify[index]
+                if notify.dwNotificationStatus != ERROR_SUCCESS:
+                    self._closeService(index)  # deleted or SCM restarted.
+                else:
+                    changes.append((
+                        self._service_names[index],
+                        notify.ServiceStatus.dwCurrentState
+                    ))
+                if notify.dwNotificationStatus != ERROR_SERVICE_MARKED_FOR_DELETE:
+                    self._register(index)
+
+        return changes
+
+    def _release(self) -> None:
+        # closing the handles cancels the pending notifications.
+        for index in list(self._handles):
+            self._closeService(index)
+        if self._scm:
+            self._advapi32.CloseServiceHandle(self._scm)
+            self._scm = 0
+        self._notify.clear()
+
+    @override
+    def close(self) -> None:
+        self._kernel32.SetEvent(self._close_event)
+
+    @override
+    def release(self) -> None:
+        self._release()
+        if self._close_event:
+            self._kernel32.CloseHandle(self._close_event)
+            self._close_event = 0
+
+
+class ServiceWatcher(QThread):
+    """Thread publishing state changes of services.
+
+    `state_changed` is emitted with (service name, state) whenever the state
+    of a watched service differs from the last published one.
+    """
+    state_changed = pyqtSignal(str, int)
+
+    def __init__(
+        self,
+        service_names: Iterable[str],
+        source: EventSource | None = None,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.service_names = list(dict.fromkeys(service_names))
+        if source is None:
+            try:
+                source = NativeEventSource(self.service_names)
+            except (AttributeError, OSError):  # not on windows or SCM unavailable.
+                source = None
+        self._source = source
+        self._states: dict[str, int] = {}
+
+        self._app = QCoreApplication.instance()
+        if self._app is not None:
+            self._app.aboutToQuit.connect(self.stop)
+
+    def state(self, service_name: str) -> int | None:
+        """Return the last published state of the service."""
+        return self._states.get(service_name.lower())
+
+    @override
+    def run(self) -> None:
+        source = self._source
+        if source is None:
+            return
+
+        while (changes := source.wait()) is not None:
+            for service_name, state in changes:
+                key = service_name.lower()
+                if self._states.get(key) == state:
+                    continue
+                self._states[key] = state
+                self.state_changed.emit(service_name, state)
+
+    def stop(self) -> None:
+        """Stop watching, wait for the thread to finish and release the source.
+
+        The watcher can't be started again once stopped.
+        """
+        if self._app is not None:
+            self._app.aboutToQuit.disconnect(self.stop)
+            self._app = None
+
+        source, self._source = self._source, None
+        if source is not None:
+            source.close()
+        self.wait()
+        if source is not None:
+            source.release()
@@ -1,14 +1,36 @@
+import os
 import subprocess
-from typing import Any, Callable, Concatenate, override, ParamSpec, TypeVar
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from enum import IntEnum
+from typing import Any, Callable, Concatenate, Generator, override, ParamSpec, TypeVar
 
-from PyQt6.QtCore import pyqtSignal, QObject, QThread
+import psutil
+from PyQt6.QtCore import pyqtSignal, QObject, QRunnable, QThreadPool
 
 P = ParamSpec('P')
 R = TypeVar('R')
 
+
+def _startup_info() -> 'subprocess.STARTUPINFO | None':
+    if sys.platform != "win32":
+        return None  # no console windows to hide.
+    startup_info = subprocess.STARTUPINFO()
+    startup_info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startup_info
+
+
 # To hide process console window
-PROCESS_STARTUP_INFO = subprocess.STARTUPINFO()
-PROCESS_STARTUP_INFO.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+PROCESS_STARTUP_INFO = _startup_info()
+
+ERROR_TIMEOUT = 1460
+
+# Default number of threads of the shared worker pool.
+MAX_WORKERS = max(4, os.cpu_count() or 1)
 
 
 class Error(Exception):
@@ -32,13 +54,23 @@ class StatusResult:
         return f"{self.status, self.error}"
 
 
+@dataclass(frozen=True, slots=True)
+class RunStats:
+    exit_code: int
+    wall_time: float  # seconds.
+    peak_output_size: int  # bytes of output held in memory at once.
+    timed_out: bool = False
+
+
 class Result[T]:
     def __init__(
         self, value: T | None = None,
-        error: Error = Error(0, "")
+        error: Error = Error(0, ""),
+        stats: RunStats | None = None,
     ) -> None:
         self.value = value
         self.error = error
+        self.stats = stats
 
     @override
     def __repr__(self) -> str:
@@ -48,25 +80,110 @@ class Result[T]:
         return StatusResult(self.error.winerr, self.error.stderr)
 
     @staticmethod
-    def from_command(command: list[str]) -> 'Result[str]':
-        return Result.from_process(
-            subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                startupinfo=PROCESS_STARTUP_INFO
+    def from_command(
+        command: list[str],
+        *,
+        timeout: float | None = None,
+        on_output: Callable[[str], Any] | None = None,
+    ) -> 'Result[str]':
+        """Run the command with the command backend and return its output.
+
+        See `from_process` for timeout and on_output.
+        """
+        return _command_backend.run(command, timeout, on_output)
+
+    @staticmethod
+    def from_process(
+        process: subprocess.Popen[bytes],
+        *,
+        timeout: float | None = None,
+        on_output: Callable[[str], Any] | None = None,
+    ) -> 'Result[str]':
+        """Wait for the process and return its output.
+
+        If timeout is given, the process tree is killed once it runs longer
+        than timeout seconds. If on_output is given, stdout lines are passed
+        to it as they are read instead of being kept in the result value.
+        """
+        if timeout is None and on_output is None:
+            start_time = time.perf_counter()
+            stdout, stderr = process.communicate()
+            status = process.wait()
+            stats = RunStats(
+                status, time.perf_counter() - start_time,
+                len(stdout or b'') + len(stderr or b'')
             )
+            return Result._from_output(process, stdout or b'', stderr or b'', stats)
+
+        return Result._stream_process(process, timeout, on_output)
+
+    @staticmethod
+    def _stream_process(
+        process: subprocess.Popen[bytes],
+        timeout: float | None,
+        on_output: Callable[[str], Any] | None,
+    ) -> 'Result[str]':
+        start_time = time.perf_counter()
+        lock = threading.Lock()
+        held_size = peak_size = 0
+        stdout: list[bytes] = []
+        stderr: list[bytes] = []
+
+        def read(pipe: Any, chunks: list[bytes], consumer: Callable[[str], Any] | None) -> None:
+            nonlocal held_size, peak_size
+            for line in iter(pipe.readline, b''):
+                with lock:
+                    held_size += len(line)
+                    peak_size = max(peak_size, held_size)
+                if consumer is None:
+                    chunks.append(line)
+                    continue
+                consumer(line.decode(errors="replace").rstrip("\r\n"))
+                with lock:
+                    held_size -= len(line)
+            pipe.close()
+
+        readers = [
+            threading.Thread(target=read, args=(process.stdout, stdout, on_output), daemon=True),
+            threading.Thread(target=read, args=(process.stderr, stderr, None), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+
+        timed_out = False
+        try:
+            status = process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            kill_process_tree(process.pid)
+            status = process.wait()
+
+        for reader in readers:
+            reader.join()
+
+        stats = RunStats(
+            status, time.perf_counter() - start_time, peak_size, timed_out
         )
+        if timed_out:
+            command = " ".join(process.args)  # type: ignore
+            return Result(error=Error(
+                ERROR_TIMEOUT, f"{command}, Timed out after {timeout} seconds"
+            ), stats=stats)
+        return Result._from_output(process, b''.join(stdout), b''.join(stderr), stats)
 
     @staticmethod
-    def from_process(process: subprocess.Popen[bytes]) -> 'Result[str]':
-        stdout, stderr = process.communicate()
-        output = (stdout or b'').decode().strip()
-        error = (stderr or b'').decode().strip()
+    def _from_output(
+        process: subprocess.Popen[bytes],
+        stdout: bytes,
+        stderr: bytes,
+        stats: RunStats,
+    ) -> 'Result[str]':
+        output = stdout.decode().strip()
+        error = stderr.decode().strip()
 
-        status = process.wait()
+        status = stats.exit_code
         if status == 0:
-            return Result(output)
+            return Result(output, stats=stats)
 
         if not error and output:
             error = output  # error may be at stdout
@@ -75,10 +192,322 @@ class Result[T]:
             error = f"ProcessError: {command}\n\n{error}"
         else:
             error = f"{command}, Failed with status code: {status}"
-        return Result(error=Error(status, error))
+        return Result(error=Error(status, error), stats=stats)
+
+
+class CommandBackend(ABC):
+    """Runs the commands of `Result.from_command`."""
+
+    @abstractmethod
+    def run(
+        self,
+        command: list[str],
+        timeout: float | None = None,
+        on_output: Callable[[str], Any] | None = None,
+    ) -> Result[str]:
+        """Run the command and return its result, see `Result.from_process`."""
+
+
+class ProcessBackend(CommandBackend):
+    """Runs the commands as new processes."""
+
+    @override
+    def run(
+        self,
+        command: list[str],
+        timeout: float | None = None,
+        on_output: Callable[[str], Any] | None = None,
+    ) -> Result[str]:
+        return Result.from_process(
+            subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                startupinfo=PROCESS_STARTUP_INFO
+            ),
+            timeout=timeout,
+            on_output=on_output,
+        )
+
+
+_command_backend: CommandBackend = ProcessBackend()
+
+
+def command_backend() -> CommandBackend:
+    """Return the backend running the commands."""
+    return _command_backend
+
+
+def set_command_backend(backend: CommandBackend) -> CommandBackend:
+    """Set the backend running the commands and return the previous one."""
+    global _command_backend
+    previous, _command_backend = _command_backend, backend
+    return previous
+
+
+def kill_process_tree(pid: int) -> None:
+    """Kill the process and all of its descendants."""
+    try:
+        process = psutil.Process(pid)
+        processes = [*process.children(recursive=True), process]
+    except psutil.NoSuchProcess:
+        return
+
+    for process in processes:
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+
+class Priority(IntEnum):
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
+class CancellationToken:
+    """Flag shared between the submitter and the work to request cancellation."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class Future(QObject):
+    """Result of work submitted to the worker pool.
+
+    `started` and `finished` are emitted from the worker thread, slots of
+    objects living in other threads are invoked through their event loop.
+    `finished` is emitted after the work is done, failed or cancelled.
+    """
+    started = pyqtSignal()
+    finished = pyqtSignal()
+
+    def __init__(self, token: CancellationToken) -> None:
+        super().__init__()
+        self.token = token
+        self._done = threading.Event()
+        self._running = False
+        self._cancelled = False
+        self._result: Any = None
+        self._exception: BaseException | None = None
+
+    def cancel(self) -> None:
+        """Request cancellation, work not yet started will not run."""
+        self.token.cancel()
+
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def running(self) -> bool:
+        return self._running
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the work is done, return False on timeout."""
+        return self._done.wait(timeout)
+
+    def result(self) -> Any:
+        """Return the result of the work, raise its exception if it failed."""
+        self._done.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self) -> BaseException | None:
+        self._done.wait()
+        return self._exception
+
+    def execute(self, func: Callable[[], Any]) -> None:
+        """Run the function unless cancelled and store its outcome.
+
+        Called by the worker pool in a worker thread.
+        """
+        if self.token.is_cancelled():
+            self._cancelled = True
+        else:
+            self._running = True
+            self.started.emit()
+            try:
+                self._result = func()
+            except BaseException as e:
+                self._exception = e
+            self._running = False
+
+        self._done.set()
+        self.finished.emit()
+
+
+@dataclass(slots=True)
+class PoolStats:
+    submitted: int = 0
+    completed: int = 0
+    cancelled: int = 0
+    failed: int = 0
+    queued: int = 0  # current queue depth.
+    max_queued: int = 0
+    wait_time: float = 0.0  # total seconds spent queued.
+    run_time: float = 0.0  # total seconds spent running.
+
+    @property
+    def average_wait_time(self) -> float:
+        started = self.completed + self.failed
+        return self.wait_time / started if started else 0.0
+
+    @property
+    def average_run_time(self) -> float:
+        started = self.completed + self.failed
+        return self.run_time / started if started else 0.0
+
+
+class _Runnable(QRunnable):
+    def __init__(self, function: Callable[[], None]) -> None:
+        super().__init__()
+        self.function = function
+
+    @override
+    def run(self) -> None:
+        self.function()
+
+
+class WorkerPool:
+    """Bounded pool of worker threads shared by the application.
+
+    Work is queued by priority and reports back through `Future` signals.
+    Statistics of queue depth, wait time and run time are kept in `stats`.
+    """
+    _instance: 'WorkerPool | None' = None
+
+    def __init__(self, max_workers: int = MAX_WORKERS) -> None:
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(max_workers)
+        self._lock = threading.Lock()
+        self._stats = PoolStats()
+
+    @classmethod
+    def instance(cls) -> 'WorkerPool':
+        """Return the application wide worker pool."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def max_workers(self) -> int:
+        return self._pool.maxThreadCount()
+
+    def set_max_workers(self, max_workers: int) -> None:
+        self._pool.setMaxThreadCount(max_workers)
+
+    def stats(self) -> PoolStats:
+        """Return a copy of the pool statistics."""
+        with self._lock:
+            return replace(self._stats)
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        priority: Priority = Priority.NORMAL,
+        token: CancellationToken | None = None,
+        **kwargs: Any,
+    ) -> Future:
+        """Queue the function to be called with args in a worker thread."""
+        future = Future(token or CancellationToken())
+        queued_at = time.perf_counter()
+
+        def run() -> None:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._stats.queued -= 1
+
+            future.execute(lambda: func(*args, **kwargs))
+            with self._lock:
+                if future.cancelled():
+                    self._stats.cancelled += 1
+                    return
+                self._stats.wait_time += started_at - queued_at
+                self._stats.run_time += time.perf_counter() - started_at
+                if future.exception() is None:
+                    self._stats.completed += 1
+                else:
+                    self._stats.failed += 1
+
+        runnable = _Runnable(run)
+        with self._lock:
+            self._stats.submitted += 1
+            self._stats.queued += 1
+            self._stats.max_queued = max(self._stats.max_queued, self._stats.queued)
+        self._pool.start(runnable, priority)
+        return future
+
+    @contextmanager
+    def blocking(self) -> Generator[None, None, None]:
+        """Let another worker run while the calling worker blocks on other work."""
+        self._pool.releaseThread()
+        try:
+            yield
+        finally:
+            self._pool.reserveThread()
+
+    def wait_for_done(self, timeout: float | None = None) -> bool:
+        """Block until all the work is done, return False on timeout."""
+        return self._pool.waitForDone(-1 if timeout is None else int(timeout * 1000))
+
+
+def pool() -> WorkerPool:
+    """Return the application wide worker pool."""
+    return WorkerPool.instance()
+
+
+class Worker(QObject):
+    """Base of the QThread like objects running `run` in the worker pool."""
+    started = pyqtSignal()
+    finished = pyqtSignal()
+    priority = Priority.NORMAL
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._future: Future | None = None
+
+    def start(self) -> None:
+        """Submit `run` to the worker pool, does nothing if queued or running."""
+        if self.isRunning():
+            return
+        self._future = pool().submit(self._run, priority=self.priority)
+
+    def _run(self) -> None:
+        self.started.emit()
+        try:
+            self.run()
+        except Exception as e:
+            sys.excepthook(type(e), e, e.__traceback__)
+        finally:
+            self.finished.emit()
+
+    def isRunning(self) -> bool:
+        """Return True if the work is queued or running."""
+        return self._future is not None and not self._future.done()
+
+    def isFinished(self) -> bool:
+        return self._future is not None and self._future.done()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the work is done, return False on timeout."""
+        return self._future is None or self._future.wait(timeout)
+
+    def run(self) -> None:
+        pass
 
 
-class Thread(QThread):
+class Thread(Worker):
     def __init__(self, func: Callable[Concatenate[P], R], *args: P.args, **kwargs: P.kwargs) -> None:
         super().__init__()
         self.__func_args = func, args, kwargs
@@ -89,7 +518,7 @@ class Thread(QThread):
         func(*args, **kwargs)
 
 
-class ProcessThread(QThread):
+class ProcessThread(Worker):
     _finished = pyqtSignal(Result)
 
     def __init__(self, process: subprocess.Popen[bytes], parent: QObject | None = None) -> None:
@@ -104,16 +533,17 @@ class ProcessThread(QThread):
         self._finished.connect(function)
 
 
-class CommandThread(QThread):
+class CommandThread(Worker):
     _finished = pyqtSignal(Result)
 
-    def __init__(self, command: list[str], parent: QObject | None = None) -> None:
+    def __init__(self, command: list[str], parent: QObject | None = None, timeout: float | None = None) -> None:
         super().__init__(parent)
         self.command = command
+        self.timeout = timeout
 
     @override
     def run(self) -> None:
-        self._finished.emit(Result.from_command(self.command))
+        self._finished.emit(Result.from_command(self.command, timeout=self.timeout))
 
     def connect(self, function: Callable[[Result[str]], Any]) -> None:
         self._finished.connect(function)
@@ -1,23 +1,36 @@
+import codecs
+import re
 import subprocess
 from typing import Callable, override
 
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import QTimer
 from PyQt6.QtGui import QCloseEvent, QTextCursor
 from PyQt6.QtWidgets import QDockWidget, QMessageBox, QPlainTextEdit, QWidget
 
+from utils.progress import FLUSH_INTERVAL, ProgressBuffer
 from utils.threads import PROCESS_STARTUP_INFO, Thread
 
+READ_SIZE = 4096  # bytes of output read at once.
+
+# ends of the output lines, a trailing \r could be the start of a \r\n.
+LINE_END = re.compile(r"\r\n|\n|\r(?!\Z)")
 
-class ProcessTerminal(QDockWidget):
-    _signal = pyqtSignal(str)
 
+class ProcessTerminal(QDockWidget):
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.setupWidgets()
         self.__thread = None
         self.__function = None
         self.__return_code = -1
-        self._signal.connect(self.insertText)
+        # output lines of the process, inserted in batches by the timer.
+        # lines ending with \r are redrawn by the next line, as in a console.
+        self._output = ProgressBuffer()
+        self._redraw = False  # the last line inserted is to be replaced.
+        self._inserted = False  # lines were inserted since the last clear.
+        self._output_timer = QTimer(self)
+        self._output_timer.setInterval(FLUSH_INTERVAL)
+        self._output_timer.timeout.connect(self.insertOutput)
 
     def setupWidgets(self) -> None:
         """Set the text widget in QDockWidget."""
@@ -34,6 +47,9 @@ class ProcessTerminal(QDockWidget):
         title_text = f"Running: {' '.join(command)}"
         self.setWindowTitle(title_text)
         self.__thread = Thread(self._executeCommand, command)
+        self.__thread.finished.connect(lambda: (
+            self._output_timer.stop(), self.insertOutput()
+        ))
         self.__thread.finished.connect(
             lambda: self.setWindowTitle(f"Finished {title_text}")
         )
@@ -42,27 +58,35 @@ class ProcessTerminal(QDockWidget):
             self.__function is not None else None
         )
         self.__thread.start()
+        self._output_timer.start()
         self.show()  # show the dock widget, it could be hidden.
 
     def _executeCommand(self, command: list[str]) -> None:
-        """Execute the command in a new process and emit its output."""
+        """Execute the command in a new process and buffer its output."""
         process = subprocess.Popen(
             command, stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
+            bufsize=0,  # unbuffered, reads return the output written so far.
             startupinfo=PROCESS_STARTUP_INFO,
         )
         self.process = process
         stdout_stream = process.stdout
 
         if stdout_stream is not None:
-            while True:
-                output = stdout_stream.readline()
-                if output == b'' and process.poll() is not None:
-                    break  # process ended
-                if not output:
-                    continue  # empty strings
-
-                self._signal.emit(output.decode())  # update text widget
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            pending = ""
+            while output := stdout_stream.read(READ_SIZE):
+                pending += decoder.decode(output)
+                start = 0
+                for match in LINE_END.finditer(pending):
+                    line = pending[start:match.start()]
+                    self._output.add(line + "\r" if match[0] == "\r" else line)
+                    start = match.end()
+                pending = pending[start:]
+
+            pending = (pending + decoder.decode(b"", final=True)).rstrip("\r\n")
+            if pending:
+                self._output.add(pending)  # last line, without line end.
 
         self.__return_code = process.wait()  # save process return code.
 
@@ -74,8 +98,53 @@ class ProcessTerminal(QDockWidget):
         cursor.movePosition(QTextCursor.MoveOperation.EndOfLine)
         self.text_widget.setTextCursor(cursor)
 
+    def insertOutput(self) -> None:
+        """Insert the output lines buffered since the last call.
+
+        A line ending with a carriage return is replaced by the next one, in
+        the batch or in the widget if it was the last line inserted.
+        """
+        batch = self._output.take()
+        if batch is None:
+            return
+
+        lines: list[str] = []
+        replace_last = False  # the first line replaces the last one inserted.
+        if batch.dropped:
+            lines.append(f"... {batch.dropped} lines skipped ...")
+            self._redraw = False
+        for line in batch.lines:
+            text = line.rstrip("\r")
+            if not self._redraw:
+                lines.append(text)
+            elif text:  # an empty line drawn over keeps the line.
+                if lines:
+                    lines[-1] = text
+                else:
+                    replace_last = True
+                    lines.append(text)
+            self._redraw = line.endswith("\r")
+        if not lines:
+            return
+
+        if replace_last:
+            # select the last line to insert over it.
+            cursor = self.text_widget.textCursor()
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.movePosition(
+                QTextCursor.MoveOperation.StartOfBlock, QTextCursor.MoveMode.KeepAnchor
+            )
+            cursor.removeSelectedText()
+            self.text_widget.setTextCursor(cursor)
+        elif self._inserted:
+            lines.insert(0, "")  # start a new line after the last one.
+        self._inserted = True
+        self.insertText("\n".join(lines))
+
     def clearText(self) -> None:
         """Clear text-widget text."""
+        self._output.reset()
+        self._redraw = self._inserted = False
         self.text_widget.setReadOnly(False)
         self.text_widget.clear()
         self.text_widget.setReadOnly(True)
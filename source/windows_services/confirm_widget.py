@@ -30,13 +30,16 @@ class ServicesView(QTableView):
 
     def setupTable(self) -> None:
         services_list: list[list[str]] = []
+        startup_types = service.startup_types(
+            svc.service_name for svc in self.services
+        ) if self.show_curr_startup_type else {}
 
         for svc in self.services:
             startup_type = svc.startup_type
 
             if self.show_curr_startup_type:
-                startup_type = service.startup_type(
-                    svc.service_name).value or f"Unknown[{startup_type}]"
+                startup_type = startup_types[
+                    svc.service_name].value or f"Unknown[{startup_type}]"
 
             result = service.info(svc.service_name)
             info = result.value or {}
@@ -0,0 +1,109 @@
+import queue
+from collections import defaultdict
+from typing import Callable, Iterable, Mapping
+
+from utils.config_parser import Service
+from utils.threads import Future, pool, Priority
+
+MAX_WORKERS = 16
+
+
+class ServicesExecutor:
+    """Run a task for each service in the shared worker pool.
+
+    Tasks are ordered by the dependencies between the given services,
+    a task starts only after the tasks it waits for have finished while
+    tasks of unrelated services run concurrently, at most `max_workers`
+    at a time.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS) -> None:
+        self.max_workers = max_workers
+
+    def run(
+        self,
+        services: list[Service],
+        task: Callable[[Service], None],
+        dependencies: Mapping[str, Iterable[str]] | None = None,
+        reverse: bool = False,
+        is_cancelled: Callable[[], bool] = lambda: False,
+    ) -> None:
+        """Run the task for the services and wait for them to finish.
+
+        Parameters:
+            - services: The services to run the task for.
+            - task: The function to run for each service.
+            - dependencies: Names of the services each service depends on.
+            - reverse: If False dependencies run before their dependents (start),
+            otherwise dependents run before their dependencies (stop).
+            - is_cancelled: No more tasks are started once it returns True.
+        """
+        services_dict = {svc.service_name.lower(): svc for svc in services}
+        waits_for = self._waits_for(services_dict, dependencies or {}, reverse)
+
+        unblocks: defaultdict[str, list[str]] = defaultdict(list)
+        for name, names in waits_for.items():
+            for other_name in names:
+                unblocks[other_name].append(name)
+
+        pending = {name: len(names) for name, names in waits_for.items()}
+        unstarted = list(services_dict)  # preserves services order.
+
+        workers = pool()
+        futures: dict[str, Future] = {}
+        ready: list[str] = [name for name in unstarted if not pending[name]]
+        done_queue: queue.Queue[str] = queue.Queue()
+
+        def run_task(name: str) -> None:
+            try:
+                task(services_dict[name])
+            finally:
+                done_queue.put(name)
+
+        def submit(name: str) -> None:
+            unstarted.remove(name)
+            futures[name] = workers.submit(
+                run_task, name, priority=Priority.HIGH
+            )
+
+        while futures or unstarted:
+            if is_cancelled():
+                unstarted.clear()
+                ready.clear()
+            while ready and len(futures) < self.max_workers:
+                submit(ready.pop(0))
+            if not futures:
+                if unstarted:  # dependency cycle, break it.
+                    submit(unstarted[0])
+                continue
+
+            with workers.blocking():  # let the tasks use this worker.
+                name = done_queue.get()
+            futures.pop(name).result()  # raise task exception, if any.
+
+            for other_name in unblocks[name]:
+                pending[other_name] -= 1
+                if not pending[other_name] and other_name in unstarted:
+                    ready.append(other_name)
+
+    @staticmethod
+    def _waits_for(services_dict: dict[str, Service], dependencies: Mapping[str, Iterable[str]],
+                   reverse: bool) -> dict[str, set[str]]:
+        """Return names of the services each service must wait for."""
+        waits_for: dict[str, set[str]] = {name: set() for name in services_dict}
+
+        for service_name, dependency_names in dependencies.items():
+            name = service_name.lower()
+            if name not in services_dict:
+                continue
+
+            for dependency_name in dependency_names:
+                dependency_name = dependency_name.lower()
+                if dependency_name not in services_dict or dependency_name == name:
+                    continue  # only order the given services.
+                if reverse:  # stop dependents before their dependencies.
+                    waits_for[dependency_name].add(name)
+                else:  # start dependencies before their dependents.
+                    waits_for[name].add(dependency_name)
+
+        return waits_for
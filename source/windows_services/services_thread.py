@@ -1,16 +1,23 @@
 from enum import Enum
 from typing import Any, Callable, Concatenate, override, ParamSpec, TypeAlias
 
-from PyQt6.QtCore import pyqtSignal, QMutex, QMutexLocker, QObject, QThread
+from PyQt6.QtCore import pyqtSignal, QMutex, QMutexLocker, QObject
 
 from utils import service
+from utils.threads import Priority, Worker
 from utils.config_parser import Service
 
+from .services_executor import ServicesExecutor
+
 P = ParamSpec('P')
 
 ServicesType: TypeAlias = list[Service]
 FailedServicesType: TypeAlias = list[tuple[Service, str]]
 
+# Seconds to wait for each service to start or stop.
+SERVICE_TIMEOUT = service.STATE_TIMEOUT
+WAIT_ERRORS = (service.ERROR_SERVICE_REQUEST_TIMEOUT, service.ERROR_CANCELLED)
+
 
 class Action(Enum):
     START = "start"
@@ -19,7 +26,8 @@ class Action(Enum):
     DISABLE = "disable"
 
 
-class ServicesThread(QThread):
+class ServicesThread(Worker):
+    priority = Priority.HIGH
     progress = pyqtSignal(int)
     _finished = pyqtSignal(Action, list, bool)
 
@@ -36,6 +44,7 @@ class ServicesThread(QThread):
         ))
         self.__mutex = QMutex()
         self.__pre_disable_func_args = None
+        self.__executor = ServicesExecutor()
 
     def _init_attrs(self) -> None:
         self.__action = None
@@ -95,133 +104,170 @@ class ServicesThread(QThread):
         if self.__function is None or \
                 self.__services is None:
             return
-        self.__function(self.__services)
-
-    def startServices(self, services: ServicesType) -> None:
-        for value, svc in enumerate(services, start=1):
+        with service.handles():  # share handles across the sweep.
+            self.__function(self.__services)
+
+    def _execute(
+        self,
+        services: ServicesType,
+        function: Callable[[Service, service.ServiceSnapshot], str | None],
+        ordered: bool = False,
+        reverse: bool = False,
+    ) -> None:
+        """Execute the function for services concurrently.
+
+        The function returns error message on failure otherwise None.
+        If ordered is True, services are executed in order of their dependencies.
+        """
+        snapshot = service.ServiceSnapshot.take(
+            svc.service_name for svc in services
+        )
+        dependencies = {
+            state.service_name: state.dependencies for state in snapshot
+        } if ordered else None
+        completed = 0
+
+        def task(svc: Service) -> None:
+            nonlocal completed
             if self.is_cancelled():
-                break
-            self.progress.emit(value)
+                return
 
-            status_result = service.status(svc.service_name)
-            if status_result.value is None:
-                self.__failed_services.append(
-                    (svc, status_result.error.stderr)
-                )
-                continue
+            error = function(svc, snapshot)
 
-            if status_result.value[1] == 4:
-                continue  # already running
+            with QMutexLocker(self.__mutex):
+                if error is not None:
+                    self.__failed_services.append((svc, error))
+                completed += 1
+                value = completed
+            self.progress.emit(value)
 
-            if service.start(svc.service_name).success:
-                continue  # on success
+        self.__executor.run(
+            services, task, dependencies, reverse, self.is_cancelled
+        )
 
-            result = service.net_start(svc.service_name)
-            if result.status == 0:
-                continue  # on success
+    def _setRestartRequired(self) -> None:
+        with QMutexLocker(self.__mutex):
+            self.__restart_required = True
 
-            self.__failed_services.append((svc, result.error))
+    def startServices(self, services: ServicesType) -> None:
+        # start dependencies before their dependents.
+        self._execute(services, self._startService, ordered=True)
 
     def stopServices(self, services: ServicesType) -> None:
-        for value, svc in enumerate(services, start=1):
-            if self.is_cancelled():
-                break
-            self.progress.emit(value)
+        # stop dependents before their dependencies.
+        self._execute(services, self._stopService, ordered=True, reverse=True)
 
-            status_result = service.status(svc.service_name)
-            if status_result.value is None:
-                self.__failed_services.append(
-                    (svc, status_result.error.stderr)
-                )
-                continue
+    def enableServices(self, services: ServicesType) -> None:
+        self._execute(services, self._enableService)
 
-            if status_result.value[1] != 4:
-                continue  # already stopped
+    def disableServices(self, services: ServicesType) -> None:
+        # execute callback before disabling services.
+        if self.__pre_disable_func_args is not None:
+            func, args, kwargs = self.__pre_disable_func_args
+            func(*args, **kwargs)
 
-            if service.stop(svc.service_name).success:
-                continue  # on success
+        self._execute(services, self._disableService)
 
-            result = service.net_stop(svc.service_name)
-            if result.status == 0:
-                continue  # on success
+    def _startService(self, svc: Service, snapshot: service.ServiceSnapshot) -> str | None:
+        state_result = snapshot.state(svc.service_name)
+        if state_result.value is None:
+            return state_result.error.stderr
 
-            self.__failed_services.append((svc, result.error))
+        if state_result.value.state == 4:
+            return None  # already running
 
-    def enableServices(self, services: ServicesType) -> None:
-        for value, svc in enumerate(services, start=1):
-            if self.is_cancelled():
-                break
-            self.progress.emit(value)
+        result = service.start(
+            svc.service_name, SERVICE_TIMEOUT, self.is_cancelled
+        )
+        if result.success:
+            return None  # on success
 
-            info_result = service.info(svc.service_name)
-            if info_result.value is None:
-                self.__failed_services.append(
-                    (svc, info_result.error.stderr)
-                )
-                continue
+        # timed out or cancelled while waiting for the service.
+        if result.status in WAIT_ERRORS:
+            return result.error
 
-            if info_result.value['start_type'] != 'disabled':
-                continue  # already enabled
+        result = service.net_start(svc.service_name)
+        if result.status == 0:
+            return None  # on success
 
-            try:
-                result = service.set_startup_type(
-                    svc.service_name, svc.startup_type
-                )
-            except ValueError as e:
-                self.__failed_services.append((svc, str(e)))
-                continue
+        return result.error
 
-            if result.status == 0:
-                continue  # on success
+    def _stopService(self, svc: Service, snapshot: service.ServiceSnapshot) -> str | None:
+        state_result = snapshot.state(svc.service_name)
+        if state_result.value is None:
+            return state_result.error.stderr
 
-            # Access is denied or RPC service is unavailable or dependency not started.
-            if result.status in (5, 1722, 3221356598):
-                result = service.set_startup_value(
-                    svc.service_name, svc.startup_type
-                )
-                if result.status == 0:
-                    self.__restart_required = True
-                    continue
+        if state_result.value.state != 4:
+            return None  # already stopped
 
-            self.__failed_services.append((svc, result.error))
+        result = service.stop(
+            svc.service_name, SERVICE_TIMEOUT, self.is_cancelled
+        )
+        if result.success:
+            return None  # on success
 
-    def disableServices(self, services: ServicesType) -> None:
-        # execute callback before disabling services.
-        if self.__pre_disable_func_args is not None:
-            func, args, kwargs = self.__pre_disable_func_args
-            func(*args, **kwargs)
+        # timed out or cancelled while waiting for the service.
+        if result.status in WAIT_ERRORS:
+            return result.error
 
-        for value, svc in enumerate(services, start=1):
-            if self.is_cancelled():
-                break
-            self.progress.emit(value)
+        result = service.net_stop(svc.service_name)
+        if result.status == 0:
+            return None  # on success
 
-            info_result = service.info(svc.service_name)
-            if info_result.value is None:
-                self.__failed_services.append(
-                    (svc, info_result.error.stderr)
-                )
-                continue
+        return result.error
 
-            if info_result.value['start_type'] == 'disabled':
-                continue  # already disabled
+    def _enableService(self, svc: Service, snapshot: service.ServiceSnapshot) -> str | None:
+        type_result = snapshot.startup_type(svc.service_name)
+        if type_result.value is None:
+            return type_result.error.stderr
 
-            try:
-                result = service.set_startup_type(svc.service_name, 'disabled')
-            except ValueError as e:
-                self.__failed_services.append((svc, str(e)))
-                continue
+        if type_result.value != 'disabled':
+            return None  # already enabled
 
+        try:
+            result = service.set_startup_type(
+                svc.service_name, svc.startup_type
+            )
+        except ValueError as e:
+            return str(e)
+
+        if result.status == 0:
+            return None  # on success
+
+        # Access is denied or RPC service is unavailable or dependency not started.
+        if result.status in (5, 1722, 3221356598):
+            result = service.set_startup_value(
+                svc.service_name, svc.startup_type
+            )
+            if result.status == 0:
+                self._setRestartRequired()
+                return None
+
+        return result.error
+
+    def _disableService(self, svc: Service, snapshot: service.ServiceSnapshot) -> str | None:
+        type_result = snapshot.startup_type(svc.service_name)
+        if type_result.value is None:
+            return type_result.error.stderr
+
+        if type_result.value == 'disabled':
+            return None  # already disabled
+
+        try:
+            result = service.set_startup_type(svc.service_name, 'disabled')
+        except ValueError as e:
+            return str(e)
+
+        if result.status == 0:
+            return None  # on success
+
+        # Access is denied or RPC service is unavailable.
+        if result.status in (5, 1722):
+            result = service.set_startup_value(
+                svc.service_name, 'disabled'
+            )
             if result.status == 0:
-                continue  # on success
-
-            # Access is denied or RPC service is unavailable.
-            if result.status in (5, 1722):
-                result = service.set_startup_value(
-                    svc.service_name, 'disabled'
-                )
-                if result.status == 0:
-                    self.__restart_required = True
-                    continue
-
-            self.__failed_services.append((svc, result.error))
+                self._setRestartRequired()
+                return None
+
+        return result.error
@@ -4,7 +4,7 @@ from PyQt6.QtCore import pyqtSignal, Qt
 from PyQt6.QtGui import QMouseEvent
 from PyQt6.QtWidgets import QGridLayout, QGroupBox, QPushButton, QWidget
 
-from utils import config, service
+from utils import config, service, service_watch
 from utils.config_parser import (
     Button,
     ExtraButton,
@@ -38,6 +38,7 @@ class ServiceWidget(QGroupBox):
         config: ServiceConfig,
         message_bar: MessageBar,
         parent: QWidget | None = None,
+        snapshot: service.ServiceSnapshot | None = None,
     ) -> None:
         super().__init__(parent)
         self.config = config
@@ -45,7 +46,7 @@ class ServiceWidget(QGroupBox):
         self._buttons: list[tuple[Button, QPushButton]] = []
         self.setupWidgets()
         self.connectSlots()
-        self.setStateAndStatus()
+        self.setStateAndStatus(snapshot)
 
         self.setTitle(config.display_name)
         info = service.info(self.config.service_name).value or {}
@@ -117,23 +118,35 @@ class ServiceWidget(QGroupBox):
         self._thread.finished.connect(self.setStateAndStatus)
         self._thread.connectFinished(self.handleFinishedService)
 
-    def setStateAndStatus(self) -> None:
+    def setStateAndStatus(self, snapshot: service.ServiceSnapshot | None = None) -> None:
         """Set buttons current states and statues."""
-        status = service.status(self.config.service_name).value
-        info = service.info(self.config.service_name).value
-        is_running = status is not None and status[1] in (2, 4)
-        is_disabled = (info or {}).get("start_type") == "disabled"
+        if snapshot is None:
+            snapshot = service.ServiceSnapshot.take([self.config.service_name])
+        state = snapshot.get(self.config.service_name)
+        is_disabled = state is not None and state.start_type == "disabled"
+        self.setRunningState(0 if state is None else state.state)
 
         for button_enum, button in self._buttons:
             match button_enum:
-                case Button.START:
-                    button.setChecked(is_running)
-                case Button.STOP:
-                    button.setChecked(not is_running)
                 case Button.ENABLE:
                     button.setChecked(not is_disabled)
                 case Button.DISABLE:
                     button.setChecked(is_disabled)
+                case _:
+                    pass
+
+    def setRunningState(self, state: int) -> None:
+        """Set start/stop buttons checks from the service state."""
+        is_running = state in (service_watch.START_PENDING, service_watch.RUNNING)
+
+        for button_enum, button in self._buttons:
+            match button_enum:
+                case Button.START:
+                    button.setChecked(is_running)
+                case Button.STOP:
+                    button.setChecked(not is_running)
+                case _:
+                    pass
 
     def connect(self, func: Callable[[str], Any]) -> None:
         """Connect the function to restart required event.
@@ -146,19 +159,19 @@ class ServiceWidget(QGroupBox):
     def executeAction(self, action: Action) -> None:
         """Run the specified action for service in new thread."""
         phrase: str | None = None
+        state = service.ServiceSnapshot.take(
+            [self.config.service_name]).get(self.config.service_name)
 
         match action:
             case Action.START | Action.STOP:
-                status = service.status(self.config.service_name).value
-                is_running = status is not None and status[1] in (2, 4)
+                is_running = state is not None and state.is_running
                 if action == Action.START and is_running:
                     phrase = "already running"
                 elif action == Action.STOP and not is_running:
                     phrase = "already stopped"
 
             case Action.ENABLE | Action.DISABLE:
-                info = service.info(self.config.service_name).value
-                is_disabled = (info or {}).get("start_type") == "disabled"
+                is_disabled = state is not None and state.start_type == "disabled"
                 if action == Action.ENABLE and not is_disabled:
                     phrase = "already enabled"
                 elif action == Action.DISABLE and is_disabled:
@@ -12,7 +12,8 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
-from utils import config, power, styles
+from utils import config, power, registry_snapshot, service, styles
+from utils.service_watch import ServiceWatcher
 from utils.config_parser import (
     Error,
     Service,
@@ -38,6 +39,7 @@ class WindowsServices(QFrame):
     def __init__(self, parent: StackedWidget) -> None:
         super().__init__(parent)
         self._parent = parent
+        self._watcher: ServiceWatcher | None = None
         self.setupWidgets()
         self.setMainWidget()
         self.setStyleSheet(styles.get("services"))
@@ -131,16 +133,24 @@ class WindowsServices(QFrame):
             QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed
         )
         layout = QGridLayout()
+        service_widgets: list[ServiceWidget] = []
+        # take states of all the services widgets at once.
+        snapshot = service.ServiceSnapshot.take(
+            item.service_name for item in self._flatten(services_config)
+            if isinstance(item, ServiceConfig)
+        )
 
         for row, config_item in enumerate(services_config):
             if isinstance(config_item, ServiceConfig):
                 widget = ServiceWidget(
                     config_item,
                     self.message_bar,
+                    snapshot=snapshot,
                 )
                 widget.setSizePolicy(size_policy)
                 layout.addWidget(widget, row, 0)
                 widget.connect(self.promptRestart)
+                service_widgets.append(widget)
 
             elif isinstance(config_item, ServicesConfig):
                 widget = ServicesWidget(
@@ -161,10 +171,12 @@ class WindowsServices(QFrame):
                     widget = ServiceWidget(
                         inner_config_item,
                         self.message_bar,
+                        snapshot=snapshot,
                     )
                     widget.setSizePolicy(size_policy)
                     layout.addWidget(widget, row, col)
                     widget.connect(self.promptRestart)
+                    service_widgets.append(widget)
 
                 else:
                     widget = ServicesWidget(
@@ -177,36 +189,74 @@ class WindowsServices(QFrame):
                     layout.addWidget(widget, row, col)
                     widget.connect(self.fireAction)
 
+        self.watchServices(service_widgets)
+
         widget = QWidget()
         layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         layout.setContentsMargins(0, 0, 0, 0)
         widget.setLayout(layout)
         return widget
 
+    def watchServices(self, widgets: list[ServiceWidget]) -> None:
+        """Update the widgets whenever state of their service changes."""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher.deleteLater()
+
+        widgets_dict: dict[str, list[ServiceWidget]] = {}
+        for widget in widgets:
+            widgets_dict.setdefault(
+                widget.config.service_name.lower(), []).append(widget)
+
+        def updateWidgets(service_name: str, state: int) -> None:
+            for widget in widgets_dict.get(service_name.lower(), ()):
+                widget.setRunningState(state)
+
+        self._watcher = ServiceWatcher(widgets_dict, parent=self)
+        self._watcher.state_changed.connect(updateWidgets)
+        self._watcher.start()
+
+    @staticmethod
+    def _flatten(services_config: ServicesConfigType) -> list[ServiceConfig | ServicesConfig]:
+        """Return the configuration items with nested lists flattened."""
+        items: list[ServiceConfig | ServicesConfig] = []
+        for config_item in services_config:
+            if isinstance(config_item, list):
+                items.extend(config_item)
+            else:
+                items.append(config_item)
+        return items
+
     def createRecoverWidget(self) -> QGroupBox:
         """Create a widget for recovering services."""
         revert_button = QPushButton("Revert")
         restore_button = QPushButton("Restore")
+        undo_button = QPushButton("Undo")
 
         revert_button.setObjectName("RecoverButton")
         restore_button.setObjectName("RecoverButton")
+        undo_button.setObjectName("RecoverButton")
 
         revert_button.setToolTip("Disable backed-up services.")
         restore_button.setToolTip("Enable backed-up services.")
+        undo_button.setToolTip("Undo the registry changes made since the application started.")
 
         revert_button.clicked.connect(self.revert)
         restore_button.clicked.connect(self.restore)
+        undo_button.clicked.connect(self.promptRollback)
 
         size_policy = QSizePolicy(
             QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed
         )
         revert_button.setSizePolicy(size_policy)
         restore_button.setSizePolicy(size_policy)
+        undo_button.setSizePolicy(size_policy)
 
         widget = QGroupBox()
         layout = QGridLayout()
         layout.addWidget(revert_button, 0, 0)
         layout.addWidget(restore_button, 0, 1)
+        layout.addWidget(undo_button, 0, 2)
         layout.setAlignment(Qt.AlignmentFlag.AlignTop)
         widget.setLayout(layout)
         return widget
@@ -299,6 +349,31 @@ class WindowsServices(QFrame):
                 "No backed-up services found to enable."
             )
 
+    def promptRollback(self) -> None:
+        """Prompt to undo the registry changes made in this session."""
+        changes = registry_snapshot.session_changes()
+        if not changes:
+            return self.message_bar.displayMessage("No registry changes to undo.")
+
+        self.message_bar.setConfirmText("Undo")
+        self.message_bar.displayPrompt(
+            f"Undo {changes} registry changes made since the application started?"
+        )
+        self.message_bar.connect(self.rollback)
+
+    def rollback(self) -> None:
+        """Restore the registry values changed in this session."""
+        if self._thread.isRunning():
+            return self.message_bar.displayMessage(
+                "Thread Busy, Please wait for the current operation to finish.", True
+            )
+
+        result = registry_snapshot.rollback_session()
+        self.setMainWidget()  # reload the startup types.
+        if not result.success:
+            return self.message_bar.displayMessage(result.error, True)
+        self.promptRestart("Registry changes undone, they require restart. Restart Now?")
+
     def getBackedUpServices(self, services_config: ServicesConfigType) -> ServicesType | None:
         """Return services from the backup directory based on the given configuration."""
         backup_dir = config.abs_path(self.config.backup_dir)
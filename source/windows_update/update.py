@@ -1,19 +1,23 @@
 from typing import Iterable
-import winreg
 
 from utils import registry, service
+from utils.registry_backend import winreg
 
 
-def is_any_service_running(service_names: Iterable[str]) -> service.Result[bool]:
+def is_any_service_running(service_names: Iterable[str], snapshot: service.ServiceSnapshot | None = None) -> service.Result[bool]:
     "Check if any service within the provided service_names is currently running."
 
+    service_names = list(service_names)
+    if snapshot is None:
+        snapshot = service.ServiceSnapshot.take(service_names)
+
     last_error: service.Error | None = None
 
     for service_name in service_names:
-        result = service.status(service_name)
+        result = snapshot.state(service_name)
         if result.value is None:
             last_error = result.error
-        elif result.value[1] in (2, 4):  # starting/running
+        elif result.value.is_running:  # starting/running
             return service.Result(True)
 
     if last_error is None:
@@ -22,34 +26,36 @@ def is_any_service_running(service_names: Iterable[str]) -> service.Result[bool]
         return service.Result(error=last_error)
 
 
-def is_automatic_updates_enabled() -> bool:
+def is_automatic_updates_enabled(session: registry.RegistrySession | None = None) -> bool:
     "Check if automatic windows updates is enabled."
 
-    try:
-        return not registry.key_value(
-            winreg.HKEY_LOCAL_MACHINE,
-            "SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\WindowsUpdate\\Auto Update",
-            "AUOptions"
-        )
-    except FileNotFoundError:
-        return True  # assume True
-    except OSError:
-        return True  # assume True
+    with registry.session_scope(session) as session:
+        try:
+            return not session.key_value(
+                winreg.HKEY_LOCAL_MACHINE,
+                "SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\WindowsUpdate\\Auto Update",
+                "AUOptions"
+            )
+        except FileNotFoundError:
+            return True  # assume True
+        except OSError:
+            return True  # assume True
 
 
-def is_automatic_drivers_updates_enabled() -> bool:
+def is_automatic_drivers_updates_enabled(session: registry.RegistrySession | None = None) -> bool:
     "Check if automatic drivers update on windows update is enabled."
 
-    try:
-        return not registry.key_value(
-            winreg.HKEY_LOCAL_MACHINE,
-            "SOFTWARE\\Policies\\Microsoft\\Windows\\WindowsUpdate",
-            "ExcludeWUDriversInQualityUpdate"
-        )
-    except FileNotFoundError:
-        return True  # assume True
-    except OSError:
-        return True  # assume True
+    with registry.session_scope(session) as session:
+        try:
+            return not session.key_value(
+                winreg.HKEY_LOCAL_MACHINE,
+                "SOFTWARE\\Policies\\Microsoft\\Windows\\WindowsUpdate",
+                "ExcludeWUDriversInQualityUpdate"
+            )
+        except FileNotFoundError:
+            return True  # assume True
+        except OSError:
+            return True  # assume True
 
 
 def set_automatic_updates(enable: bool) -> None:
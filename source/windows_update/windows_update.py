@@ -4,7 +4,7 @@ from functools import partial
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QFrame, QGridLayout, QWidget
 
-from utils import config, power, service, styles
+from utils import config, power, registry, service, service_watch, styles
 from utils.config_parser import Error, Service
 from widgets.message_bar import MessageBar
 from windows_services.services_thread import (
@@ -27,6 +27,8 @@ from .update_gui import UpdateGui
 class WindowsUpdate(QFrame):
     def __init__(self, parent: QWidget) -> None:
         super().__init__(parent)
+        self._watcher: service_watch.ServiceWatcher | None = None
+        self._states: dict[str, int] = {}
         self.setupWidgets()
         self.setMainWidget()
         self.setStyleSheet(styles.get("windows_update"))
@@ -110,54 +112,89 @@ class WindowsUpdate(QFrame):
         self._thread.connectFinished(self.handleFinishedServices)
         self._thread.finished.connect(self._processActions)  # process queue.
 
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher.deleteLater()
+        self._watcher = service_watch.ServiceWatcher(
+            (svc.service_name for svc in self.services), parent=self
+        )
+        self._watcher.state_changed.connect(self.updateServiceStatus)
+        self._watcher.start()
+
     def setStatesAndStatues(self) -> None:
         """Set widget's current states, statues and checks."""
-        self.updateWindowsUpdateStatus()
-
-        self.gui.automatic_updates_checkbox.setChecked(
-            is_automatic_updates_enabled()
-        )
-        self.gui.automatic_driver_updates_checkbox.setChecked(
-            is_automatic_drivers_updates_enabled()
+        snapshot = service.ServiceSnapshot.take(
+            svc.service_name for svc in self.services
         )
+        self.updateWindowsUpdateStatus(snapshot)
 
+        with registry.RegistrySession() as session:
+            self.gui.automatic_updates_checkbox.setChecked(
+                is_automatic_updates_enabled(session)
+            )
+            self.gui.automatic_driver_updates_checkbox.setChecked(
+                is_automatic_drivers_updates_enabled(session)
+            )
+
+        self._states = {svc.service_name: 0 for svc in self.services}
         for service_name, (status_button, state_button) in self.gui.ins_dict.items():
-            status_result = service.status(service_name)
-            info_result = service.info(service_name)
+            state = snapshot.get(service_name)
+            self._states[service_name] = 0 if state is None else state.state
 
-            if status_result.value is None:
+            if state is None:
                 status_button.setText("Unknown")
-            elif status_result.value[1] == 4:  # running
+            elif state.state == 4:  # running
                 status_button.setText("Stop")
             else:
                 status_button.setText("Start")
 
-            if info_result.value is None:
+            if state is None or not state.start_type:
                 state_button.setText("Unknown")
-            elif info_result.value["start_type"] == "disabled":
+            elif state.start_type == "disabled":
                 state_button.setText("Enable")
                 status_button.setDisabled(True)
             else:
                 state_button.setText("Disable")
                 status_button.setDisabled(False)
 
-    def updateWindowsUpdateStatus(self) -> None:
+    def updateWindowsUpdateStatus(self, snapshot: service.ServiceSnapshot | None = None) -> None:
         """Update the status of windows update widgets."""
         result = is_any_service_running(
-            (svc.service_name for svc in self.services)
+            (svc.service_name for svc in self.services), snapshot
         )
         if result.value is None:
-            self.gui.status_label.setText("Status: Unknown")
-            self.gui.toggle_update_button.setText("Deactivate")
             self.message_bar.displayMessage(result.error.stderr, True)
+        self.setUpdateStatus(result.value)
 
-        elif result.value:
+    def setUpdateStatus(self, is_active: bool | None) -> None:
+        """Set the windows update status label and toggle button text."""
+        if is_active is None:
+            self.gui.status_label.setText("Status: Unknown")
+            self.gui.toggle_update_button.setText("Deactivate")
+        elif is_active:
             self.gui.status_label.setText("Status: Active")
             self.gui.toggle_update_button.setText("Deactivate")
         else:
             self.gui.status_label.setText("Status: Inactive")
             self.gui.toggle_update_button.setText("Activate")
 
+    def updateServiceStatus(self, service_name: str, state: int) -> None:
+        """Update the status of the service and windows update on state change."""
+        if service_name not in self.gui.ins_dict:
+            return
+
+        status_button, _ = self.gui.ins_dict[service_name]
+        if state == service_watch.RUNNING:
+            status_button.setText("Stop")
+        elif state == service_watch.STOPPED:
+            status_button.setText("Start")
+
+        self._states[service_name] = state
+        self.setUpdateStatus(any(
+            state in (service_watch.START_PENDING, service_watch.RUNNING)
+            for state in self._states.values()
+        ))
+
     def toggleActivateButtonText(self) -> None:
         """Toggle the text of update button."""
         if self.gui.toggle_update_button.text() == "Activate":
@@ -306,21 +343,23 @@ class WindowsUpdate(QFrame):
 
             case Action.STOP:
                 phrase = "stopped"
+                snapshot = service.ServiceSnapshot.take(
+                    svc.service_name for svc in self.services
+                )
                 for svc in services:
                     if svc.service_name in failed_service_names:
                         continue
                     status_button, _ = self.gui.ins_dict[svc.service_name]
                     status_button.setText("Start")
 
-                    status_result = service.status(svc.service_name)
-                    info_result = service.info(svc.service_name)
-                    if status_result.value is None or info_result.value is None:
+                    state = snapshot.get(svc.service_name)
+                    if state is None or not state.start_type:
                         status_button.setEnabled(True)
-                    elif status_result.value[1] in (1, 3) and info_result.value[
-                            'start_type'] == 'disabled':  # stopped/stopping and disabled
+                    elif state.state in (1, 3) and state.start_type == \
+                            'disabled':  # stopped/stopping and disabled
                         status_button.setDisabled(True)
 
-                self.updateWindowsUpdateStatus()
+                self.updateWindowsUpdateStatus(snapshot)
 
             case Action.ENABLE:
                 phrase = "enabled"
@@ -333,14 +372,15 @@ class WindowsUpdate(QFrame):
 
             case Action.DISABLE:
                 phrase = "disabled"
+                snapshot = service.ServiceSnapshot.take(())  # states only.
                 for svc in services:
                     if svc.service_name in failed_service_names:
                         continue
                     status_button, state_button = self.gui.ins_dict[svc.service_name]
-                    status_result = service.status(svc.service_name)
-                    if status_result.value is None:
+                    state = snapshot.get(svc.service_name)
+                    if state is None:
                         status_button.setEnabled(True)
-                    elif status_result.value[1] in (1, 3):  # stopped/stopping
+                    elif state.state in (1, 3):  # stopped/stopping
                         status_button.setDisabled(True)
                     state_button.setText("Enable")
 